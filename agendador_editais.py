@@ -0,0 +1,93 @@
+# agendador_editais.py
+# Processo de longa duração que mantém o índice de editais atualizado.
+# Cada agência tem seu próprio intervalo; a cada ciclo só as agências "vencidas" são pesquisadas
+# e só os editais novos/alterados seguem para download e indexação (ver atualizaEditais.executar_atualizacao).
+#
+# Uso: python agendador_editais.py [--uma-vez] [--intervalo CAPES=12 --intervalo FAPESP=6] [--checagem 300]
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from browser_agent import AGENCIAS_FOMENTO
+from atualizaEditais import TravaAtualizacao, carregar_estado, executar_atualizacao, ESTADO_FILE
+from instrumentacao import configurar_opentelemetry
+
+# Intervalo padrão (em horas) entre duas descobertas da mesma agência
+INTERVALO_PADRAO_HORAS = 24
+INTERVALOS_AGENCIAS_HORAS: Dict[str, float] = {
+    "CNPq": 24,
+    "CAPES": 24,
+    "FINEP": 48,
+    "FAPESP": 12,
+}
+
+def agencias_vencidas(estado: Dict, intervalos: Dict[str, float], agora: Optional[datetime] = None) -> List[str]:
+    """Agências cuja última descoberta é mais antiga que o intervalo configurado (ou que nunca rodaram)."""
+    agora = agora or datetime.now()
+    vencidas = []
+    for nome in AGENCIAS_FOMENTO:
+        ultima = estado["agencias"].get(nome)
+        intervalo = timedelta(hours=intervalos.get(nome, INTERVALO_PADRAO_HORAS))
+        try:
+            if ultima is None or agora - datetime.fromisoformat(ultima) >= intervalo:
+                vencidas.append(nome)
+        except ValueError:
+            vencidas.append(nome)
+    return vencidas
+
+def executar_ciclo(intervalos: Dict[str, float], estado_path: str = ESTADO_FILE) -> bool:
+    """
+    Executa um ciclo do agendador. Retorna False se outra atualização já estava em andamento.
+    Uma etapa pendente de execução anterior é sempre retomada, mesmo sem agências vencidas.
+    """
+    trava = TravaAtualizacao()
+    if not trava.adquirir():
+        print("INFO: Atualização anterior ainda em andamento. Ciclo ignorado.")
+        return False
+    try:
+        estado = carregar_estado(estado_path)
+        vencidas = agencias_vencidas(estado, intervalos)
+        if not vencidas and not estado.get("pendente"):
+            return True
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] Agências a atualizar: {vencidas or 'nenhuma (retomando etapa pendente)'}")
+        resumo = executar_atualizacao(vencidas, estado_path=estado_path)
+        print(f"Ciclo concluído: {resumo}")
+    except Exception as e:
+        # O agendador não pode morrer por causa de um ciclo ruim; o checkpoint permite retomar depois
+        print(f"ERRO: Falha no ciclo de atualização: {e}")
+    finally:
+        trava.liberar()
+    return True
+
+def rodar_agendador(intervalos: Dict[str, float], checagem_segundos: int = 300):
+    print(f"Agendador de editais iniciado. Intervalos (h): {intervalos}. Checagem a cada {checagem_segundos}s.")
+    while True:
+        executar_ciclo(intervalos)
+        time.sleep(checagem_segundos)
+
+def _parse_intervalos(valores: List[str]) -> Dict[str, float]:
+    intervalos = dict(INTERVALOS_AGENCIAS_HORAS)
+    for valor in valores:
+        nome, _, horas = valor.partition("=")
+        if nome not in AGENCIAS_FOMENTO or not horas:
+            raise argparse.ArgumentTypeError(f"Intervalo inválido '{valor}'. Use AGENCIA=HORAS com AGENCIA em {list(AGENCIAS_FOMENTO)}.")
+        intervalos[nome] = float(horas)
+    return intervalos
+
+def main():
+    parser = argparse.ArgumentParser(description="Agendador de atualização incremental dos editais")
+    parser.add_argument("--uma-vez", action="store_true", help="Executa um único ciclo e sai")
+    parser.add_argument("--intervalo", action="append", default=[], help="Intervalo por agência, ex.: CAPES=12")
+    parser.add_argument("--checagem", type=int, default=300, help="Segundos entre verificações de agências vencidas")
+    args = parser.parse_args()
+
+    intervalos = _parse_intervalos(args.intervalo)
+    configurar_opentelemetry("editais-agendador")
+    if args.uma_vez:
+        executar_ciclo(intervalos)
+    else:
+        rodar_agendador(intervalos, args.checagem)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# api.py
+# Serviço HTTP (ASGI) para consultar o índice de editais sem o Streamlit.
+# Execute com: uvicorn api:app --host 0.0.0.0 --port 8000
+import os
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from langchain_chroma import Chroma
+from pydantic import BaseModel, Field
+
+from embedding import HuggingFaceEmbedding, EmbeddingMicroBatcher
+from instrumentacao import configurar_opentelemetry
+from qa_pipeline import responder_pergunta_async, buscar_documentos_async
+
+load_dotenv()
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+
+class PerguntaRequest(BaseModel):
+    pergunta: str
+    chat_history: Optional[List[Dict[str, str]]] = None
+
+
+class BuscaRequest(BaseModel):
+    consulta: str
+    k: int = Field(default=10, ge=1, le=120)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Um único modelo de embedding e um único handle do Chroma para todo o processo
+    print("Iniciando sistema de RAG para a API...")
+    embedding_function = HuggingFaceEmbedding()
+    app.state.vectorstore = Chroma(
+        embedding_function=embedding_function,
+        persist_directory=os.getenv("CHROMA_DIR", "chroma")
+    )
+    app.state.batcher = EmbeddingMicroBatcher(
+        embedding_function,
+        max_batch_size=int(os.getenv("API_EMBEDDING_BATCH", "32")),
+        max_wait_ms=float(os.getenv("API_EMBEDDING_WAIT_MS", "10")),
+    )
+    app.state.batcher.iniciar()
+    print("✅ API pronta.")
+    yield
+    await app.state.batcher.encerrar()
+
+
+app = FastAPI(title="API de Editais", lifespan=lifespan)
+
+configurar_opentelemetry("editais-api")
+try:
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    FastAPIInstrumentor.instrument_app(app)
+except ImportError:
+    pass
+
+
+def _serializar_documento(doc) -> Dict[str, Any]:
+    return {"conteudo": doc.page_content, "metadata": doc.metadata}
+
+
+@app.post("/ask")
+async def ask(body: PerguntaRequest, request: Request) -> Dict[str, Any]:
+    resultado = await responder_pergunta_async(
+        body.pergunta,
+        request.app.state.vectorstore,
+        chat_history=body.chat_history,
+        embed_queries=request.app.state.batcher.embed,
+    )
+    fontes = []
+    for doc in resultado["documentos"]:
+        url = doc.metadata.get("url", "")
+        if url and url not in fontes:
+            fontes.append(url)
+    return {
+        "resposta": resultado["resposta"],
+        "origem": resultado["origem"],
+        "fontes": fontes,
+        "tempos": resultado["tempos"],
+    }
+
+
+@app.post("/search")
+async def search(body: BuscaRequest, request: Request) -> Dict[str, Any]:
+    tempos: Dict[str, float] = {}
+    docs = await buscar_documentos_async(
+        body.consulta,
+        request.app.state.vectorstore,
+        embed_queries=request.app.state.batcher.embed,
+        tempos=tempos,
+    )
+    return {
+        "documentos": [_serializar_documento(d) for d in docs[:body.k]],
+        "tempos": tempos,
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=os.getenv("API_HOST", "0.0.0.0"), port=int(os.getenv("API_PORT", "8000")))
@@ -11,18 +11,20 @@ from typing import List, Dict, Any # Importar tipos para o histórico de chat
 # Importa as funções de alto nível dos seus módulos separados
 from browser_agent import run_fomento_search_agent
 from indexador_pdf import process_pdfs_into_documents # Usando o nome que você forneceu
-from rag import HuggingFaceEmbedding, perguntar_openai, retrieve_documents # Usando o nome que você forneceu
+from rag import HuggingFaceEmbedding # Usando o nome que você forneceu
+from qa_pipeline import responder_pergunta, formatar_tempos
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
 # Importa a função de download
 from download_manager import download_pdfs_from_editals_json
-from edital_manager import load_cached_grants
-import re
+from escritor_chroma import indexar_documentos
+from instrumentacao import configurar_opentelemetry
 
 # --- Configurações Iniciais ---
 load_dotenv()
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
+configurar_opentelemetry("editais-chat")
 
 # --- Inicialização Global da Vector Store e Embedding ---
 embedding_function = HuggingFaceEmbedding()
@@ -31,64 +33,15 @@ vectorstore = Chroma(
     persist_directory="chroma"
 )
 
-def responde_por_metadados(pergunta: str) -> str | None:
-    grants = load_cached_grants()
-    # Exemplo: deadline até dezembro de 2025
-    deadline_match = re.search(r'(até|antes de|no máximo)\s*(dezembro|12)[/\- ]?2025', pergunta, re.IGNORECASE)
-    if deadline_match:
-        # Extrai todos os editais com deadline até 31/12/2025
-        from datetime import datetime
-        def parse_deadline(deadline):
-            # Extrai datas do campo deadline (pode ter múltiplas datas)
-            datas = re.findall(r'(\d{2}/\d{2}/\d{4})', deadline)
-            return [datetime.strptime(d, '%d/%m/%Y') for d in datas]
-        limite = datetime(2025, 12, 31)
-        resultados = []
-        for edital in grants:
-            datas = parse_deadline(edital.get('deadline',''))
-            if datas and any(data <= limite for data in datas):
-                resultados.append(edital)
-        if resultados:
-            resposta = 'Editais com deadline até dezembro de 2025:\n'
-            for e in resultados:
-                resposta += f"- {e.get('title','')} (Agência: {e.get('agency','')}, Deadline: {e.get('deadline','')}, URL: {e.get('url','')})\n"
-            return resposta
-        else:
-            return 'Nenhum edital com deadline até dezembro de 2025 encontrado.'
-    # Outros filtros podem ser implementados aqui (ex: agência, título, etc)
-    return None
-
 def start_qa_session(user_question):
     print("\n--- Inciando sessão de Perguntas e Respostas. Digite 'voltar' para retornar ao menu principal. ---")
     
     chat_history: List[Dict[str, str]] = [] # NOVO: Inicializa o histórico de chat para a sessão
 
-    # Tenta responder por metadados antes de consultar o LLM
-    resposta_meta = responde_por_metadados(user_question)
-    if resposta_meta:
-        return resposta_meta
-
-    # --- Filtro por número de edital na pergunta ---
-    edital_num_match = re.search(r'(\d{1,3}/\d{4})', user_question)
-    edital_num = edital_num_match.group(1) if edital_num_match else None
-
-    docs = retrieve_documents(user_question, vectorstore)
-    print(f"Docs retornados: {len(docs)}")
-    # Se houver número de edital, priorize chunks que contenham esse número
-    if edital_num:
-        docs_prioritarios = [d for d in docs if edital_num in d.page_content or edital_num in d.metadata.get('title','')]
-        docs = docs_prioritarios + [d for d in docs if edital_num not in d.page_content and edital_num not in d.metadata.get('title','')]
-        print(f"Chunks priorizados para edital {edital_num}: {len(docs_prioritarios)}")
-
-    # Filtro por URL fornecida na pergunta (mantido)
-    url_match = re.search(r'https?://\S+', user_question)
-    url_prioritaria = url_match.group(0) if url_match else None
-    if url_prioritaria:
-        docs_prioritarios = [d for d in docs if d.metadata.get('url','') == url_prioritaria]
-        docs = docs_prioritarios + [d for d in docs if d.metadata.get('url','') != url_prioritaria]
-        print(f"Chunks priorizados para URL {url_prioritaria}: {len(docs_prioritarios)}")
-
-    for d in docs:
+    # Metadados, embedding da pergunta e buscas no Chroma rodam em paralelo no pipeline assíncrono
+    resultado = responder_pergunta(user_question, vectorstore, chat_history=chat_history)
+
+    for d in resultado["documentos"]:
         score = getattr(d, 'score', None) or getattr(d, 'similarity_score', None)
         if score is not None:
             print(f"--- DOC (score: {score:.2f}) ---")
@@ -96,32 +49,8 @@ def start_qa_session(user_question):
             print("--- DOC ---")
         print(d.page_content[:200])  # Mostra o início do texto de cada doc
 
-    MAX_CHARS = 80000 
-    contexto = ""
-    if not docs:
-        response_content = "Desculpe, não encontrei informações relevantes para sua pergunta nos editais indexados. Por favor, tente indexar mais dados."
-    else:
-        for doc in docs:
-            meta = doc.metadata
-            link = meta.get('url', '')
-            deadline = meta.get('deadline', '')
-            score = getattr(doc, 'score', None) or getattr(doc, 'similarity_score', None)
-            contexto += doc.page_content + "\n"
-            if score is not None:
-                contexto += f"[Similaridade com a pergunta: {score:.2%}]\n"
-            if link:
-                contexto += f"Link do edital: {link}\n"
-            if deadline:
-                contexto += f"Prazo (deadline): {deadline}\n"
-            contexto += "\n"
-        print("Contexto passado para o LLM:")
-        print(contexto[:1000])  # Mostra o início do contexto
-        try:
-            # Passa o histórico de chat para a função perguntar_openai
-            response_content = perguntar_openai(user_question, contexto, chat_history=chat_history) 
-        except Exception as e:
-            response_content = f"Ocorreu um erro ao gerar a resposta: {e}. Por favor, verifique sua chave da API ou o status do serviço do LLM."
-    return response_content
+    print(f"Tempos por etapa ({resultado['origem']}): {formatar_tempos(resultado['tempos'])}")
+    return resultado["resposta"]
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 # Define o título da página, o ícone e o layout.
@@ -140,8 +69,8 @@ def get_bot_response(user_input):
 def add_documents_to_vectorstore(documents_to_add: list[Document]):
     if documents_to_add:
         print(f"Adicionando {len(documents_to_add)} documentos à Vector Store...")
-        vectorstore.add_documents(documents_to_add)
-        print(f"**{len(documents_to_add)}** documentos adicionados e persistidos com sucesso na Vector Store.")
+        resumo = indexar_documentos(vectorstore, documents_to_add)
+        print(f"**{resumo['novos']}** documentos adicionados e persistidos com sucesso na Vector Store.")
     else:
         print("Nenhum documento para adicionar à Vector Store.")
 
@@ -1,40 +1,239 @@
-from browser_agent import run_fomento_search_agent
+from browser_agent import run_fomento_search_agent, AGENCIAS_FOMENTO
 from indexador_pdf import process_pdfs_into_documents
-from download_manager import download_pdfs_from_editals_json
+from download_manager import download_pdfs_from_editals_json, _sanitize_filename
+from escritor_chroma import indexar_documentos
 from rag import HuggingFaceEmbedding
 from langchain_chroma import Chroma
+from collections import Counter
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from instrumentacao import instrumentar, relatorio_execucao, configurar_opentelemetry
+import hashlib
+import json
 import os
 
+DOWNLOAD_DIR = "pdfs_baixados"
+ESTADO_FILE = "estado_atualizacao.json"
+LOCK_FILE = "atualizacao.lock"
+
+# --- Estado persistente (checkpoints entre etapas e deltas) ---
+# {
+#   "agencias": {"CNPq": "<iso da última descoberta>"},
+#   "editais": {"<url>": "<fingerprint título+prazo>"},
+#   "arquivos": {"<caminho>": "<sha256 indexado>"},
+#   "pendente": {"etapa": "download" | "indexacao", "editais": [...], "arquivos": [...]}
+# }
+
+def carregar_estado(caminho: str = ESTADO_FILE) -> Dict[str, Any]:
+    estado: Dict[str, Any] = {}
+    if os.path.exists(caminho):
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"AVISO: Estado de atualização '{caminho}' ilegível ({e}). Começando do zero.")
+            estado = {}
+    for chave in ("agencias", "editais", "arquivos"):
+        estado.setdefault(chave, {})
+    return estado
+
+def salvar_estado(estado: Dict[str, Any], caminho: str = ESTADO_FILE):
+    # Escrita atômica: um crash no meio da escrita não corrompe o checkpoint anterior
+    tmp = f"{caminho}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, caminho)
+
+def _fingerprint_edital(edital: Dict[str, Any]) -> str:
+    base = f"{edital.get('title', '')}|{edital.get('deadline', '')}"
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+def _hash_arquivo(caminho: str) -> str:
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+class TravaAtualizacao:
+    """Trava em arquivo que impede duas atualizações simultâneas (cron, agendador, execução manual)."""
+    def __init__(self, caminho: str = LOCK_FILE):
+        self.caminho = caminho
+        self.adquirida = False
+
+    def _trava_abandonada(self) -> bool:
+        try:
+            with open(self.caminho, 'r') as f:
+                pid = int(f.read().strip() or 0)
+            os.kill(pid, 0)
+        except (ValueError, ProcessLookupError):
+            return True
+        except (PermissionError, OSError):
+            return False
+        return False
+
+    def adquirir(self) -> bool:
+        for _ in range(2):
+            try:
+                fd = os.open(self.caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._trava_abandonada():
+                    print(f"AVISO: Removendo trava abandonada '{self.caminho}'.")
+                    os.remove(self.caminho)
+                    continue
+                return False
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            self.adquirida = True
+            return True
+        return False
+
+    def liberar(self):
+        if self.adquirida and os.path.exists(self.caminho):
+            os.remove(self.caminho)
+        self.adquirida = False
+
+    def __enter__(self):
+        if not self.adquirir():
+            raise RuntimeError(f"Outra atualização de editais já está em andamento (trava '{self.caminho}').")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.liberar()
+
+
+# --- Etapas do pipeline ---
+
+@instrumentar("atualizacao.descoberta")
+def etapa_descoberta(estado: Dict[str, Any], agencias: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Roda o agente e devolve apenas os editais novos ou alterados desde a última execução."""
+    online_grants_data = run_fomento_search_agent(agencias)
+    agora = datetime.now().isoformat(timespec='seconds')
+    for nome in (agencias if agencias is not None else list(AGENCIAS_FOMENTO)):
+        estado["agencias"][nome] = agora
+    if not online_grants_data:
+        return []
+    print(f"**{len(online_grants_data)}** editais abertos (incluindo novos e existentes) agora estão no cache.")
+
+    delta = [
+        edital for edital in online_grants_data
+        if edital.get('url') and estado["editais"].get(edital['url']) != _fingerprint_edital(edital)
+    ]
+    print(f"Editais novos ou alterados: {len(delta)}")
+    return delta
+
+@instrumentar("atualizacao.download")
+def etapa_download(estado: Dict[str, Any], editais: List[Dict[str, Any]], download_dir: str = DOWNLOAD_DIR) -> List[str]:
+    """
+    Baixa os editais do delta e devolve os arquivos a (re)indexar.
+    Editais alterados (mesmo título, prazo ou URL novos) são baixados de novo e sempre reindexados,
+    mesmo que o conteúdo do arquivo não mude, para que os chunks recebam o prazo/URL atualizados.
+    """
+    if not editais:
+        return []
+    print("\nIniciando automaticamente o download dos PDFs dos editais encontrados...")
+    downloaded_pdf_paths = download_pdfs_from_editals_json(editais, download_dir, forcar=True)
+    print(f"Total de PDFs baixados nesta execução: {len(downloaded_pdf_paths)}")
+
+    # Compara sem extensão: o edital pode ter sido salvo como .pdf ou, se for página HTML, como .md
+    baixados = {os.path.splitext(p)[0] for p in downloaded_pdf_paths}
+    for edital in editais:
+        # Só marca o edital como processado se o arquivo dele existe; falhas são tentadas de novo no próximo ciclo
+        caminho = os.path.join(download_dir, _sanitize_filename(edital.get('title', 'titulo_desconhecido')))
+        if caminho in baixados:
+            estado["editais"][edital['url']] = _fingerprint_edital(edital)
+
+    # Todo edital do delta é novo ou alterado: o hash do arquivo não basta, os metadados mudaram
+    return list(dict.fromkeys(p for p in downloaded_pdf_paths if os.path.exists(p)))
+
+@instrumentar("atualizacao.indexacao")
+def etapa_indexacao(estado: Dict[str, Any], arquivos: List[str], vectorstore: Optional[Chroma] = None) -> int:
+    """Indexa os arquivos informados, substituindo os chunks antigos de cada arquivo."""
+    arquivos = [p for p in arquivos if os.path.exists(p)]
+    if not arquivos:
+        print("Nenhum PDF novo ou alterado para indexar.")
+        return 0
+    downloaded_pdf_chunks = process_pdfs_into_documents(arquivos)
+    tipos = Counter(chunk.metadata.get('type') for chunk in downloaded_pdf_chunks)
+    print(f"Total de chunks retornados: {len(downloaded_pdf_chunks)} ({dict(tipos)})")
+
+    if vectorstore is None:
+        embedding_function = HuggingFaceEmbedding()
+        vectorstore = Chroma(
+            embedding_function=embedding_function,
+            persist_directory="chroma"
+        )
+    # Upsert por ID de conteúdo: só chunks novos são embutidos e os de versões anteriores dos arquivos são removidos
+    indexar_documentos(vectorstore, downloaded_pdf_chunks)
+
+    for caminho in arquivos:
+        estado["arquivos"][caminho] = _hash_arquivo(caminho)
+    return len(downloaded_pdf_chunks)
+
+
+def executar_atualizacao(agencias: Optional[List[str]] = None, estado_path: str = ESTADO_FILE) -> Dict[str, Any]:
+    """
+    Executa descoberta → download → indexação processando só o que mudou.
+    Um checkpoint é salvo ao fim de cada etapa; se a execução anterior parou no meio,
+    ela é retomada a partir da etapa pendente antes de qualquer nova descoberta.
+    Com `agencias=[]` apenas a etapa pendente (se houver) é concluída.
+    Cada execução gera um relatório JSON (tempos por etapa, contadores, pico de memória) em RELATORIOS_DIR.
+    """
+    with relatorio_execucao("atualizacao", agencias=agencias) as relatorio:
+        resumo = _executar_atualizacao(agencias, estado_path)
+        relatorio.atributos.update(resumo)
+    return resumo
+
+
+def _executar_atualizacao(agencias: Optional[List[str]], estado_path: str) -> Dict[str, Any]:
+    estado = carregar_estado(estado_path)
+    resumo = {"editais_delta": 0, "arquivos_indexados": 0, "chunks": 0, "retomada": None}
+
+    pendente = estado.get("pendente")
+    if pendente:
+        print(f"Retomando execução anterior a partir da etapa '{pendente['etapa']}'...")
+        resumo["retomada"] = pendente["etapa"]
+        if pendente["etapa"] == "download":
+            arquivos = etapa_download(estado, pendente.get("editais", []))
+            estado["pendente"] = {"etapa": "indexacao", "arquivos": arquivos}
+            salvar_estado(estado, estado_path)
+            pendente = estado["pendente"]
+        arquivos = pendente.get("arquivos", [])
+        resumo["chunks"] += etapa_indexacao(estado, arquivos)
+        resumo["arquivos_indexados"] += len(arquivos)
+        estado.pop("pendente", None)
+        salvar_estado(estado, estado_path)
+
+    if agencias is not None and not agencias:
+        return resumo
+
+    delta = etapa_descoberta(estado, agencias)
+    resumo["editais_delta"] = len(delta)
+    estado["pendente"] = {"etapa": "download", "editais": delta}
+    salvar_estado(estado, estado_path)
+
+    arquivos = etapa_download(estado, delta)
+    estado["pendente"] = {"etapa": "indexacao", "arquivos": arquivos}
+    salvar_estado(estado, estado_path)
+
+    resumo["chunks"] += etapa_indexacao(estado, arquivos)
+    resumo["arquivos_indexados"] += len(arquivos)
+    estado.pop("pendente", None)
+    salvar_estado(estado, estado_path)
+    return resumo
+
+
 def main():
     print("Iniciando atualização dos editais...")
-    online_grants_data = run_fomento_search_agent()
-    if online_grants_data:
-        print(f"**{len(online_grants_data)}** editais abertos (incluindo novos e existentes) agora estão no cache.")
-        print("\nIniciando automaticamente o download dos PDFs dos editais encontrados...")
-        download_dir = "pdfs_baixados"
-        downloaded_pdf_paths = download_pdfs_from_editals_json(online_grants_data, download_dir)
-        print(f"Total de PDFs baixados nesta execução: {len(downloaded_pdf_paths)}")
-        if downloaded_pdf_paths:
-            downloaded_pdf_chunks = process_pdfs_into_documents(downloaded_pdf_paths)
-            print(f"Total de chunks retornados: {len(downloaded_pdf_chunks)}")
-            for i, chunk in enumerate(downloaded_pdf_chunks):
-                print(f"Chunk {i} (source: {chunk.metadata.get('source')}, page: {chunk.metadata.get('page')}, type: {chunk.metadata.get('type')}):\n{chunk.page_content[:300]}\n{'-'*60}")
-            # Adiciona os chunks ao Chroma
-            embedding_function = HuggingFaceEmbedding()
-            vectorstore = Chroma(
-                embedding_function=embedding_function,
-                persist_directory="chroma"
-            )
-            if downloaded_pdf_chunks:
-                print(f"Adicionando {len(downloaded_pdf_chunks)} documentos à Vector Store...")
-                vectorstore.add_documents(downloaded_pdf_chunks)
-                print(f"Documentos adicionados e persistidos com sucesso na Vector Store.")
-        else:
-            print("Nenhum PDF baixado para indexar a partir dos editais online.")
+    configurar_opentelemetry("editais-atualizacao")
+    with TravaAtualizacao():
+        resumo = executar_atualizacao()
+    if resumo["editais_delta"] or resumo["arquivos_indexados"]:
         print("\nEditais online atualizados, baixados (se aplicável) e indexados. Você pode fazer perguntas agora.")
     else:
-        print("\nNenhum edital online aberto foi encontrado ou permaneceu no cache após a atualização.")
-        print("Não foi possível atualizar o índice com novos editais online.")
+        print("\nNenhum edital novo ou alterado foi encontrado desde a última atualização.")
+    print(f"Resumo: {resumo}")
     print("Atualização dos editais concluída.")
 
 if __name__ == "__main__":
@@ -0,0 +1,345 @@
+# benchmarks/bench_editais.py
+# Benchmark reprodutível dos caminhos críticos de ingestão e de perguntas e respostas.
+#
+#   python -m benchmarks.bench_editais                       # corpus padrão, modelo de embedding real
+#   python -m benchmarks.bench_editais --embedding hash      # sem baixar o modelo (só mede o pipeline)
+#   python -m benchmarks.bench_editais --comparar-backends   # pypdf (rápido) x pdfplumber
+#   python -m benchmarks.bench_editais --comparar base.json novo.json
+#
+# O LLM (OpenRouter) é sempre substituído por um cliente offline com latência fixa,
+# para que o tempo de resposta reflita apenas o nosso código.
+import argparse
+import asyncio
+import difflib
+import hashlib
+import json
+import math
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+os.environ.setdefault("RELATORIOS_DESATIVADOS", "1")
+# Mede a extração de verdade; com o cache ligado, a 2ª rodada só leria o SQLite
+os.environ.setdefault("CACHE_EXTRACAO_DESATIVADO", "1")
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+import rag
+import qa_pipeline
+import edital_manager
+from indexador_pdf import process_pdfs_into_documents, BACKENDS_EXTRACAO, _extrair_paginas_backend
+from instrumentacao import relatorio_execucao, memoria_pico_mb
+from escritor_chroma import gravar_em_lotes
+from benchmarks.corpus_sintetico import gerar_corpus, METADADOS_FILENAME
+
+DIRETORIO_BENCH = os.path.dirname(os.path.abspath(__file__))
+PERGUNTAS_FILE = os.path.join(DIRETORIO_BENCH, "perguntas.json")
+RESULTADOS_DIR = os.path.join(DIRETORIO_BENCH, "resultados")
+
+
+# --- Substitutos offline ---
+
+class EmbeddingHash(Embeddings):
+    """Embedding determinístico por hashing de palavras. Não mede o modelo, só o resto do pipeline."""
+    def __init__(self, dimensao: int = 384):
+        self.dimensao = dimensao
+
+    def _vetor(self, texto: str) -> List[float]:
+        vetor = [0.0] * self.dimensao
+        for palavra in texto.lower().split():
+            indice = int(hashlib.md5(palavra.encode("utf-8")).hexdigest(), 16) % self.dimensao
+            vetor[indice] += 1.0
+        norma = math.sqrt(sum(v * v for v in vetor)) or 1.0
+        return [v / norma for v in vetor]
+
+    def embed_documents(self, texts):
+        return [self._vetor(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vetor(text)
+
+
+class EmbeddingComCache(Embeddings):
+    """
+    Reaproveita os vetores já calculados na etapa de embeddings ao montar o índice do benchmark.
+    Consultas não passam pelo cache: toda rodada de recuperação e de QA paga o embedding da pergunta, como em produção.
+    """
+    def __init__(self, base: Embeddings):
+        self.base = base
+        self.cache: Dict[str, List[float]] = {}
+
+    def embed_documents(self, texts):
+        faltando = [t for t in texts if t not in self.cache]
+        if faltando:
+            for texto, vetor in zip(faltando, self.base.embed_documents(faltando)):
+                self.cache[texto] = vetor
+        return [self.cache[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.base.embed_query(text)
+
+
+class OpenRouterOffline:
+    """Imita o cliente `openai.OpenAI` usado em `rag.perguntar_openai`, sem acesso à rede."""
+    latencia_s = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict[str, Any]], **kwargs):
+        time.sleep(self.latencia_s)
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+        resposta = "Resposta offline do benchmark."
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=resposta))],
+            usage=SimpleNamespace(prompt_tokens=prompt_chars // 4, completion_tokens=len(resposta) // 4),
+        )
+
+
+# --- Utilitários ---
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    inferior, superior = math.floor(k), math.ceil(k)
+    if inferior == superior:
+        return ordenados[int(k)]
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+def _commit_atual() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        sujo = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "alteracoes_locais": None}
+    return {"commit": commit, "alteracoes_locais": sujo}
+
+def _por_segundo(quantidade: float, segundos: float) -> float:
+    return round(quantidade / segundos, 2) if segundos > 0 else 0.0
+
+
+# --- Etapas medidas ---
+
+def medir_extracao(caminhos: List[str], backend: str) -> Dict[str, Any]:
+    with relatorio_execucao("benchmark_extracao", salvar=False) as relatorio:
+        inicio = time.perf_counter()
+        chunks = process_pdfs_into_documents(caminhos, backend=backend)
+        duracao = time.perf_counter() - inicio
+    paginas = relatorio.contadores.get("paginas", 0)
+    return {
+        "chunks_docs": chunks,
+        "pdfs": len(caminhos),
+        "paginas": int(paginas),
+        "chunks": len(chunks),
+        "duracao_s": round(duracao, 3),
+        "paginas_por_s": _por_segundo(paginas, duracao),
+        "chunks_por_s": _por_segundo(len(chunks), duracao),
+    }
+
+def medir_backends(caminhos: List[str]) -> Dict[str, Any]:
+    """Extrai o corpus com cada backend e mede vazão e concordância do texto com o pdfplumber."""
+    textos: Dict[str, List[str]] = {}
+    vazao: Dict[str, float] = {}
+    escaladas = 0
+    for backend in BACKENDS_EXTRACAO:
+        textos[backend] = []
+        inicio = time.perf_counter()
+        for caminho in caminhos:
+            with open(caminho, "rb") as f:
+                paginas = _extrair_paginas_backend(f, backend)
+            textos[backend].extend(p["text"] for p in paginas)
+            if backend == "rapido":
+                escaladas += sum(1 for p in paginas if p.get("backend") == "pdfplumber")
+        vazao[backend] = _por_segundo(len(textos[backend]), time.perf_counter() - inicio)
+
+    concordancias = [
+        difflib.SequenceMatcher(None, a.split(), b.split(), autojunk=False).ratio()
+        for a, b in zip(textos["rapido"], textos["pdfplumber"])
+    ]
+    return {
+        "paginas_por_s": vazao,
+        "paginas_escaladas": escaladas,
+        "concordancia_texto_media": round(sum(concordancias) / len(concordancias), 4) if concordancias else 0.0,
+        "concordancia_texto_min": round(min(concordancias), 4) if concordancias else 0.0,
+    }
+
+def medir_embeddings(embedding: Embeddings, textos: List[str]) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    embedding.embed_documents(textos)
+    duracao = time.perf_counter() - inicio
+    return {
+        "textos": len(textos),
+        "duracao_s": round(duracao, 3),
+        "embeddings_por_s": _por_segundo(len(textos), duracao),
+    }
+
+def medir_recuperacao(vectorstore: Chroma, perguntas: List[str], repeticoes: int) -> Dict[str, Any]:
+    latencias = []
+    for _ in range(repeticoes):
+        for pergunta in perguntas:
+            inicio = time.perf_counter()
+            rag.retrieve_documents(pergunta, vectorstore)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "consultas": len(latencias),
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "media_ms": round(sum(latencias) / len(latencias), 2) if latencias else 0.0,
+    }
+
+def medir_qa(vectorstore: Chroma, perguntas: List[str], repeticoes: int) -> Dict[str, Any]:
+    latencias = []
+    etapas: Dict[str, List[float]] = {}
+
+    async def rodar():
+        for _ in range(repeticoes):
+            for pergunta in perguntas:
+                inicio = time.perf_counter()
+                resultado = await qa_pipeline.responder_pergunta_async(pergunta, vectorstore)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                for etapa, segundos in resultado["tempos"].items():
+                    etapas.setdefault(etapa, []).append(segundos * 1000)
+
+    asyncio.run(rodar())
+    return {
+        "perguntas": len(latencias),
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "etapas_p50_ms": {etapa: round(percentil(v, 50), 2) for etapa, v in etapas.items()},
+    }
+
+
+def executar_benchmark(args) -> Dict[str, Any]:
+    with open(PERGUNTAS_FILE, "r", encoding="utf-8") as f:
+        perguntas = json.load(f)
+
+    OpenRouterOffline.latencia_s = args.latencia_llm_ms / 1000
+    rag.OpenAI = OpenRouterOffline
+
+    if args.embedding == "hash":
+        embedding_base: Embeddings = EmbeddingHash()
+    else:
+        embedding_base = rag.HuggingFaceEmbedding()
+
+    with tempfile.TemporaryDirectory(prefix="bench_editais_") as tmp:
+        corpus_dir = args.corpus or os.path.join(tmp, "corpus")
+        if not args.corpus:
+            inicio = time.perf_counter()
+            gerar_corpus(corpus_dir, editais=args.editais, paginas=args.paginas, seed=args.seed)
+            print(f"Corpus sintético gerado em {time.perf_counter() - inicio:.1f}s ({args.editais} editais).")
+        caminhos = sorted(os.path.join(corpus_dir, f) for f in os.listdir(corpus_dir) if f.endswith(".pdf"))
+        # Metadados dos editais (indexação e respostas por metadados) vêm do corpus, nunca do
+        # cached_online_grants.json do último scraping; um --corpus sem o arquivo fica sem metadados
+        edital_manager.CACHE_FILE = os.path.join(corpus_dir, METADADOS_FILENAME)
+
+        extracao = medir_extracao(caminhos, args.backend)
+        backends = medir_backends(caminhos) if args.comparar_backends else None
+        chunks = extracao.pop("chunks_docs")
+
+        embedding = EmbeddingComCache(embedding_base)
+        embeddings = medir_embeddings(embedding, [c.page_content for c in chunks])
+
+        vectorstore = Chroma(embedding_function=embedding, persist_directory=os.path.join(tmp, "chroma"))
+        # Os vetores já estão no cache: mede principalmente a gravação em lotes no Chroma
+        escrita = gravar_em_lotes(vectorstore, chunks)
+        # Consultas vão direto ao embedder base: cada rodada mede embedding da pergunta + busca
+        recuperacao = medir_recuperacao(vectorstore, perguntas, args.repeticoes)
+        qa = medir_qa(vectorstore, perguntas, args.repeticoes)
+
+    return {
+        **_commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "config": {
+            "editais": args.editais,
+            "paginas": args.paginas,
+            "seed": args.seed,
+            "embedding": args.embedding,
+            "repeticoes": args.repeticoes,
+            "latencia_llm_ms": args.latencia_llm_ms,
+            "corpus": args.corpus,
+            "backend": args.backend,
+        },
+        "metricas": {
+            "extracao": extracao,
+            **({"backends": backends} if backends else {}),
+            "embeddings": embeddings,
+            "escrita": escrita,
+            "recuperacao": recuperacao,
+            "qa": qa,
+            "memoria_pico_mb": memoria_pico_mb(),
+        },
+    }
+
+
+def salvar_resultado(resultado: Dict[str, Any], diretorio: str = RESULTADOS_DIR) -> str:
+    os.makedirs(diretorio, exist_ok=True)
+    nome = f"{datetime.now():%Y%m%d-%H%M%S}_{resultado.get('commit') or 'sem-commit'}.json"
+    caminho = os.path.join(diretorio, nome)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    return caminho
+
+
+def _achatar(metricas: Dict[str, Any], prefixo: str = "") -> Dict[str, float]:
+    planas = {}
+    for chave, valor in metricas.items():
+        nome = f"{prefixo}{chave}"
+        if isinstance(valor, dict):
+            planas.update(_achatar(valor, f"{nome}."))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            planas[nome] = valor
+    return planas
+
+def comparar(base_path: str, novo_path: str):
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(novo_path, "r", encoding="utf-8") as f:
+        novo = json.load(f)
+    print(f"Base: {base.get('commit')} ({base.get('data')})  |  Novo: {novo.get('commit')} ({novo.get('data')})")
+    if base.get("config") != novo.get("config"):
+        print("AVISO: As configurações dos dois resultados são diferentes; a comparação pode não ser justa.")
+    metricas_base = _achatar(base["metricas"])
+    metricas_novo = _achatar(novo["metricas"])
+    for nome in sorted(set(metricas_base) & set(metricas_novo)):
+        antes, depois = metricas_base[nome], metricas_novo[nome]
+        variacao = f"{(depois - antes) / antes:+.1%}" if antes else "n/a"
+        print(f"{nome:45s} {antes:>12} -> {depois:>12}  ({variacao})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ingestão e perguntas/respostas dos editais")
+    parser.add_argument("--editais", type=int, default=20, help="Quantidade de PDFs sintéticos")
+    parser.add_argument("--paginas", type=int, default=6, help="Páginas por PDF sintético")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--corpus", help="Usa um diretório de PDFs existente em vez do corpus sintético")
+    parser.add_argument("--embedding", choices=["modelo", "hash"], default="modelo")
+    parser.add_argument("--backend", choices=BACKENDS_EXTRACAO, default="rapido", help="Backend de extração de texto")
+    parser.add_argument("--comparar-backends", action="store_true", help="Mede vazão e concordância de texto entre os backends")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Rodadas do conjunto de perguntas")
+    parser.add_argument("--latencia-llm-ms", type=float, default=0.0, help="Latência simulada do OpenRouter offline")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NOVO"), help="Compara dois resultados salvos")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    resultado = executar_benchmark(args)
+    caminho = salvar_resultado(resultado)
+    print(json.dumps(resultado["metricas"], indent=2, ensure_ascii=False))
+    print(f"Resultado salvo em '{caminho}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/corpus_sintetico.py
+# Gera um corpus determinístico de PDFs que imitam editais de fomento (texto corrido,
+# seções numeradas, tabela de cronograma ETAPAS/DATAS e páginas institucionais) e o arquivo de
+# metadados correspondente (mesmo formato do cached_online_grants.json), para que título, agência,
+# prazo e URL dos chunks e as respostas por metadados não dependam do último scraping real.
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+from fpdf import FPDF
+
+AGENCIAS = ["CNPq", "CAPES", "FINEP", "FAPESP"]
+
+PARAGRAFOS = [
+    "O presente edital tem por objetivo apoiar projetos de pesquisa científica, tecnológica e de inovação "
+    "que visem contribuir significativamente para o desenvolvimento do país.",
+    "Poderão submeter propostas pesquisadores vinculados a instituições de ensino superior e institutos de pesquisa, "
+    "públicos ou privados sem fins lucrativos.",
+    "As propostas deverão ser submetidas exclusivamente pela plataforma eletrônica, até a data limite indicada no cronograma.",
+    "O valor global da chamada é de R$ {valor} milhões, a serem liberados de acordo com a disponibilidade orçamentária.",
+    "A vigência do projeto será de até {meses} meses, contados a partir da assinatura do termo de outorga.",
+    "Os critérios de seleção incluem mérito técnico-científico, adequação orçamentária e qualificação da equipe executora.",
+    "A instituição executora deverá apresentar contrapartida não financeira, conforme regulamento.",
+    "O resultado da seleção será divulgado na página da agência e publicado no Diário Oficial da União.",
+    "Itens financiáveis: material de consumo, serviços de terceiros, passagens, diárias e equipamentos.",
+    "Não serão aceitas propostas submetidas após o prazo ou em desacordo com as condições deste edital.",
+]
+
+SECOES = [
+    "1. OBJETIVO", "2. REQUISITOS DE ELEGIBILIDADE", "3. RECURSOS FINANCEIROS", "4. SUBMISSÃO DE PROPOSTAS",
+    "5. CRITÉRIOS DE SELEÇÃO", "6. RESULTADO", "7. VIGÊNCIA", "8. DISPOSIÇÕES GERAIS",
+]
+
+ETAPAS = [
+    "Lançamento da chamada", "Prazo para impugnação", "Data limite para submissão das propostas",
+    "Divulgação do resultado preliminar", "Prazo para recurso", "Divulgação do resultado final",
+    "Contratação das propostas aprovadas",
+]
+
+METADADOS_FILENAME = "editais_sinteticos.json"
+ETAPA_PRAZO = "Data limite para submissão das propostas"
+
+PAGINA_INSTITUCIONAL = (
+    "Ouvidoria: atendimento ao cidadão pelo endereço eletrônico e pelos canais de contato. "
+    "Endereço: Rua da Esplanada, Bloco A, Brasília - DF. Biblioteca e expediente de segunda a sexta-feira."
+)
+
+
+def _data(rng: random.Random) -> str:
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025"
+
+
+def _gerar_edital(caminho: str, numero: int, paginas: int, rng: random.Random) -> Dict[str, Any]:
+    """Grava o PDF do edital e devolve seus metadados (title, agency, deadline, url)."""
+    agencia = rng.choice(AGENCIAS)
+    prazo = ""
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_font("Arial", size=11)
+
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 14)
+    pdf.multi_cell(0, 8, f"EDITAL {agencia} Nº {numero}/2025 - CHAMADA PÚBLICA DE APOIO À PESQUISA")
+    pdf.set_font("Arial", size=11)
+
+    for pagina in range(1, paginas):
+        if pagina == paginas - 1 and rng.random() < 0.5:
+            pdf.add_page()
+            pdf.multi_cell(0, 6, PAGINA_INSTITUCIONAL)
+            continue
+        if pagina == 1:
+            pdf.add_page()
+            pdf.multi_cell(0, 7, "CRONOGRAMA")
+            pdf.set_font("Arial", "B", 11)
+            pdf.cell(110, 8, "ETAPAS", border=1)
+            pdf.cell(60, 8, "DATAS", border=1, ln=1)
+            pdf.set_font("Arial", size=11)
+            for etapa in ETAPAS:
+                data = _data(rng)
+                if etapa == ETAPA_PRAZO:
+                    prazo = data
+                pdf.cell(110, 8, etapa, border=1)
+                pdf.cell(60, 8, data, border=1, ln=1)
+            continue
+        pdf.add_page()
+        for secao in rng.sample(SECOES, 3):
+            pdf.set_font("Arial", "B", 11)
+            pdf.multi_cell(0, 7, secao)
+            pdf.set_font("Arial", size=11)
+            for paragrafo in rng.sample(PARAGRAFOS, 4):
+                pdf.multi_cell(0, 6, paragrafo.format(valor=rng.randint(1, 50), meses=rng.choice([12, 24, 36])))
+
+    pdf.output(caminho)
+    return {
+        "title": f"Edital sintético {numero:03d} - {agencia} Nº {numero}/2025",
+        "agency": agencia,
+        "deadline": prazo,
+        "url": f"https://editais.exemplo.invalid/{agencia.lower()}/edital-{numero}-2025",
+    }
+
+
+def gerar_corpus(diretorio: str, editais: int = 20, paginas: int = 6, seed: int = 42) -> List[str]:
+    """
+    Gera `editais` PDFs com `paginas` páginas cada em `diretorio` e devolve os caminhos.
+    Os metadados dos editais gerados são gravados em `diretorio`/METADADOS_FILENAME.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    rng = random.Random(seed)
+    caminhos = []
+    metadados = []
+    for numero in range(1, editais + 1):
+        caminho = os.path.join(diretorio, f"edital_sintetico_{numero:03d}.pdf")
+        metadados.append(_gerar_edital(caminho, numero, max(paginas, 2), rng))
+        caminhos.append(caminho)
+    with open(os.path.join(diretorio, METADADOS_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(metadados, f, indent=2, ensure_ascii=False)
+    return caminhos
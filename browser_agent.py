@@ -14,6 +14,7 @@ from browser_use import Agent
 from langchain_openai import ChatOpenAI
 
 from edital_manager import manage_editals_cache 
+from instrumentacao import instrumentar, contar
 
 # Sua classe ChatOpenRouter personalizada (mantida como está)
 class ChatOpenRouter(ChatOpenAI):
@@ -37,23 +38,56 @@ class ChatOpenRouter(ChatOpenAI):
             **kwargs
         )
 
-def run_fomento_search_agent() -> List[Dict[str, Any]]:
+# Páginas de chamadas de cada agência que o agente deve visitar
+AGENCIAS_FOMENTO: Dict[str, str] = {
+    "CNPq": "http://memoria2.cnpq.br/web/guest/chamadas-publicas",
+    "CAPES": "https://www.gov.br/capes/pt-br/assuntos/editais-e-resultados-capes",
+    "FINEP": "http://www.finep.gov.br/chamadas-publicas/chamadaspublicas?situacao=aberta",
+    "FAPESP": "https://fapesp.br/chamadas/",
+}
+
+# Diretório do cache HTTP em disco compartilhado com as sessões da WebUI e da deep research
+# (ver src/browser/http_cache.py). Sem ele, o agente usa o navegador padrão do browser-use.
+HTTP_CACHE_DIR = os.getenv("BROWSER_HTTP_CACHE_DIR")
+
+def _criar_navegador_com_cache():
+    """Devolve (navegador, contexto) com o cache HTTP ativo, ou (None, None) se o cache não estiver configurado."""
+    if not HTTP_CACHE_DIR:
+        return None, None
+    from browser_use.browser.browser import BrowserConfig
+    from src.browser.custom_browser import CustomBrowser
+    from src.browser.custom_context import CustomBrowserContext, CustomBrowserContextConfig
+
+    navegador = CustomBrowser(config=BrowserConfig())
+    contexto = CustomBrowserContext(
+        browser=navegador,
+        config=CustomBrowserContextConfig(force_new_context=True, http_cache_dir=HTTP_CACHE_DIR),
+    )
+    print(f"Cache HTTP do navegador ativo em '{HTTP_CACHE_DIR}'.")
+    return navegador, contexto
+
+@instrumentar("descoberta.agente")
+def run_fomento_search_agent(agencias: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Executa o agente de busca de editais.
+    Se `agencias` for informado, apenas as páginas dessas agências (chaves de AGENCIAS_FOMENTO) são visitadas.
+    """
+    nomes_agencias = agencias if agencias is not None else list(AGENCIAS_FOMENTO)
+    links_agencias = "\n".join(f"    [{AGENCIAS_FOMENTO[nome]}];" for nome in nomes_agencias if nome in AGENCIAS_FOMENTO)
+
     llm = ChatOpenRouter(
         model_name="google/gemini-2.0-flash-lite-001", # Modelo mantido
         temperature=0.3,
     )
 
-    task_description = """
+    task_description = f"""
     Você é um assistente especializado em encontrar editais de fomento para instituições de ensino.
     Sua tarefa é navegar na internet para encontrar editais de fomento que estejam ATUALMENTE ABERTOS e que sejam direcionados a INSTITUIÇÕES DE ENSINO (universidades, escolas, institutos de pesquisa).
 
     Comece pesquisando em sites conhecidos de agências de fomento brasileiras ou grandes universidades.
     Acesse obrigatoriamente TODOS os seguintes links:
 
-    [http://memoria2.cnpq.br/web/guest/chamadas-publicas];
-    [https://www.gov.br/capes/pt-br/assuntos/editais-e-resultados-capes];
-    [http://www.finep.gov.br/chamadas-publicas/chamadaspublicas?situacao=aberta];
-    [https://fapesp.br/chamadas/]
+{links_agencias}
 
     IMPORTANTE: Retorne APENAS links diretos de editais específicos de fomento abertos. NÃO retorne páginas institucionais das agências (ex: não retornar "https://www.gov.br/cnpq/pt-br", mas sim o link direto do edital, como "https://www.gov.br/cnpq/pt-br/editais/resultado/2025/edital-12345" ou "https://fapesp.br/edital/2025/01"). O link deve apontar diretamente para o edital específico, seja PDF ou página detalhada do edital, e não para a página principal da agência.
 
@@ -72,14 +106,28 @@ def run_fomento_search_agent() -> List[Dict[str, Any]]:
     AO FINAL DA TAREFA, RETORNE UMA ÚNICA SAÍDA JSON CONTENDO UMA LISTA DE OBJETOS, ONDE CADA OBJETO REPRESENTA UM EDITAL COM AS CHAVES 'title', 'agency', 'deadline', E 'url'.
     """
 
+    navegador, contexto = _criar_navegador_com_cache()
     agent = Agent(
         task=task_description,
         llm=llm,
         max_actions_per_step=10, # Aumentado
+        browser=navegador,
+        browser_context=contexto,
     )
 
+    async def executar_agente():
+        try:
+            return await agent.run(max_steps=50)
+        finally:
+            # Navegador injetado: o Agent não o fecha sozinho
+            if contexto is not None:
+                await contexto.close()
+                await navegador.close()
+
     print("Iniciando a busca online por editais de fomento com o Browser-Use...")
-    result_history = asyncio.run(agent.run(max_steps=50))  # Torna a chamada síncrona
+    result_history = asyncio.run(executar_agente())  # Torna a chamada síncrona
+    contar("agente_passos", result_history.number_of_steps())
+    contar("tokens_entrada_agente", result_history.total_input_tokens())
 
     final_content_string = ""
     # Esta variável agora é o resultado do melhor JSON encontrado no parsing principal, ou vazio
@@ -226,5 +274,7 @@ def run_fomento_search_agent() -> List[Dict[str, Any]]:
 
     # --- CHAMA A FUNÇÃO CENTRALIZADA PARA GERENCIAR O CACHE ---
     final_filtered_editals: List[Dict[str, Any]] = manage_editals_cache(final_extracted_grants)
+    contar("editais_extraidos", len(final_extracted_grants))
+    contar("editais_abertos", len(final_filtered_editals))
 
     return final_filtered_editals
\ No newline at end of file
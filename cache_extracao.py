@@ -0,0 +1,117 @@
+# cache_extracao.py
+# Cache persistente da extração bruta de páginas de PDF (texto, tabelas e dados de layout)
+# e do texto reconhecido por OCR em páginas escaneadas (ver ocr_paginas.py).
+# A chave é o hash do conteúdo do PDF + a versão do extrator, então alterar as heurísticas de
+# filtragem/chunking do indexador não obriga a re-extrair os PDFs; trocar de extrator, sim.
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, List, Optional
+
+CACHE_EXTRACAO_DB = os.getenv("CACHE_EXTRACAO_DB", "cache_extracao.sqlite3")
+
+def cache_desativado() -> bool:
+    return os.getenv("CACHE_EXTRACAO_DESATIVADO") == "1"
+
+def _comprimir(dados: Any) -> bytes:
+    return zlib.compress(json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+def _descomprimir(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class CacheExtracao:
+    """
+    Guarda, por PDF (hash SHA-256 do conteúdo) e versão do extrator, a lista de páginas extraídas.
+    Cada página é um dict JSON (ex.: {"text": ..., "tables": ..., "largura": ...}) comprimido com zlib.
+    Um PDF só é considerado em cache quando todas as suas páginas foram gravadas.
+    """
+    def __init__(self, caminho: str = CACHE_EXTRACAO_DB):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documentos ("
+                " hash TEXT NOT NULL, versao TEXT NOT NULL, paginas INTEGER NOT NULL,"
+                " PRIMARY KEY (hash, versao))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS paginas ("
+                " hash TEXT NOT NULL, versao TEXT NOT NULL, pagina INTEGER NOT NULL, dados BLOB NOT NULL,"
+                " PRIMARY KEY (hash, versao, pagina))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr ("
+                " hash_pagina TEXT NOT NULL, versao TEXT NOT NULL, texto BLOB NOT NULL,"
+                " PRIMARY KEY (hash_pagina, versao))"
+            )
+
+    def carregar(self, hash_pdf: str, versao: str) -> Optional[List[Dict[str, Any]]]:
+        """Devolve as páginas do PDF em ordem, ou None se o PDF não estiver (completo) no cache."""
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT paginas FROM documentos WHERE hash = ? AND versao = ?", (hash_pdf, versao)
+            ).fetchone()
+            if linha is None:
+                return None
+            blobs = self._conn.execute(
+                "SELECT dados FROM paginas WHERE hash = ? AND versao = ? ORDER BY pagina", (hash_pdf, versao)
+            ).fetchall()
+        if len(blobs) != linha[0]:
+            return None
+        return [_descomprimir(blob) for (blob,) in blobs]
+
+    def salvar(self, hash_pdf: str, versao: str, paginas: List[Dict[str, Any]]):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM paginas WHERE hash = ? AND versao = ?", (hash_pdf, versao))
+            self._conn.executemany(
+                "INSERT INTO paginas (hash, versao, pagina, dados) VALUES (?, ?, ?, ?)",
+                [(hash_pdf, versao, i, _comprimir(pagina)) for i, pagina in enumerate(paginas)],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documentos (hash, versao, paginas) VALUES (?, ?, ?)",
+                (hash_pdf, versao, len(paginas)),
+            )
+
+    def carregar_ocr(self, hash_pagina: str, versao: str) -> Optional[str]:
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT texto FROM ocr WHERE hash_pagina = ? AND versao = ?", (hash_pagina, versao)
+            ).fetchone()
+        return _descomprimir(linha[0]) if linha else None
+
+    def salvar_ocr(self, hash_pagina: str, versao: str, texto: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr (hash_pagina, versao, texto) VALUES (?, ?, ?)",
+                (hash_pagina, versao, _comprimir(texto)),
+            )
+
+    def limpar_versoes_antigas(self, versao_atual: str) -> int:
+        """Remove entradas de outras versões do extrator. Retorna quantos PDFs foram removidos."""
+        with self._lock, self._conn:
+            removidos = self._conn.execute("DELETE FROM documentos WHERE versao != ?", (versao_atual,)).rowcount
+            self._conn.execute("DELETE FROM paginas WHERE versao != ?", (versao_atual,))
+        return removidos
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache_padrao: Optional[CacheExtracao] = None
+_cache_padrao_lock = threading.Lock()
+
+def obter_cache() -> Optional[CacheExtracao]:
+    """Cache compartilhado do processo (None se desativado via CACHE_EXTRACAO_DESATIVADO=1)."""
+    global _cache_padrao
+    if cache_desativado():
+        return None
+    with _cache_padrao_lock:
+        if _cache_padrao is None:
+            _cache_padrao = CacheExtracao(CACHE_EXTRACAO_DB)
+        return _cache_padrao
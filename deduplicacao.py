@@ -0,0 +1,113 @@
+# deduplicacao.py
+# Supressão de chunks quase duplicados antes do embedding.
+# O indexador pode gerar, para a mesma página, o texto inteiro, linhas de seção, linhas de prioridade
+# e pedaços de 500 caracteres que se sobrepõem. Aqui cada chunk recebe uma SimHash de 64 bits sobre
+# shingles de palavras; chunks a poucos bits de distância de um já mantido (do mesmo arquivo) são
+# descartados, assim como trechos contidos integralmente em outro chunk da mesma página.
+import hashlib
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from instrumentacao import contar
+
+TAMANHO_SHINGLE = 3
+# Distância de Hamming máxima (em 64 bits) para considerar dois chunks quase iguais.
+# Em chunks de poucas centenas de palavras, trocar uma palavra já custa ~5 bits; textos distintos ficam perto de 32.
+LIMIAR_HAMMING_PADRAO = int(os.getenv("DEDUP_LIMIAR_HAMMING", "6"))
+LIMIAR_HAMMING_POR_TIPO: Dict[str, int] = {}
+# Tipos que nunca são descartados (e não servem de referência para descartar outros)
+TIPOS_SEMPRE_MANTIDOS = {"cronograma_principal"}
+# Com limiar <= FAIXAS - 1, duas SimHashes próximas têm ao menos uma das faixas idêntica (casa dos pombos),
+# então só os chunks que compartilham alguma faixa precisam ser comparados
+FAIXAS = 8
+BITS_FAIXA = 64 // FAIXAS
+
+
+def _normalizar(texto: str) -> str:
+    texto = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII').lower()
+    return re.sub(r'\s+', ' ', re.sub(r'[^a-z0-9 ]+', ' ', texto)).strip()
+
+def simhash(texto_normalizado: str, tamanho_shingle: int = TAMANHO_SHINGLE) -> int:
+    palavras = texto_normalizado.split()
+    if len(palavras) < tamanho_shingle:
+        shingles = [" ".join(palavras)] if palavras else []
+    else:
+        shingles = [" ".join(palavras[i:i + tamanho_shingle]) for i in range(len(palavras) - tamanho_shingle + 1)]
+    pesos = [0] * 64
+    for shingle, frequencia in Counter(shingles).items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            pesos[bit] += frequencia if (h >> bit) & 1 else -frequencia
+    return sum(1 << bit for bit in range(64) if pesos[bit] > 0)
+
+def _faixas(assinatura: int) -> List[Tuple[int, int]]:
+    mascara = (1 << BITS_FAIXA) - 1
+    return [(i, (assinatura >> (i * BITS_FAIXA)) & mascara) for i in range(FAIXAS)]
+
+def _limiar(tipo: str) -> int:
+    return LIMIAR_HAMMING_POR_TIPO.get(tipo, LIMIAR_HAMMING_PADRAO)
+
+
+def suprimir_quase_duplicados(chunks: List[Document]) -> List[Document]:
+    """
+    Remove chunks quase duplicados dentro de cada arquivo (metadata 'source'), preservando a ordem original.
+    Chunks maiores têm preferência, então o texto da página inteira vence as linhas de seção contidas nele.
+    Imprime quantos chunks foram descartados por arquivo.
+    """
+    if os.getenv("DEDUP_DESATIVADO") == "1" or not chunks:
+        return chunks
+
+    normalizados = [_normalizar(c.page_content) for c in chunks]
+    por_fonte: Dict[str, List[int]] = defaultdict(list)
+    for idx, chunk in enumerate(chunks):
+        por_fonte[chunk.metadata.get("source", "")].append(idx)
+
+    descartados = set()
+    relatorio: Dict[str, Counter] = {}
+    for fonte, indices in por_fonte.items():
+        # Maiores primeiro: servem de referência para os menores
+        indices = sorted(indices, key=lambda i: len(normalizados[i]), reverse=True)
+        assinaturas: Dict[int, int] = {}
+        baldes: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        mantidos_por_pagina: Dict[object, List[int]] = defaultdict(list)
+        removidos_por_tipo: Counter = Counter()
+
+        for idx in indices:
+            tipo = chunks[idx].metadata.get("type", "")
+            texto = normalizados[idx]
+            pagina = chunks[idx].metadata.get("page")
+            if tipo in TIPOS_SEMPRE_MANTIDOS:
+                continue
+            if not texto:
+                descartados.add(idx)
+                removidos_por_tipo[tipo] += 1
+                continue
+
+            contido = any(texto in normalizados[j] for j in mantidos_por_pagina[pagina])
+            assinatura = simhash(texto)
+            candidatos = {j for faixa in _faixas(assinatura) for j in baldes[faixa]}
+            limiar = _limiar(tipo)
+            quase_igual = any(bin(assinatura ^ assinaturas[j]).count("1") <= limiar for j in candidatos)
+            if contido or quase_igual:
+                descartados.add(idx)
+                removidos_por_tipo[tipo] += 1
+                continue
+
+            assinaturas[idx] = assinatura
+            for faixa in _faixas(assinatura):
+                baldes[faixa].append(idx)
+            mantidos_por_pagina[pagina].append(idx)
+
+        if removidos_por_tipo:
+            relatorio[fonte] = removidos_por_tipo
+
+    for fonte, removidos_por_tipo in relatorio.items():
+        total = len(por_fonte[fonte])
+        print(f"Deduplicação '{fonte}': {sum(removidos_por_tipo.values())} de {total} chunks descartados ({dict(removidos_por_tipo)}).")
+    contar("chunks_duplicados_removidos", len(descartados))
+    return [c for idx, c in enumerate(chunks) if idx not in descartados]
@@ -3,109 +3,217 @@ import os
 import requests
 import re
 import json
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, unquote
 import certifi # Para garantir a verificação SSL
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Optional
 
-from bs4 import BeautifulSoup # Importar BeautifulSoup (pip install beautifulsoup4)
-from fpdf import FPDF # Importar FPDF para salvar texto como PDF
+from bs4 import BeautifulSoup, Tag # Importar BeautifulSoup (pip install beautifulsoup4)
+from main_content_extractor import MainContentExtractor
 import html
+import unicodedata
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import urllib3
+
+from instrumentacao import instrumentar, contar
 
 # --- Funções para Download de PDF ---
 
+HEADERS_DOWNLOAD = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+TIMEOUT_DOWNLOAD = 60
+# Arquivos maiores que isso são abortados (via Content-Length ou durante o streaming)
+TAMANHO_MAXIMO_PDF = int(os.getenv("DOWNLOAD_MAX_MB", "100")) * 1024 * 1024
+# O chunk começa pequeno (para validar o header rápido) e dobra até o máximo em arquivos grandes
+CHUNK_INICIAL = 64 * 1024
+CHUNK_MAXIMO = 1024 * 1024
+# Quantos links PDF de uma página HTML são baixados ao mesmo tempo
+MAX_LINKS_CONCORRENTES = 4
+# Alguns servidores enviam lixo/BOM antes do header; o padrão PDF tolera até 1024 bytes
+JANELA_MAGIC_PDF = 1024
+
+class _DownloadAbortado(Exception):
+    pass
+
+def _salvar_pdf_stream(response: requests.Response, filename: str, cancelado: Optional[threading.Event] = None) -> Optional[str]:
+    """
+    Grava a resposta (aberta com stream=True) em um arquivo temporário ao lado de `filename`.
+    Aborta cedo se os primeiros bytes não forem de um PDF, se o tamanho passar de TAMANHO_MAXIMO_PDF
+    ou se `cancelado` for sinalizado. Retorna o caminho temporário (o chamador faz o os.replace) ou None.
+    """
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit() and int(content_length) > TAMANHO_MAXIMO_PDF:
+        print(f"AVISO: '{response.url}' tem {int(content_length) / 1e6:.1f} MB, acima do limite. Pulando.")
+        response.close()
+        return None
+
+    temp_path = f"{filename}.{os.getpid()}.{threading.get_ident()}.part"
+    tamanho_chunk = CHUNK_INICIAL
+    total = 0
+    try:
+        with open(temp_path, 'wb') as pdf_file:
+            primeiro = response.raw.read(JANELA_MAGIC_PDF, decode_content=True)
+            if b'%PDF' not in primeiro:
+                print(f"ERRO: '{response.url}' não é um PDF válido (header diferente de %PDF). Abortando download.")
+                raise _DownloadAbortado()
+            chunk = primeiro
+            while chunk:
+                if cancelado is not None and cancelado.is_set():
+                    raise _DownloadAbortado()
+                total += len(chunk)
+                if total > TAMANHO_MAXIMO_PDF:
+                    print(f"AVISO: '{response.url}' passou de {TAMANHO_MAXIMO_PDF / 1e6:.0f} MB. Abortando download.")
+                    raise _DownloadAbortado()
+                pdf_file.write(chunk)
+                contar("bytes_baixados", len(chunk))
+                chunk = response.raw.read(tamanho_chunk, decode_content=True)
+                tamanho_chunk = min(tamanho_chunk * 2, CHUNK_MAXIMO)
+        return temp_path
+    except (_DownloadAbortado, requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+        if not isinstance(e, _DownloadAbortado):
+            print(f"ERRO: Falha durante o download de '{response.url}': {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return None
+    finally:
+        response.close()
+
+def _baixar_candidato(pdf_link: str, filename: str, cancelado: threading.Event) -> Optional[str]:
+    if cancelado.is_set():
+        return None
+    print(f"[DEBUG] Tentando baixar PDF do link: {pdf_link}")
+    try:
+        pdf_response = requests.get(pdf_link, stream=True, timeout=TIMEOUT_DOWNLOAD, headers=HEADERS_DOWNLOAD, verify=certifi.where())
+        pdf_response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"ERRO: Falha ao baixar PDF do link '{pdf_link}': {e}")
+        return None
+    temp_path = _salvar_pdf_stream(pdf_response, filename, cancelado)
+    if temp_path and cancelado.is_set():
+        # Outro link já venceu enquanto este terminava
+        os.remove(temp_path)
+        return None
+    return temp_path
+
+def _baixar_primeiro_pdf_valido(pdf_links: List[str], filename: str) -> Optional[str]:
+    """
+    Baixa os links candidatos (já ordenados por ranking) em paralelo. O PDF válido de melhor
+    ranking é movido para `filename` e os demais downloads são cancelados. Retorna o link vencedor ou None.
+    """
+    cancelado = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=min(MAX_LINKS_CONCORRENTES, len(pdf_links)))
+    futures = [executor.submit(_baixar_candidato, link, filename, cancelado) for link in pdf_links]
+    vencedor = None
+    try:
+        # Percorre na ordem do ranking: um candidato pior que termina antes espera os melhores
+        for link, future in zip(pdf_links, futures):
+            temp_path = future.result()
+            if temp_path:
+                cancelado.set()
+                os.replace(temp_path, filename)
+                vencedor = link
+                break
+    finally:
+        cancelado.set()
+        for future in futures:
+            future.add_done_callback(_descartar_temporario)
+        # Não espera os perdedores: eles abortam no próximo chunk e apagam o próprio temporário
+        executor.shutdown(wait=False, cancel_futures=True)
+    return vencedor
+
+def _descartar_temporario(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    temp_path = future.result()
+    if temp_path and os.path.exists(temp_path):
+        os.remove(temp_path)
+
 # Função auxiliar para sanitizar nomes de arquivos
 def _sanitize_filename(title: str) -> str:
     """Remove caracteres inválidos de nome de arquivo."""
     return re.sub(r'[\\/:*?"<>|]', '', title).strip()[:150] # Trunca para evitar nomes muito longos
 
-def save_html_as_pdf(url: str, filename: str) -> bool:
-    print(f"[DEBUG] Iniciando extração de texto da página HTML: {url}")
+def _normalizar_texto_extraido(texto: str) -> str:
+    """Decodifica entidades HTML, remove espaços sobrando e colapsa linhas em branco consecutivas."""
+    texto = html.unescape(texto).replace('\r\n', '\n').replace('\xa0', ' ')
+    linhas = [re.sub(r'[ \t]+', ' ', linha).strip() for linha in texto.split('\n')]
+    normalizado = re.sub(r'\n{3,}', '\n\n', '\n'.join(linhas))
+    return normalizado.strip() + '\n'
+
+@instrumentar("download.html_para_texto")
+def save_html_as_text(url: str, filename: str, html_content: Optional[str] = None) -> bool:
+    """
+    Extrai o conteúdo principal de uma página HTML de edital e salva como markdown UTF-8 em `filename`.
+    O arquivo é indexado diretamente pelo indexador, sem passar por PDF.
+    Se `html_content` for informado, a página não é baixada de novo.
+    """
+    print(f"[DEBUG] Iniciando extração do conteúdo principal da página HTML: {url}")
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=60, headers=headers, verify=certifi.where())
-        print(f"[DEBUG] Status code da página: {response.status_code}")
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
+        headers = HEADERS_DOWNLOAD
+        if html_content is None:
+            response = requests.get(url, timeout=60, headers=headers, verify=certifi.where())
+            print(f"[DEBUG] Status code da página: {response.status_code}")
+            response.raise_for_status()
+            html_content = response.text
+
         # --- Detecta e segue redirecionamento via meta refresh ---
-        from bs4 import Tag
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(html_content, 'html.parser')
         meta_refresh = soup.find('meta', attrs={'http-equiv': 'refresh'})
         if meta_refresh and isinstance(meta_refresh, Tag):
             content = meta_refresh.get('content', '')
             if isinstance(content, str) and "URL=" in content:
-                import re
                 match = re.search(r"URL='([^']+)'", content)
                 if match:
-                    redirect_url = match.group(1)
+                    redirect_url = urljoin(url, match.group(1))
                     print(f"[DEBUG] Detectado meta refresh para: {redirect_url}")
                     response = requests.get(redirect_url, timeout=60, headers=headers, verify=certifi.where())
                     print(f"[DEBUG] Status code da página redirecionada: {response.status_code}")
                     response.raise_for_status()
-                    soup = BeautifulSoup(response.text, 'html.parser')
-        # Salva o HTML bruto para debug após redirecionamento
-        with open(f"html_debug_{os.path.basename(filename).replace('.pdf','.html')}", "w", encoding="utf-8") as f:
-            f.write(response.text)
-        print(f"[DEBUG] HTML bruto salvo em html_debug_{os.path.basename(filename).replace('.pdf','.html')}")
-        # Remove tags irrelevantes como <noscript>, <script>, <style>
-        for tag in soup(['noscript', 'script', 'style']):
-            tag.decompose()
-        
-        # Extrai texto de tags relevantes
-        tags = ['main', 'article', 'section', 'div', 'p', 'li', 'span']
-        tag_texts = []
-        for tag in tags:
-            found = soup.find_all(tag)
-            print(f"[DEBUG] Encontradas {len(found)} tags <{tag}> na página.")
-            tag_texts.extend([t.get_text(separator=' ', strip=True) for t in found if t.get_text(strip=True)])
-        combined_text = '\n'.join(tag_texts)
-        print(f"[DEBUG] Tamanho do texto combinado das tags: {len(combined_text)}")
-        if not combined_text.strip():
-            combined_text = soup.get_text(separator='\n', strip=True)
-            print(f"[DEBUG] Usando texto geral da página. Tamanho: {len(combined_text)}")
-        # Limpa e normaliza para Latin-1 e decodifica entidades HTML
-        def to_latin1(txt):
-            txt = html.unescape(txt)
-            return txt.encode('latin-1', errors='replace').decode('latin-1')
-        page_text_latin1 = '\n'.join([to_latin1(line) for line in combined_text.split('\n') if line.strip()])
-        print(f"[DEBUG] Tamanho do texto final para PDF: {len(page_text_latin1)}")
-        if len(page_text_latin1.strip()) < 10:
-            print(f"AVISO: Texto extraído da página {url} é muito pequeno para salvar como PDF. Pulando.")
-            return False
-        print(f"[DEBUG] Texto salvo no PDF (primeiros 300 chars):\n{page_text_latin1[:300]}")
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        # Usa fonte Arial Latin-1, mas se houver erro, tenta fonte Courier
+                    html_content = response.text
+                    soup = None
+
+        # Extrai só o conteúdo principal (sem menus, rodapés e textos repetidos de tags aninhadas)
         try:
-            pdf.set_font("Arial", size=12)
-        except RuntimeError:
-            pdf.set_font("Courier", size=12)
-        for line in page_text_latin1.split('\n'):
-            if line.strip():
-                try:
-                    pdf.multi_cell(0, 10, line)
-                except Exception as e:
-                    print(f"[DEBUG] Erro ao adicionar linha ao PDF: {e}. Linha: {line}")
-        pdf.output(filename)
-        print(f"INFO: Texto da página '{url}' salvo como PDF em '{filename}'.")
+            texto = MainContentExtractor.extract(html_content, output_format="markdown")
+        except Exception as e:
+            print(f"AVISO: MainContentExtractor falhou para {url}: {e}. Usando texto geral da página.")
+            texto = ""
+        if not texto or not texto.strip():
+            soup = soup or BeautifulSoup(html_content, 'html.parser')
+            for tag in soup(['noscript', 'script', 'style']):
+                tag.decompose()
+            texto = soup.get_text(separator='\n', strip=True)
+            print(f"[DEBUG] Usando texto geral da página. Tamanho: {len(texto)}")
+
+        texto = _normalizar_texto_extraido(texto)
+        if len(texto.strip()) < 10:
+            print(f"AVISO: Texto extraído da página {url} é muito pequeno para ser salvo. Pulando.")
+            return False
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        contar("bytes_baixados", len(texto.encode('utf-8')))
+        print(f"INFO: Conteúdo da página '{url}' salvo como texto em '{filename}' ({len(texto)} caracteres).")
         return True
     except Exception as e:
-        print(f"ERRO ao salvar texto da página como PDF: {e}")
+        print(f"ERRO ao salvar o conteúdo da página como texto: {e}")
         return False
 
-def download_pdf(url: str, filename: str) -> bool:
-    print(f"[DEBUG] Iniciando download: {url} -> {filename}")
+@instrumentar("download.arquivo")
+def download_pdf(url: str, filename: str, titulo: str = "") -> Optional[str]:
     """
     Baixa um PDF de uma URL para um arquivo.
-    Retorna True em caso de sucesso, False em caso de falha.
+    Se a URL for uma página HTML sem links para PDF, o conteúdo principal da página é salvo
+    como markdown ao lado (mesmo nome, extensão .md).
+    `titulo` (o título do edital) ajuda a escolher o PDF certo entre os links de uma página.
+    Retorna o caminho do arquivo salvo em caso de sucesso, None em caso de falha.
     """
+    print(f"[DEBUG] Iniciando download: {url} -> {filename}")
     # Adicionando tratamento para URLs que podem ser 'Link Permanente' ou vazias
     if not url or url.lower() == 'link permanente' or url.lower() == 'url desconhecida':
         print(f"AVISO: URL inválida ou genérica para '{filename}'. Pulando download.")
-        return False
+        return None
 
     original_url = url # Guardar a URL original para logs
     if not url.startswith('http'):
@@ -124,135 +232,177 @@ def download_pdf(url: str, filename: str) -> bool:
             print(f"DEBUG: URL relativa resolvida para: {url}")
         else:
             print(f"AVISO: Não foi possível inferir a URL base para '{filename}' com link relativo '{original_url}'. Pulando.")
-            return False
+            return None
 
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        headers = HEADERS_DOWNLOAD
         # Adiciona verify=certifi.where() para usar o bundle de certificados mais atualizado
         # Isso ajuda a resolver SSLError
-        response = requests.get(url, stream=True, timeout=60, headers=headers, verify=certifi.where())
+        response = requests.get(url, stream=True, timeout=TIMEOUT_DOWNLOAD, headers=headers, verify=certifi.where())
         print(f"[DEBUG] Status code da resposta: {response.status_code}")
         response.raise_for_status() # Lança um erro para status HTTP 4xx/5xx
 
         content_type = response.headers.get('Content-Type', '').lower()
         print(f"[DEBUG] Content-Type da resposta: {content_type}")
 
-        if 'application/pdf' in content_type:
-            print(f"[DEBUG] Detectado PDF direto. Salvando...")
-            # Se já é um PDF direto, baixa
-            with open(filename, 'wb') as pdf_file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    pdf_file.write(chunk)
-            # Verificação extra: arquivo baixado é realmente um PDF?
-            print(f"[DEBUG] Verificando header do PDF salvo...")
-            try:
-                with open(filename, 'rb') as f:
-                    header = f.read(4)
-                if header != b'%PDF':
-                    print(f"ERRO: '{filename}' não é um PDF válido (header diferente de %PDF). Removendo arquivo.")
-                    os.remove(filename)
-                    return False
-            except Exception as e:
-                print(f"ERRO ao verificar PDF '{filename}': {e}")
-                os.remove(filename)
-                return False
+        if 'text/html' not in content_type:
+            # PDF direto (ou application/octet-stream etc.): os bytes iniciais decidem se é mesmo um PDF
+            print(f"[DEBUG] Resposta não-HTML. Validando e salvando como PDF...")
+            temp_path = _salvar_pdf_stream(response, filename)
+            if not temp_path:
+                return None
+            os.replace(temp_path, filename)
             print(f"INFO: PDF '{filename}' baixado com sucesso de {url}.")
-            return True
-        elif 'text/html' in content_type:
+            return filename
+        else:
             print(f"[DEBUG] Detectado página HTML. Buscando links para PDF...")
-            # Salva o HTML bruto para debug
-            with open(f"html_debug_{os.path.basename(filename).replace('.pdf','.html')}", "w", encoding="utf-8") as f:
-                f.write(response.text)
-            print(f"[DEBUG] HTML bruto salvo em html_debug_{os.path.basename(filename).replace('.pdf','.html')}")
             # Se é uma página HTML, tenta encontrar links para PDF dentro dela
             print(f"DEBUG: URL '{url}' é uma página HTML. Procurando links PDF...")
-            pdf_links_on_page = _find_pdf_links_on_page(response.text, url)
+            titulo = titulo or os.path.splitext(os.path.basename(filename))[0]
+            pdf_links_on_page = _find_pdf_links_on_page(response.text, url, titulo)
             print(f"[DEBUG] Links PDF encontrados: {pdf_links_on_page}")
             
             if pdf_links_on_page:
-                print(f"[DEBUG] Encontrado(s) {len(pdf_links_on_page)} link(s) PDF na página. Tentando baixar o primeiro...")
-                # Tenta baixar o primeiro PDF encontrado na página
-                for pdf_link in pdf_links_on_page:
-                    print(f"[DEBUG] Tentando baixar PDF do link: {pdf_link}")
-                    try:
-                        pdf_response = requests.get(pdf_link, stream=True, timeout=60, headers=headers, verify=certifi.where())
-                        pdf_response.raise_for_status()
-                        if 'application/pdf' in pdf_response.headers.get('Content-Type', '').lower():
-                            with open(filename, 'wb') as pdf_file:
-                                for chunk in pdf_response.iter_content(chunk_size=8192):
-                                    pdf_file.write(chunk)
-                            # Verificação extra: arquivo baixado é realmente um PDF?
-                            print(f"[DEBUG] Verificando header do PDF salvo...")
-                            try:
-                                with open(filename, 'rb') as f:
-                                    header = f.read(4)
-                                if header != b'%PDF':
-                                    print(f"ERRO: '{filename}' não é um PDF válido (header diferente de %PDF). Removendo arquivo.")
-                                    os.remove(filename)
-                                    continue
-                            except Exception as e:
-                                print(f"ERRO ao verificar PDF '{filename}': {e}")
-                                os.remove(filename)
-                                continue
-                            print(f"INFO: PDF '{filename}' baixado com sucesso de {pdf_link} (encontrado na página).")
-                            return True
-                        else:
-                            print(f"AVISO: Link '{pdf_link}' não é PDF. (Content-Type: {pdf_response.headers.get('Content-Type','')}).")
-                    except requests.exceptions.RequestException as e:
-                        print(f"ERRO: Falha ao baixar PDF do link '{pdf_link}' (na página {url}): {e}")
+                print(f"[DEBUG] Encontrado(s) {len(pdf_links_on_page)} link(s) PDF na página. Baixando em paralelo...")
+                pdf_link = _baixar_primeiro_pdf_valido(pdf_links_on_page, filename)
+                if pdf_link:
+                    print(f"INFO: PDF '{filename}' baixado com sucesso de {pdf_link} (encontrado na página).")
+                    return filename
                 print(f"AVISO: Nenhum PDF válido pôde ser baixado dos links encontrados na página {url}.")
-                return False # Falhou em baixar dos links da página
+                return None # Falhou em baixar dos links da página
             else:
-                print(f"AVISO: Nenhum link PDF encontrado na página HTML: {url}. Tentando salvar texto da página como PDF.")
-                return save_html_as_pdf(url, filename)
-        else:
-            print(f"AVISO: URL '{url}' tem Content-Type desconhecido: {content_type}. Pulando download de {filename}.")
-            return False
+                print(f"AVISO: Nenhum link PDF encontrado na página HTML: {url}. Salvando o conteúdo da página como texto.")
+                text_filename = os.path.splitext(filename)[0] + ".md"
+                return text_filename if save_html_as_text(url, text_filename, response.text) else None
 
     except requests.exceptions.SSLError as ssl_err:
         print(f"ERRO SSL: Falha ao baixar '{filename}' de '{url}': {ssl_err}")
         print("Causa provável: Problema na verificação do certificado SSL. Tente rodar 'Install Certificates.command' no seu ambiente Python.")
-        return False
+        return None
     except requests.exceptions.RequestException as e:
         print(f"ERRO: Falha ao baixar '{filename}' de '{url}': {e}")
-        return False
+        return None
     except Exception as e:
         print(f"ERRO: Erro inesperado ao processar '{filename}' de '{url}': {e}")
-        return False
+        return None
+
+# Pesos do ranking de links PDF em páginas de edital (texto do link vale o dobro do caminho da URL)
+TERMOS_POSITIVOS_LINK = {"edital": 5, "chamada": 4, "consolidad": 2, "retificad": 1}
+TERMOS_NEGATIVOS_LINK = {
+    "resultado": -4, "anexo": -3, "formulario": -4, "modelo": -3, "declaracao": -4, "planilha": -4,
+    "errata": -2, "faq": -3, "perguntas": -3, "manual": -2, "portaria": -2, "recurso": -2,
+}
+# Aplicado sobre texto normalizado, em que "-" e "_" viram espaço ("edital-12-2025" -> "edital 12 2025")
+PADRAO_NUMERO_EDITAL = re.compile(r'\b(\d{1,4})\s*[/ ]\s*(20\d{2})\b')
+# Quantos candidatos recebem HEAD e quantos seguem para download
+MAX_CANDIDATOS_HEAD = 8
+MAX_PDFS_CANDIDATOS = 3
+TAMANHO_MINIMO_EDITAL = 30 * 1024 # PDFs menores que isso costumam ser formulários ou listas
+
+def _normalizar_para_ranking(texto: str) -> str:
+    texto = unicodedata.normalize('NFKD', unquote(texto)).encode('ASCII', 'ignore').decode('ASCII').lower()
+    return re.sub(r'[^a-z0-9/]+', ' ', texto)
+
+def _pontuar_texto(texto: str, peso: float) -> float:
+    return peso * sum(
+        valor for termos in (TERMOS_POSITIVOS_LINK, TERMOS_NEGATIVOS_LINK)
+        for termo, valor in termos.items() if termo in texto
+    )
 
-def _find_pdf_links_on_page(html_content: str, base_url: str) -> List[str]:
+def _pontuar_link(texto_link: str, url: str, posicao: int, total: int, numeros_titulo: set) -> float:
+    texto = _normalizar_para_ranking(texto_link)
+    caminho = _normalizar_para_ranking(urlparse(url).path)
+    score = _pontuar_texto(texto, 1.0) + _pontuar_texto(caminho, 0.5)
+    numeros_link = {(int(n), ano) for n, ano in PADRAO_NUMERO_EDITAL.findall(f"{texto} {caminho}")}
+    if numeros_link:
+        score += 3
+        if numeros_titulo & numeros_link:
+            score += 4 # Mesmo número/ano do edital procurado
+    # Links mais acima na página costumam ser o documento principal
+    score += 1.0 - posicao / max(total, 1)
+    return score
+
+def _consultar_head(url: str) -> Dict[str, Any]:
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=15, headers=HEADERS_DOWNLOAD, verify=certifi.where())
+    except requests.exceptions.RequestException:
+        return {}
+    if response.status_code >= 400:
+        # 405 ou 403/404 só para HEAD são comuns em gov.br, CAPES e FAPs, que servem o GET normalmente;
+        # erro no HEAD não diz nada sobre o arquivo, então decide no download
+        return {}
+    content_length = response.headers.get('Content-Length', '')
+    return {
+        "status": response.status_code,
+        "content_type": response.headers.get('Content-Type', '').lower(),
+        "tamanho": int(content_length) if content_length.isdigit() else None,
+    }
+
+def _rank_pdf_links(html_content: str, base_url: str, titulo: str = "") -> List[Dict[str, Any]]:
     """
-    Analisa o conteúdo HTML de uma página e procura por links para arquivos PDF.
-    Retorna uma lista de URLs absolutas de PDFs.
+    Extrai os links PDF da página e ordena pela chance de serem o edital em si (e não anexos,
+    resultados ou formulários): texto do link, caminho da URL, posição na página e metadados de HEAD.
+    Retorna dicts {"url", "texto", "score"} do melhor para o pior, já sem candidatos inviáveis
+    (HEAD sem resposta útil mantém o candidato na ordem do ranking).
     """
     soup = BeautifulSoup(html_content, 'html.parser')
-    pdf_links = []
-    
-    # Procurar por links <a href="..."> que contenham ".pdf"
-    from bs4 import Tag
+    links: Dict[str, str] = {}
+    # Procurar por links <a href="..."> que apontem para PDF (inclui /view e /@@download do gov.br)
     for a_tag in soup.find_all('a', href=True):
         if isinstance(a_tag, Tag):
             href = a_tag.get('href')
-            if isinstance(href, str) and href.lower().endswith('.pdf'):
+            if isinstance(href, str) and '.pdf' in urlparse(href).path.lower():
                 absolute_url = urljoin(base_url, href)
-                pdf_links.append(absolute_url)
-    
-    # Você pode adicionar mais heurísticas aqui, como procurar por links em <div>s com "download"
-    # ou links que o texto seja "baixe o edital" etc., mas isso seria mais complexo.
-    
-    return list(set(pdf_links)) # Retorna links únicos
+                texto = ' '.join(filter(None, [a_tag.get_text(' ', strip=True), str(a_tag.get('title') or '')]))
+                links[absolute_url] = f"{links.get(absolute_url, '')} {texto}".strip()
+
+    numeros_titulo = {(int(n), ano) for n, ano in PADRAO_NUMERO_EDITAL.findall(_normalizar_para_ranking(titulo))}
+    candidatos = [
+        {"url": url, "texto": texto, "score": _pontuar_link(texto, url, posicao, len(links), numeros_titulo)}
+        for posicao, (url, texto) in enumerate(links.items())
+    ]
+    candidatos.sort(key=lambda c: c["score"], reverse=True)
+
+    # HEAD em paralelo só para os melhores; descarta o que já se sabe que não serve
+    topo = candidatos[:MAX_CANDIDATOS_HEAD]
+    if topo:
+        with ThreadPoolExecutor(max_workers=min(MAX_LINKS_CONCORRENTES, len(topo))) as executor:
+            heads = list(executor.map(_consultar_head, [c["url"] for c in topo]))
+        viaveis = []
+        for candidato, head in zip(topo, heads):
+            # Só descarta o que o HEAD garante que não é o PDF: página HTML ou arquivo grande demais
+            if 'text/html' in head.get("content_type", ""):
+                continue
+            tamanho = head.get("tamanho")
+            if tamanho is not None:
+                if tamanho > TAMANHO_MAXIMO_PDF:
+                    continue
+                if tamanho < TAMANHO_MINIMO_EDITAL:
+                    candidato["score"] -= 1
+            viaveis.append(candidato)
+        topo = sorted(viaveis, key=lambda c: c["score"], reverse=True)
+    return topo
+
+def _find_pdf_links_on_page(html_content: str, base_url: str, titulo: str = "") -> List[str]:
+    """
+    Analisa o conteúdo HTML de uma página e procura por links para arquivos PDF.
+    Retorna as URLs absolutas dos melhores candidatos (no máximo MAX_PDFS_CANDIDATOS), em ordem de ranking.
+    """
+    return [c["url"] for c in _rank_pdf_links(html_content, base_url, titulo)[:MAX_PDFS_CANDIDATOS]]
 
 
+@instrumentar("download")
 def download_pdfs_from_editals_json(
     editals_json_list: List[Dict[str, Any]], # Recebe uma lista de dicionários (JSON parseado)
-    download_dir: str = "pdfs_baixados"
+    download_dir: str = "pdfs_baixados",
+    forcar: bool = False
 ) -> List[str]: # <<< CORREÇÃO AQUI: O tipo de retorno deve ser List[str]
     """
     Baixa os PDFs dos editais fornecidos em uma lista de dicionários JSON.
     Cria o diretório de download se não existir.
-    Retorna a lista dos caminhos dos PDFs baixados com sucesso.
+    Com `forcar=True` baixa de novo mesmo os editais cujo arquivo já existe (editais alterados);
+    se o novo download falhar, o arquivo existente é mantido e devolvido.
+    Retorna a lista dos caminhos dos arquivos baixados com sucesso (PDFs ou .md de páginas HTML).
     """
     print(f"\n--- Iniciando o download de PDFs dos editais em JSON ---")
 
@@ -277,15 +427,22 @@ def download_pdfs_from_editals_json(
             continue
 
         file_path = os.path.join(download_dir, f"{final_title_sanitized}.pdf")
+        text_path = os.path.join(download_dir, f"{final_title_sanitized}.md")
 
-        if os.path.exists(file_path):
-            print(f"DEBUG: PDF '{final_title_sanitized}.pdf' já existe. Pulando download.")
-            successful_downloads_paths.append(file_path) # Adiciona à lista de sucessos, mesmo se já existia
+        existente = next((p for p in (file_path, text_path) if os.path.exists(p)), None)
+        if existente and not forcar:
+            print(f"DEBUG: '{os.path.basename(existente)}' já existe. Pulando download.")
+            successful_downloads_paths.append(existente) # Adiciona à lista de sucessos, mesmo se já existia
             continue
 
         print(f"DEBUG: Baixando '{final_title_sanitized}.pdf' de '{url}'...")
-        if download_pdf(url, file_path):
-            successful_downloads_paths.append(file_path) # Adiciona o caminho do novo PDF baixado
+        saved_path = download_pdf(url, file_path, title)
+        if saved_path:
+            successful_downloads_paths.append(saved_path) # Adiciona o caminho do novo arquivo baixado
+            contar("arquivos_baixados")
+        elif existente:
+            print(f"AVISO: Novo download de '{final_title_sanitized}' falhou. Mantendo '{os.path.basename(existente)}'.")
+            successful_downloads_paths.append(existente)
         else:
             # Não é mais necessário adicionar a uma lista de falhas interna, 
             # pois a função retorna apenas os caminhos dos sucessos.
@@ -1,8 +1,12 @@
 from langchain_core.embeddings import Embeddings
 from transformers import AutoTokenizer, AutoModel
+from typing import List, Optional, Tuple
+import asyncio
 import torch
 import numpy as np
 
+from instrumentacao import instrumentar, contar
+
 class HuggingFaceEmbedding(Embeddings):
     def __init__(self, model_name="sentence-transformers/all-mpnet-base-v2", device=None):
         print("Iniciando embedding...")
@@ -18,6 +22,7 @@ class HuggingFaceEmbedding(Embeddings):
 
         self.model.to(self.device)
 
+    @instrumentar("embedding.documentos")
     def embed_documents(self, texts):
         print(">>> embed_documents recebeu:", type(texts), len(texts) if hasattr(texts, "__len__") else "??")
         """
@@ -28,6 +33,7 @@ class HuggingFaceEmbedding(Embeddings):
 
         embeddings = []
         batch_size = 32  # ajuste conforme memória
+        contar("textos_embedding", len(texts))
 
         with torch.no_grad():
             for i in range(0, len(texts), batch_size):
@@ -38,6 +44,7 @@ class HuggingFaceEmbedding(Embeddings):
                     truncation=True,
                     return_tensors="pt"
                 ).to(self.device)
+                contar("tokens_embedding", int(encoded_input["attention_mask"].sum()))
 
                 model_output = self.model(**encoded_input)
 
@@ -74,3 +81,74 @@ class HuggingFaceEmbedding(Embeddings):
         return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(
             input_mask_expanded.sum(1), min=1e-9
         )
+
+
+class EmbeddingMicroBatcher:
+    """
+    Agrupa pedidos concorrentes de embedding (ex.: várias perguntas chegando na API ao mesmo tempo)
+    em um único lote enviado ao modelo, em vez de uma passada por pedido.
+    """
+    def __init__(self, embedding: HuggingFaceEmbedding, max_batch_size: int = 32, max_wait_ms: float = 10.0):
+        self.embedding = embedding
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._fila: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def iniciar(self):
+        """Cria a fila e a tarefa consumidora no event loop atual."""
+        if self._worker is None or self._worker.done():
+            self._fila = asyncio.Queue()
+            self._worker = asyncio.create_task(self._consumir_fila())
+
+    async def encerrar(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Devolve os embeddings de `texts`, possivelmente calculados junto com outros pedidos."""
+        self.iniciar()
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((list(texts), futuro))
+        return await futuro
+
+    async def _proximo_lote(self) -> List[Tuple[List[str], asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        lote = [await self._fila.get()]
+        total = len(lote[0][0])
+        prazo = loop.time() + self.max_wait
+        while total < self.max_batch_size:
+            restante = prazo - loop.time()
+            if restante <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._fila.get(), restante)
+            except asyncio.TimeoutError:
+                break
+            lote.append(item)
+            total += len(item[0])
+        return lote
+
+    async def _consumir_fila(self):
+        while True:
+            lote = await self._proximo_lote()
+            todos_textos = [texto for textos, _ in lote for texto in textos]
+            try:
+                # O modelo roda em uma thread para não bloquear o event loop
+                vetores = await asyncio.to_thread(self.embedding.embed_documents, todos_textos)
+            except Exception as e:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            inicio = 0
+            for textos, futuro in lote:
+                fim = inicio + len(textos)
+                if not futuro.done():
+                    futuro.set_result(vetores[inicio:fim])
+                inicio = fim
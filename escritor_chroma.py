@@ -0,0 +1,203 @@
+# escritor_chroma.py
+# Escrita idempotente de chunks no Chroma.
+# Os IDs dos chunks são endereçados por conteúdo (ver indexador_pdf.atribuir_ids_chunks): reindexar um
+# arquivo que não mudou não gera embeddings nem entradas novas, e chunks que deixaram de existir
+# na nova versão de um arquivo são removidos. Se só os metadados do edital mudaram (prazo, URL...),
+# os chunks existentes são regravados com os metadados novos reaproveitando os vetores já salvos.
+# Os chunks novos são embutidos em lotes e cada lote é gravado assim que fica pronto, enquanto o
+# próximo lote já está sendo embutido (fila limitada = backpressure e memória constante).
+import contextvars
+import importlib.metadata
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from instrumentacao import instrumentar, span, contar
+
+TAMANHO_LOTE_ESCRITA = int(os.getenv("ESCRITA_LOTE", "256"))
+# Quantos lotes já embutidos podem aguardar gravação antes de o embedding parar
+LOTES_EM_ESPERA = 2
+TENTATIVAS_GRAVACAO = 3
+
+
+def _metadados_existentes(vectorstore: Chroma, ids: List[str], tamanho_lote: int) -> Dict[str, Dict[str, Any]]:
+    """{id: metadados gravados} dos `ids` que já estão no índice."""
+    existentes: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(ids), tamanho_lote):
+        resultado = vectorstore.get(ids=ids[i:i + tamanho_lote], include=["metadatas"])
+        existentes.update(zip(resultado["ids"], [meta or {} for meta in resultado["metadatas"]]))
+    return existentes
+
+def _atualizar_metadados(vectorstore: Chroma, documentos: List[Document], tamanho_lote: int):
+    """Regrava chunks já indexados com metadados novos, reaproveitando os vetores salvos (sem novo embedding)."""
+    for i in range(0, len(documentos), tamanho_lote):
+        lote = documentos[i:i + tamanho_lote]
+        resultado = vectorstore.get(ids=[doc.id for doc in lote], include=["embeddings"])
+        vetores = dict(zip(resultado["ids"], resultado["embeddings"]))
+        lote = [doc for doc in lote if doc.id in vetores]
+        if lote:
+            _gravar_lote(vectorstore, lote, [list(vetores[doc.id]) for doc in lote])
+
+def _remover_obsoletos(vectorstore: Chroma, documentos: List[Document]) -> int:
+    """Remove, para cada arquivo (metadata 'source') presente em `documentos`, os chunks que não estão mais nele."""
+    ids_por_fonte: Dict[str, set] = {}
+    for doc in documentos:
+        ids_por_fonte.setdefault(doc.metadata.get("source", ""), set()).add(doc.id)
+    removidos = 0
+    for fonte, ids_atuais in ids_por_fonte.items():
+        if not fonte:
+            continue
+        obsoletos = [i for i in vectorstore.get(where={"source": fonte}, include=[])["ids"] if i not in ids_atuais]
+        if obsoletos:
+            vectorstore.delete(ids=obsoletos)
+            removidos += len(obsoletos)
+    return removidos
+
+def _tamanho_lote(vectorstore: Chroma, tamanho_lote: int) -> int:
+    """Respeita o limite de lote do servidor/cliente Chroma, que varia por versão."""
+    cliente = getattr(vectorstore, "_client", None)
+    limite = None
+    try:
+        if hasattr(cliente, "get_max_batch_size"):
+            limite = cliente.get_max_batch_size()
+        elif hasattr(cliente, "max_batch_size"):
+            limite = cliente.max_batch_size
+    except Exception:
+        limite = None
+    return max(1, min(tamanho_lote, limite)) if limite else max(1, tamanho_lote)
+
+def _colecao_chroma(vectorstore: Chroma):
+    """
+    Coleção do chromadb por trás do Chroma do langchain. A API pública (add_texts/add_documents) sempre
+    recalcula os embeddings, o que anularia o embedding em lotes e a reutilização dos vetores salvos;
+    por isso a gravação com vetores prontos usa a coleção diretamente, e só por esta função.
+    """
+    colecao = getattr(vectorstore, "_collection", None)
+    if colecao is None or not callable(getattr(colecao, "upsert", None)):
+        try:
+            versao = importlib.metadata.version("langchain-chroma")
+        except importlib.metadata.PackageNotFoundError:
+            versao = "desconhecida"
+        raise RuntimeError(
+            f"langchain-chroma {versao} não expõe a coleção do Chroma (_collection.upsert), necessária para gravar "
+            "chunks com embeddings pré-calculados. Ajuste escritor_chroma._colecao_chroma para esta versão."
+        )
+    return colecao
+
+def _gravar_lote(vectorstore: Chroma, lote: List[Document], vetores: List[List[float]]):
+    colecao = _colecao_chroma(vectorstore)
+    for tentativa in range(1, TENTATIVAS_GRAVACAO + 1):
+        try:
+            colecao.upsert(
+                ids=[doc.id for doc in lote],
+                embeddings=vetores,
+                documents=[doc.page_content for doc in lote],
+                metadatas=[doc.metadata or None for doc in lote],
+            )
+            return
+        except Exception as e:
+            if tentativa == TENTATIVAS_GRAVACAO:
+                raise
+            espera = 2 ** (tentativa - 1)
+            print(f"AVISO: Falha ao gravar lote de {len(lote)} chunks (tentativa {tentativa}): {e}. Nova tentativa em {espera}s.")
+            time.sleep(espera)
+
+def gravar_em_lotes(vectorstore: Chroma, documentos: List[Document], tamanho_lote: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Embute e grava (upsert) `documentos` em lotes. Uma thread embute os lotes e os coloca numa fila
+    limitada; a thread chamadora grava cada lote assim que ele chega, com novas tentativas em caso de falha.
+    Retorna {"chunks", "lotes", "segundos", "chunks_por_s"}.
+    """
+    tamanho_lote = _tamanho_lote(vectorstore, tamanho_lote or TAMANHO_LOTE_ESCRITA)
+    lotes = [documentos[i:i + tamanho_lote] for i in range(0, len(documentos), tamanho_lote)]
+    fila: "queue.Queue" = queue.Queue(maxsize=LOTES_EM_ESPERA)
+    parar = threading.Event()
+    FIM = object()
+
+    def embutir():
+        try:
+            for lote in lotes:
+                if parar.is_set():
+                    break
+                vetores = vectorstore.embeddings.embed_documents([doc.page_content for doc in lote])
+                fila.put((lote, vetores))
+            fila.put(FIM)
+        except BaseException as e:
+            fila.put(e)
+
+    inicio = time.perf_counter()
+    # copy_context: spans e contadores do embedding continuam no relatório da execução atual
+    produtor = threading.Thread(target=contextvars.copy_context().run, args=(embutir,), name="embedding-lotes", daemon=True)
+    produtor.start()
+    gravados = 0
+    try:
+        while True:
+            item = fila.get()
+            if item is FIM:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            lote, vetores = item
+            with span("indexacao.lote", chunks=len(lote)):
+                _gravar_lote(vectorstore, lote, vetores)
+            gravados += len(lote)
+            contar("chunks_gravados", len(lote))
+            print(f"  Lote gravado: {gravados}/{len(documentos)} chunks.")
+    finally:
+        parar.set()
+        # Desbloqueia o produtor caso ele esteja esperando espaço na fila
+        while produtor.is_alive():
+            try:
+                fila.get_nowait()
+            except queue.Empty:
+                produtor.join(timeout=0.1)
+
+    segundos = time.perf_counter() - inicio
+    vazao = gravados / segundos if segundos > 0 else 0.0
+    if documentos:
+        print(f"Escrita em lotes concluída: {gravados} chunks em {len(lotes)} lote(s), {segundos:.1f}s ({vazao:.1f} chunks/s).")
+    return {"chunks": gravados, "lotes": len(lotes), "segundos": round(segundos, 3), "chunks_por_s": round(vazao, 2)}
+
+@instrumentar("indexacao.escrita")
+def indexar_documentos(vectorstore: Chroma, documentos: List[Document], remover_obsoletos: bool = True,
+                       tamanho_lote: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Faz upsert de `documentos` (que precisam ter `id`) no Chroma, embutindo só os chunks ainda não indexados,
+    em lotes de `tamanho_lote` (padrão: variável ESCRITA_LOTE ou 256). Chunks já indexados cujos metadados
+    mudaram (ex.: prazo ou URL do edital corrigidos) são atualizados sem novo embedding.
+    Com `remover_obsoletos`, os arquivos tratados aqui passam a ter exatamente estes chunks no índice.
+    Retorna um resumo com as contagens de novos, existentes, atualizados, duplicados e removidos.
+    """
+    unicos: Dict[str, Document] = {}
+    for doc in documentos:
+        if not doc.id:
+            raise ValueError(f"Documento sem id (source={doc.metadata.get('source')}); use atribuir_ids_chunks antes.")
+        unicos.setdefault(doc.id, doc)
+    duplicados = len(documentos) - len(unicos)
+
+    lote_leitura = _tamanho_lote(vectorstore, tamanho_lote or TAMANHO_LOTE_ESCRITA)
+    existentes = _metadados_existentes(vectorstore, list(unicos), lote_leitura)
+    novos = [doc for doc_id, doc in unicos.items() if doc_id not in existentes]
+    # O ID cobre só o conteúdo; metadados do edital corrigidos precisam ser regravados explicitamente
+    desatualizados = [
+        doc for doc_id, doc in unicos.items()
+        if doc_id in existentes and existentes[doc_id] != {k: v for k, v in doc.metadata.items() if v is not None}
+    ]
+
+    removidos = _remover_obsoletos(vectorstore, list(unicos.values())) if remover_obsoletos else 0
+    if desatualizados:
+        with span("indexacao.metadados", chunks=len(desatualizados)):
+            _atualizar_metadados(vectorstore, desatualizados, lote_leitura)
+    escrita = gravar_em_lotes(vectorstore, novos, tamanho_lote) if novos else {}
+
+    resumo = {"novos": len(novos), "existentes": len(existentes), "atualizados": len(desatualizados),
+              "duplicados": duplicados, "removidos": removidos, "chunks_por_s": escrita.get("chunks_por_s", 0.0)}
+    print(f"Vector Store: {resumo['novos']} chunks novos, {resumo['existentes']} já indexados "
+          f"({resumo['atualizados']} com metadados atualizados), "
+          f"{resumo['duplicados']} duplicados ignorados, {resumo['removidos']} obsoletos removidos.")
+    return resumo
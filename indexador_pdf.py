@@ -1,13 +1,19 @@
 # pdf_indexer.py
 import os
 import pdfplumber
+import pypdf
 from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from dotenv import load_dotenv
 import io
-from typing import Union, List, Sequence 
+import hashlib
+from typing import Union, List, Sequence, Optional
 from edital_manager import load_cached_grants
 import unicodedata
+from instrumentacao import instrumentar, span, contar
+from cache_extracao import CacheExtracao, obter_cache
+from ocr_paginas import criar_fila_ocr
+from deduplicacao import suprimir_quase_duplicados
 
 load_dotenv()
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -42,22 +48,362 @@ def _find_edital_metadata_for_file(file_name, grants):
             }
     return {}
 
-def process_pdfs_into_documents(pdf_sources: Union[str, Sequence[Union[str, io.BytesIO]]]) -> List[Document]:
+EXTENSOES_TEXTO = (".md", ".txt")
+
+def _eh_arquivo_texto(file_name: str) -> bool:
+    return file_name.lower().endswith(EXTENSOES_TEXTO)
+
+def _texto_cronograma(tables: List) -> str:
+    """Reescreve a tabela ETAPAS/DATAS da página como frases ("O evento X tem a data ou período de Y."), ou ""."""
+    structured_cronograma_content = ""
+    for table in tables:
+        if not table or len(table) < 2:
+            continue
+
+        headers_row = table[0]
+        cleaned_headers = [
+            cleaned_cell for h in headers_row if h is not None and (cleaned_cell := str(h).replace("\n", " ").replace("\r", " ").strip())
+        ]
+
+        if "ETAPAS" in cleaned_headers and "DATAS" in cleaned_headers:
+            structured_cronograma_content += "CRONOGRAMA DE EVENTOS E DATAS IMPORTANTES:\n"
+
+            for row_idx, row in enumerate(table):
+                if row_idx == 0:
+                    continue
+                if len(row) < 2 or row[0] is None or row[1] is None:
+                    continue
+
+                item = str(row[0]).replace("\n", " ").replace("\r", " ").strip()
+                value = str(row[1]).replace("\n", " ").replace("\r", " ").strip()
+
+                structured_cronograma_content += f"O evento '{item}' tem a data ou período de {value}.\n"
+    return structured_cronograma_content
+
+def _processar_pagina(text: str, tables: List, file_name: str, i: int, edital_meta: dict) -> List[Document]:
+    """Aplica os filtros e heurísticas de relevância a uma página (índice `i`) e devolve seus Documents."""
+    documentos: List[Document] = []
+    # Sem id=: os IDs dos chunks vêm só de atribuir_ids_chunks, depois do split final
+
+    # Excluir páginas institucionais (case-insensitive, ignora acentuação, busca palavra inteira)
+    def normalize(text):
+        return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII').lower()
+    normalized_text = normalize(text)
+    exclude_terms = [
+        "sumario", "indice", "expediente", "apresentacao", "carta",
+        "ouvidoria", "endereco", "contato", "biblioteca",
+        "lei", "presidente", "diretor", "conselho",
+        "sic", "fala.sp.gov.br", "canais", "rua", "Práticas"
+    ]
+    import re
+    pattern = r'\\b(' + '|'.join(re.escape(term) for term in exclude_terms) + r')\\b'
+    if re.search(pattern, normalized_text):
+        print(f"Página {i+1} do arquivo {file_name} descartada por conter termo institucional (regex palavra inteira).")
+        return documentos
+
+    # Função utilitária para checar termos institucionais em qualquer texto
+    def chunk_has_excluded_term(text):
+        normalized = normalize(text)
+        return re.search(pattern, normalized)
+
+    # Tabela de cronograma (ETAPAS/DATAS): vira um chunk próprio, além do texto da página tratado abaixo
+    structured_cronograma_content = _texto_cronograma(tables)
+    if structured_cronograma_content:
+        if chunk_has_excluded_term(structured_cronograma_content):
+            print(f"Chunk de cronograma da página {i+1} do arquivo {file_name} descartado por conter termo institucional.")
+        else:
+            meta = {"source": file_name, "page": i + 1, "type": "cronograma_principal"}
+            meta.update(edital_meta)
+            documentos.append(Document(
+                page_content=structured_cronograma_content,
+                metadata=meta
+            ))
+
+    # Só indexe se contiver palavras-chave de edital (lista ampliada)
+    edital_keywords = [
+        "edital", "chamada", "chamada pública", "propostas", "inscrições", "submissão", "financiamento", "bolsa",
+        "projeto", "fomento", "pesquisa", "seleção", "resultado", "cronograma", "objetivo",
+        "valor", "recurso", "vigência", "anexo", "regulamento", "critério", "apresentação de propostas",
+        "funding", "deadline", "apoio", "concessão", "proponente", "instituição executora", "instituição parceira",
+        "contrapartida", "documentação", "requisitos", "submissão de propostas", "proponente responsável",
+        "área temática", "área de conhecimento", "projetos contemplados", "projetos aprovados", "projetos selecionados",
+        "cronograma de atividades", "cronograma de execução", "cronograma financeiro", "recursos financeiros",
+        "valor global", "valor total", "valor financiado", "vigência do projeto", "vigência da bolsa", "vigência do edital"
+    ]
+    if not any(word in text.lower() for word in edital_keywords):
+        print(f"Página {i+1} do arquivo {file_name} descartada por não conter palavras-chave de edital.")
+        return documentos
+
+    # Se a página contém alguma palavra-chave de edital, indexe o texto inteiro da página
+    if any(word in text.lower() for word in edital_keywords):
+        if chunk_has_excluded_term(text):
+            print(f"Página {i+1} do arquivo {file_name} (chunk inteiro) descartada por conter termo institucional.")
+            return documentos
+        meta = {"source": file_name, "page": i + 1, "type": "page_relevante"}
+        meta.update(edital_meta)
+        documentos.append(Document(
+            page_content=text,
+            metadata=meta
+        ))
+        return documentos
+
+    # --- NOVO: Priorize seções relevantes do edital ---
+    # Se encontrar uma seção que começa com palavras-chave típicas de edital, priorize esse trecho
+    section_keywords = [
+        "objetivo", "finalidade", "propostas", "inscrições", "submissão", "cronograma", "prazo", "valor", "recurso", "financiamento", "bolsa", "seleção", "resultado", "vigência", "anexo", "regulamento", "critério", "apresentação de propostas"
+    ]
+    relevant_sections = []
+    for line in text.split('\n'):
+        if any(line.lower().strip().startswith(kw) for kw in section_keywords):
+            relevant_sections.append(line.strip())
+    # Se encontrar seções relevantes, indexe apenas elas
+    if relevant_sections:
+        for section in relevant_sections:
+            if chunk_has_excluded_term(section):
+                print(f"Seção relevante da página {i+1} do arquivo {file_name} descartada por conter termo institucional.")
+                continue
+            meta = {"source": file_name, "page": i + 1, "type": "section_relevante"}
+            meta.update(edital_meta)
+            documentos.append(Document(
+                page_content=section,
+                metadata=meta
+            ))
+        return documentos
+
+    # --- Aprimora heurística: sempre indexe seções com termos de elegibilidade, modalidades, requisitos, apoio ---
+    prioridade_keywords = [
+        "elegibilidade", "quem pode participar", "requisitos", "modalidade de apoio", "modalidades de apoio", "financiamento", "submissão", "participação", "condições", "critério de participação", "critério de elegibilidade", "proponente", "instituição executora", "instituição parceira", "expression of interest", "EOI", "horizon europe", "NSF", "ANR", "colaboração internacional"
+    ]
+    for line in text.split('\n'):
+        for kw in prioridade_keywords:
+            if kw in line.lower():
+                meta_prior = {"source": file_name, "page": i + 1, "type": "prioridade", "keyword": kw}
+                meta_prior.update(edital_meta)
+                documentos.append(Document(
+                    page_content=line.strip(),
+                    metadata=meta_prior
+                ))
+                break
+
+    if text and not structured_cronograma_content:
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+        text_chunks = text_splitter.split_text(text)
+        for chunk_idx, txt_chunk in enumerate(text_chunks):
+            if chunk_has_excluded_term(txt_chunk):
+                print(f"Chunk {chunk_idx} da página {i+1} do arquivo {file_name} descartado por conter termo institucional.")
+                continue
+            meta = {"source": file_name, "page": i + 1, "type": "page_text", "chunk_idx": chunk_idx}
+            meta.update(edital_meta)
+            documentos.append(Document(
+                page_content=txt_chunk,
+                metadata=meta
+            ))
+    return documentos
+
+# Muda sempre que o que é extraído de cada página mudar, para invalidar o cache de extração
+VERSAO_EXTRACAO = f"pdfplumber-{pdfplumber.__version__}-pypdf-{pypdf.__version__}-5"
+
+# "rapido": pypdf em todas as páginas, escalando página a página para o pdfplumber quando necessário.
+# "pdfplumber": pdfplumber em todas as páginas (mais preciso e bem mais lento).
+BACKENDS_EXTRACAO = ("rapido", "pdfplumber")
+BACKEND_EXTRACAO_PADRAO = os.getenv("INDEXADOR_BACKEND", "rapido")
+# Abaixo disso, o texto do pypdf é considerado insuficiente (página escaneada, texto em curvas etc.)
+MIN_CHARS_PAGINA = 80
+# Fração máxima de caracteres de substituição/controle antes de considerar o texto quebrado
+MAX_FRACAO_CHARS_QUEBRADOS = 0.02
+
+# Cronogramas de edital são tabelas com bordas: a estratégia por linhas é bem mais barata que a por texto
+CONFIG_TABELAS_CRONOGRAMA = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": 3,
+    "join_tolerance": 3,
+    "intersection_tolerance": 5,
+}
+
+def _pagina_pode_ter_cronograma(text: str) -> bool:
+    """Pré-checagem barata: a tabela de cronograma só é usada se tiver os cabeçalhos ETAPAS e DATAS."""
+    return "ETAPAS" in text and "DATAS" in text
+
+def _extrair_tabelas_cronograma(page) -> List:
+    tables = page.extract_tables(CONFIG_TABELAS_CRONOGRAMA)
+    if not tables:
+        # Cronograma sem bordas: cai para a detecção padrão do pdfplumber
+        tables = page.extract_tables()
+    contar("paginas_com_tabelas")
+    return tables
+
+# Página "só imagem": quase nenhum caractere e imagens cobrindo boa parte da área (scan)
+MAX_CHARS_PAGINA_ESCANEADA = 10
+MIN_COBERTURA_IMAGEM = 0.5
+
+def _pagina_escaneada(page) -> bool:
+    if len(page.chars) > MAX_CHARS_PAGINA_ESCANEADA or not page.images:
+        return False
+    area_imagens = sum(abs(img["x1"] - img["x0"]) * abs(img["bottom"] - img["top"]) for img in page.images)
+    return area_imagens >= MIN_COBERTURA_IMAGEM * float(page.width) * float(page.height)
+
+def _hash_pagina_escaneada(page) -> Optional[str]:
+    """Hash dos streams de imagem da página (o mesmo scan em PDFs diferentes reaproveita o OCR)."""
+    digest = hashlib.sha256()
+    try:
+        for img in page.images:
+            digest.update(img["stream"].get_rawdata() or b"")
+    except Exception:
+        return None
+    return digest.hexdigest()
+
+def _extrair_pagina_pdfplumber(page) -> dict:
+    text = page.extract_text() or ""
+    escaneada = _pagina_escaneada(page)
+    return {
+        "text": text,
+        # O detector de tabelas é a parte mais cara da extração; só roda onde pode haver cronograma
+        "tables": _extrair_tabelas_cronograma(page) if _pagina_pode_ter_cronograma(text) else [],
+        "largura": float(page.width),
+        "altura": float(page.height),
+        "n_chars": len(page.chars),
+        "n_imagens": len(page.images),
+        "backend": "pdfplumber",
+        "precisa_ocr": escaneada,
+        "hash_imagem": _hash_pagina_escaneada(page) if escaneada else None,
+    }
+
+def _extrair_paginas_pdfplumber(file_obj) -> List[dict]:
+    with pdfplumber.open(file_obj) as pdf:
+        return [_extrair_pagina_pdfplumber(page) for page in pdf.pages]
+
+def _texto_parece_quebrado(text: str) -> bool:
+    if "(cid:" in text:
+        return True # Fonte sem mapa ToUnicode: o extrator devolve códigos de glifo
+    quebrados = sum(1 for c in text if c == "\ufffd" or (ord(c) < 32 and c not in "\n\r\t"))
+    return quebrados > MAX_FRACAO_CHARS_QUEBRADOS * len(text)
+
+def _motivo_escalonamento(text: str) -> Optional[str]:
+    """
+    Por que a página precisa do pdfplumber (None se o texto do pypdf basta).
+    Páginas de cronograma não são escaladas: mantêm o texto do pypdf e só as tabelas vêm do pdfplumber.
+    """
+    if len(text.strip()) < MIN_CHARS_PAGINA:
+        return "pouco_texto"
+    if _texto_parece_quebrado(text):
+        return "texto_quebrado"
+    return None
+
+def _extrair_paginas_rapido(file_obj) -> List[dict]:
+    paginas: List[Optional[dict]] = []
+    escaladas = {}
+    com_cronograma = []
+    try:
+        # Abrir e listar as páginas já falha com xref corrompida ou criptografia, que o pdfplumber costuma tolerar
+        paginas_pypdf = list(pypdf.PdfReader(file_obj).pages)
+    except Exception as e:
+        print(f"AVISO: pypdf não conseguiu abrir o PDF ({type(e).__name__}: {e}). Usando pdfplumber no arquivo inteiro.")
+        contar("arquivos_fallback_pdfplumber")
+        file_obj.seek(0)
+        return _extrair_paginas_pdfplumber(file_obj)
+    for i, page in enumerate(paginas_pypdf):
+        try:
+            text = page.extract_text() or ""
+        except Exception as e:
+            print(f"AVISO: pypdf falhou na página {i+1}: {e}. Usando pdfplumber.")
+            text = ""
+        motivo = _motivo_escalonamento(text)
+        if motivo:
+            escaladas[i] = motivo
+            paginas.append(None)
+            continue
+        if _pagina_pode_ter_cronograma(text):
+            com_cronograma.append(i)
+        caixa = page.mediabox
+        paginas.append({
+            "text": text,
+            "tables": [],
+            "largura": float(caixa.width),
+            "altura": float(caixa.height),
+            "n_chars": len(text),
+            "backend": "pypdf",
+        })
+
+    if escaladas or com_cronograma:
+        file_obj.seek(0)
+        with pdfplumber.open(file_obj) as pdf:
+            for i, motivo in escaladas.items():
+                contar(f"paginas_escaladas_{motivo}")
+                paginas[i] = _extrair_pagina_pdfplumber(pdf.pages[i])
+            # O pypdf não extrai tabelas: só o detector de tabelas do pdfplumber roda nessas páginas
+            for i in com_cronograma:
+                paginas[i]["tables"] = _extrair_tabelas_cronograma(pdf.pages[i])
+    return paginas
+
+def _extrair_paginas_backend(file_obj, backend: str) -> List[dict]:
+    if backend == "pdfplumber":
+        return _extrair_paginas_pdfplumber(file_obj)
+    return _extrair_paginas_rapido(file_obj)
+
+def _extrair_paginas(file_obj, cache: Optional[CacheExtracao], backend: str = BACKEND_EXTRACAO_PADRAO,
+                     hash_pdf: Optional[str] = None) -> List[dict]:
+    """Extrai as páginas do PDF, reaproveitando o cache (chave: SHA-256 do conteúdo) quando possível."""
+    if cache is None:
+        return _extrair_paginas_backend(file_obj, backend)
+    versao = f"{backend}-{VERSAO_EXTRACAO}"
+    if hash_pdf is None:
+        hash_pdf = hashlib.sha256(file_obj.read()).hexdigest()
+        file_obj.seek(0)
+    paginas = cache.carregar(hash_pdf, versao)
+    if paginas is not None:
+        contar("paginas_cache", len(paginas))
+        return paginas
+    paginas = _extrair_paginas_backend(file_obj, backend)
+    cache.salvar(hash_pdf, versao, paginas)
+    return paginas
+
+def atribuir_ids_chunks(chunks: List[Document]) -> List[Document]:
+    """
+    Define IDs estáveis e endereçados por conteúdo:
+    sha256(hash do arquivo | página | tipo | offset no texto da página | hash do texto do chunk).
+    O mesmo conteúdo sempre gera o mesmo ID, então reindexar um arquivo inalterado é um no-op no Chroma.
+    Chunks com ID repetido (texto idêntico na mesma posição) são descartados.
+    """
+    vistos = set()
+    unicos: List[Document] = []
+    for chunk in chunks:
+        meta = chunk.metadata
+        hash_texto = hashlib.sha256(chunk.page_content.encode('utf-8')).hexdigest()
+        chave = f"{meta.get('source_hash', meta.get('source', ''))}|{meta.get('page')}|{meta.get('type')}|{meta.get('start_index')}|{hash_texto}"
+        chunk.id = hashlib.sha256(chave.encode('utf-8')).hexdigest()[:32]
+        if chunk.id in vistos:
+            continue
+        vistos.add(chunk.id)
+        unicos.append(chunk)
+    return unicos
+
+@instrumentar("indexacao.extracao")
+def process_pdfs_into_documents(
+    pdf_sources: Union[str, Sequence[Union[str, io.BytesIO]]],
+    backend: Optional[str] = None
+) -> List[Document]:
     """
     Processa arquivos PDF de um diretório OU uma lista de caminhos de arquivo OU uma lista de objetos BytesIO.
     Extrai texto e tabelas (cronogramas), e retorna uma lista de objetos Document para indexação.
+    Arquivos .md/.txt (editais publicados como página HTML, ver download_manager.save_html_as_text)
+    são lidos diretamente como texto UTF-8 e tratados como uma única página.
 
     Args:
         pdf_sources: Um caminho de diretório (str) ou uma sequência de caminhos de arquivo (Sequence[str])
                      ou uma sequência de objetos BytesIO (Sequence[io.BytesIO]).
+        backend: Extrator de texto ("rapido" ou "pdfplumber"). Padrão: variável INDEXADOR_BACKEND ou "rapido".
     """
+    backend = backend or BACKEND_EXTRACAO_PADRAO
+    if backend not in BACKENDS_EXTRACAO:
+        raise ValueError(f"Backend de extração desconhecido: '{backend}'. Use um de {BACKENDS_EXTRACAO}.")
     all_documents_for_indexing: List[Document] = []
     
     files_to_process = [] # Lista de tuplas (nome_do_arquivo, objeto_arquivo_BytesIO)
 
     if isinstance(pdf_sources, str): # Se for um caminho de diretório (str)
         print(f"\n--- Iniciando processamento de PDFs do diretório: {pdf_sources} ---")
-        pdf_paths = [os.path.join(pdf_sources, f) for f in os.listdir(pdf_sources) if f.endswith(".pdf")]
+        pdf_paths = [os.path.join(pdf_sources, f) for f in os.listdir(pdf_sources) if f.endswith(".pdf") or _eh_arquivo_texto(f)]
         for path in pdf_paths:
             files_to_process.append((os.path.basename(path), open(path, 'rb'))) # Abre o arquivo do disco
         
@@ -75,160 +421,39 @@ def process_pdfs_into_documents(pdf_sources: Union[str, Sequence[Union[str, io.B
         raise ValueError("pdf_sources deve ser um caminho de diretório (str) ou uma lista/tupla de caminhos/BytesIO.")
 
     grants = load_cached_grants()
+    cache = obter_cache()
+    fila_ocr = criar_fila_ocr(cache)
+    pendentes_ocr = []
 
     for file_name, file_obj in files_to_process:
-        edital_meta = _find_edital_metadata_for_file(file_name, grants)
         try:
-            with pdfplumber.open(file_obj) as pdf:
-                for i, page in enumerate(pdf.pages):
-                    chunk_id_base = f"{file_name.replace('.', '_')}_page_{i+1}"
-                    text = page.extract_text() or ""
-                    tables = page.extract_tables()
-
-                    # Excluir páginas institucionais (case-insensitive, ignora acentuação, busca palavra inteira)
-                    def normalize(text):
-                        return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII').lower()
-                    normalized_text = normalize(text)
-                    exclude_terms = [
-                        "sumario", "indice", "expediente", "apresentacao", "carta",
-                        "ouvidoria", "endereco", "contato", "biblioteca",
-                        "lei", "presidente", "diretor", "conselho",
-                        "sic", "fala.sp.gov.br", "canais", "rua", "Práticas"
-                    ]
-                    import re
-                    pattern = r'\\b(' + '|'.join(re.escape(term) for term in exclude_terms) + r')\\b'
-                    if re.search(pattern, normalized_text):
-                        print(f"Página {i+1} do arquivo {file_name} descartada por conter termo institucional (regex palavra inteira).")
-                        continue
-
-                    # Função utilitária para checar termos institucionais em qualquer texto
-                    def chunk_has_excluded_term(text):
-                        normalized = normalize(text)
-                        return re.search(pattern, normalized)
-
-                    # Só indexe se contiver palavras-chave de edital (lista ampliada)
-                    edital_keywords = [
-                        "edital", "chamada", "chamada pública", "propostas", "inscrições", "submissão", "financiamento", "bolsa",
-                        "projeto", "fomento", "pesquisa", "seleção", "resultado", "cronograma", "objetivo",
-                        "valor", "recurso", "vigência", "anexo", "regulamento", "critério", "apresentação de propostas",
-                        "funding", "deadline", "apoio", "concessão", "proponente", "instituição executora", "instituição parceira",
-                        "contrapartida", "documentação", "requisitos", "submissão de propostas", "proponente responsável",
-                        "área temática", "área de conhecimento", "projetos contemplados", "projetos aprovados", "projetos selecionados",
-                        "cronograma de atividades", "cronograma de execução", "cronograma financeiro", "recursos financeiros",
-                        "valor global", "valor total", "valor financiado", "vigência do projeto", "vigência da bolsa", "vigência do edital"
-                    ]
-                    if not any(word in text.lower() for word in edital_keywords):
-                        print(f"Página {i+1} do arquivo {file_name} descartada por não conter palavras-chave de edital.")
-                        continue
+            conteudo = file_obj.read()
+            file_obj.seek(0)
+            hash_arquivo = hashlib.sha256(conteudo).hexdigest()
+            # O hash do arquivo entra nos metadados e compõe o ID de cada chunk (ver atribuir_ids_chunks)
+            edital_meta = {**_find_edital_metadata_for_file(file_name, grants), "source_hash": hash_arquivo}
 
-                    # Se a página contém alguma palavra-chave de edital, indexe o texto inteiro da página
-                    if any(word in text.lower() for word in edital_keywords):
-                        if chunk_has_excluded_term(text):
-                            print(f"Página {i+1} do arquivo {file_name} (chunk inteiro) descartada por conter termo institucional.")
-                            continue
-                        meta = {"source": file_name, "page": i + 1, "type": "page_relevante"}
-                        meta.update(edital_meta)
-                        all_documents_for_indexing.append(Document(
-                            page_content=text,
-                            metadata=meta,
-                            id=f"{chunk_id_base}_page_relevante"
-                        ))
-                        continue
+            if _eh_arquivo_texto(file_name):
+                with span("indexacao.arquivo", arquivo=file_name):
+                    contar("paginas")
+                    text = conteudo.decode('utf-8', errors='replace')
+                    all_documents_for_indexing.extend(_processar_pagina(text, [], file_name, 0, edital_meta))
+                print(f"Texto '{file_name}' processado.")
+                continue
 
-                    # --- NOVO: Priorize seções relevantes do edital ---
-                    # Se encontrar uma seção que começa com palavras-chave típicas de edital, priorize esse trecho
-                    section_keywords = [
-                        "objetivo", "finalidade", "propostas", "inscrições", "submissão", "cronograma", "prazo", "valor", "recurso", "financiamento", "bolsa", "seleção", "resultado", "vigência", "anexo", "regulamento", "critério", "apresentação de propostas"
-                    ]
-                    relevant_sections = []
-                    for line in text.split('\n'):
-                        if any(line.lower().strip().startswith(kw) for kw in section_keywords):
-                            relevant_sections.append(line.strip())
-                    # Se encontrar seções relevantes, indexe apenas elas
-                    if relevant_sections:
-                        for section in relevant_sections:
-                            if chunk_has_excluded_term(section):
-                                print(f"Seção relevante da página {i+1} do arquivo {file_name} descartada por conter termo institucional.")
-                                continue
-                            meta = {"source": file_name, "page": i + 1, "type": "section_relevante"}
-                            meta.update(edital_meta)
-                            all_documents_for_indexing.append(Document(
-                                page_content=section,
-                                metadata=meta,
-                                id=f"{chunk_id_base}_section_{section_keywords[0]}"
-                            ))
+            with span("indexacao.arquivo", arquivo=file_name):
+                paginas = _extrair_paginas(file_obj, cache, backend, hash_arquivo)
+                for i, pagina in enumerate(paginas):
+                    contar("paginas")
+                    if pagina.get("precisa_ocr") and fila_ocr is not None:
+                        # Página escaneada: vai para a fila de OCR e é processada no final
+                        hash_pagina = pagina["hash_imagem"] or f"{hash_arquivo}-{i}"
+                        future = fila_ocr.enviar(conteudo, i, hash_pagina)
+                        pendentes_ocr.append((future, file_name, i, edital_meta))
                         continue
-
-                    # --- Aprimora heurística: sempre indexe seções com termos de elegibilidade, modalidades, requisitos, apoio ---
-                    prioridade_keywords = [
-                        "elegibilidade", "quem pode participar", "requisitos", "modalidade de apoio", "modalidades de apoio", "financiamento", "submissão", "participação", "condições", "critério de participação", "critério de elegibilidade", "proponente", "instituição executora", "instituição parceira", "expression of interest", "EOI", "horizon europe", "NSF", "ANR", "colaboração internacional"
-                    ]
-                    for line in text.split('\n'):
-                        for kw in prioridade_keywords:
-                            if kw in line.lower():
-                                meta_prior = {"source": file_name, "page": i + 1, "type": "prioridade", "keyword": kw}
-                                meta_prior.update(edital_meta)
-                                all_documents_for_indexing.append(Document(
-                                    page_content=line.strip(),
-                                    metadata=meta_prior,
-                                    id=f"{chunk_id_base}_prioridade_{kw}"
-                                ))
-                                break
-
-                    structured_cronograma_content = ""
-                    found_main_cronograma_table = False
-                    
-                    for table_idx, table in enumerate(tables):
-                        if not table or len(table) < 2:
-                            continue
-                        
-                        headers_row = table[0]
-                        cleaned_headers = [
-                            cleaned_cell for h in headers_row if h is not None and (cleaned_cell := str(h).replace("\n", " ").replace("\r", " ").strip())
-                        ]
-                        
-                        if "ETAPAS" in cleaned_headers and "DATAS" in cleaned_headers:
-                            found_main_cronograma_table = True
-                            structured_cronograma_content += "CRONOGRAMA DE EVENTOS E DATAS IMPORTANTES:\n"
-                            
-                            for row_idx, row in enumerate(table):
-                                if row_idx == 0:
-                                    continue
-                                if len(row) < 2 or row[0] is None or row[1] is None:
-                                    continue
-
-                                item = str(row[0]).replace("\n", " ").replace("\r", " ").strip()
-                                value = str(row[1]).replace("\n", " ").replace("\r", " ").strip()
-                                
-                                structured_cronograma_content += f"O evento '{item}' tem a data ou período de {value}.\n"
-                    
-                    # Crie um ID único para cada chunk para evitar duplicatas no Chroma
-                    
-                    if found_main_cronograma_table and structured_cronograma_content:
-                        if chunk_has_excluded_term(structured_cronograma_content):
-                            print(f"Chunk de cronograma da página {i+1} do arquivo {file_name} descartado por conter termo institucional.")
-                        else:
-                            meta = {"source": file_name, "page": i + 1, "type": "cronograma_principal"}
-                            meta.update(edital_meta)
-                            all_documents_for_indexing.append(Document(
-                                page_content=structured_cronograma_content,
-                                metadata=meta,
-                                id=f"{chunk_id_base}_cronograma"
-                            ))
-                    elif text and not found_main_cronograma_table:
-                        text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-                        text_chunks = text_splitter.split_text(text)
-                        for chunk_idx, txt_chunk in enumerate(text_chunks):
-                            if chunk_has_excluded_term(txt_chunk):
-                                print(f"Chunk {chunk_idx} da página {i+1} do arquivo {file_name} descartado por conter termo institucional.")
-                                continue
-                            meta = {"source": file_name, "page": i + 1, "type": "page_text", "chunk_idx": chunk_idx}
-                            meta.update(edital_meta)
-                            all_documents_for_indexing.append(Document(
-                                page_content=txt_chunk,
-                                metadata=meta,
-                                id=f"{chunk_id_base}_text_{chunk_idx}"
-                            ))
+                    all_documents_for_indexing.extend(
+                        _processar_pagina(pagina["text"], pagina["tables"], file_name, i, edital_meta)
+                    )
             
             print(f"PDF '{file_name}' processado.")
         except Exception as e:
@@ -240,9 +465,20 @@ def process_pdfs_into_documents(pdf_sources: Union[str, Sequence[Union[str, io.B
             if isinstance(pdf_sources, str) or (isinstance(pdf_sources, (list, tuple)) and all(isinstance(item, str) for item in pdf_sources)):
                 file_obj.close()
 
+    if fila_ocr is not None:
+        with fila_ocr:
+            for future, file_name, i, edital_meta in pendentes_ocr:
+                text = future.result()
+                if text.strip():
+                    all_documents_for_indexing.extend(_processar_pagina(text, [], file_name, i, edital_meta))
+        if pendentes_ocr:
+            print(f"OCR concluído para {len(pendentes_ocr)} página(s) escaneada(s).")
 
-    text_splitter_general = RecursiveCharacterTextSplitter(chunk_size=3000, chunk_overlap=200)
-    chunks: List[Document] = text_splitter_general.split_documents(all_documents_for_indexing)
+    text_splitter_general = RecursiveCharacterTextSplitter(chunk_size=3000, chunk_overlap=200, add_start_index=True)
+    chunks: List[Document] = atribuir_ids_chunks(text_splitter_general.split_documents(all_documents_for_indexing))
+    # Trechos sobrepostos da mesma página (página inteira, seções, prioridades) não precisam ser embutidos duas vezes
+    chunks = suprimir_quase_duplicados(chunks)
 
+    contar("chunks", len(chunks))
     print(f"✅ PDFs processados. Gerados {len(chunks)} chunks.")
     return chunks
\ No newline at end of file
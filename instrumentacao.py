@@ -0,0 +1,268 @@
+# instrumentacao.py
+# Camada leve de instrumentação do pipeline (descoberta → download → indexação → recuperação).
+#
+# - span("nome"): mede a duração de um trecho (aninhável, funciona em threads via asyncio.to_thread)
+# - contar("paginas", n): soma contadores (páginas, chunks, bytes, tokens...)
+# - relatorio_execucao("atualizacao"): agrupa spans/contadores de uma execução e grava um JSON em RELATORIOS_DIR
+#   (com a memória residente no início e no fim da execução e o pico do processo)
+#
+# Sem um relatório ativo, spans e contadores só são repassados ao OpenTelemetry (se instalado).
+import contextvars
+import functools
+import inspect
+import json
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    from opentelemetry import trace, metrics
+    _tracer = trace.get_tracer("editais")
+    _meter = metrics.get_meter("editais")
+except ImportError:
+    trace = None
+    _tracer = None
+    _meter = None
+
+RELATORIOS_DIR = os.getenv("RELATORIOS_DIR", "relatorios")
+
+_relatorio_atual: contextvars.ContextVar[Optional["RelatorioExecucao"]] = contextvars.ContextVar("relatorio_atual", default=None)
+_span_atual: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span_atual", default=None)
+_contadores_otel: Dict[str, Any] = {}
+
+
+def memoria_pico_mb() -> Optional[float]:
+    """
+    Pico de memória residente do processo desde que ele iniciou (high-water mark), em MB.
+    Em processos longos (Streamlit, API) não muda entre execuções; use memoria_atual_mb para medir uma execução.
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    if sys.platform == "darwin":
+        return round(pico / (1024 * 1024), 1)
+    return round(pico / 1024, 1)
+
+
+def memoria_atual_mb() -> Optional[float]:
+    """Memória residente (RSS) atual do processo, em MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas_residentes = int(f.read().split()[1])
+        return round(paginas_residentes * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+
+
+class RelatorioExecucao:
+    def __init__(self, nome: str, atributos: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.nome = nome
+        self.atributos = atributos or {}
+        self.inicio = datetime.now()
+        self._inicio_perf = time.perf_counter()
+        self.duracao_s: Optional[float] = None
+        self.memoria_inicio_mb = memoria_atual_mb()
+        self.memoria_fim_mb: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.contadores: Dict[str, float] = defaultdict(float)
+
+    def finalizar(self):
+        self.duracao_s = round(time.perf_counter() - self._inicio_perf, 4)
+        self.memoria_fim_mb = memoria_atual_mb()
+
+    def resumo_por_span(self) -> Dict[str, Dict[str, float]]:
+        """Soma de duração e número de chamadas por nome de span."""
+        resumo: Dict[str, Dict[str, float]] = {}
+        for registro in self.spans:
+            item = resumo.setdefault(registro["nome"], {"chamadas": 0, "duracao_total_s": 0.0})
+            item["chamadas"] += 1
+            item["duracao_total_s"] = round(item["duracao_total_s"] + registro["duracao_s"], 4)
+        return resumo
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "nome": self.nome,
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "duracao_s": self.duracao_s,
+            # RSS no início e no fim desta execução; o pico é o do processo inteiro (high-water mark)
+            "memoria_inicio_mb": self.memoria_inicio_mb,
+            "memoria_fim_mb": self.memoria_fim_mb,
+            "memoria_pico_processo_mb": memoria_pico_mb(),
+            "atributos": self.atributos,
+            "contadores": dict(self.contadores),
+            "resumo_spans": self.resumo_por_span(),
+            "spans": self.spans,
+        }
+
+    def salvar(self, diretorio: Optional[str] = None) -> str:
+        diretorio = diretorio or RELATORIOS_DIR
+        os.makedirs(diretorio, exist_ok=True)
+        caminho = os.path.join(diretorio, f"{self.nome}_{self.inicio:%Y%m%d-%H%M%S}_{self.id}.json")
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False, default=str)
+        return caminho
+
+
+def relatorio_atual() -> Optional[RelatorioExecucao]:
+    return _relatorio_atual.get()
+
+
+@contextmanager
+def relatorio_execucao(nome: str, salvar: bool = True, diretorio: Optional[str] = None, **atributos):
+    """Abre um relatório de execução; ao sair, grava o JSON (a menos que RELATORIOS_DESATIVADOS=1)."""
+    relatorio = RelatorioExecucao(nome, atributos)
+    token = _relatorio_atual.set(relatorio)
+    try:
+        with span(nome):
+            yield relatorio
+    finally:
+        _relatorio_atual.reset(token)
+        relatorio.finalizar()
+        if salvar and os.getenv("RELATORIOS_DESATIVADOS", "0") != "1":
+            try:
+                caminho = relatorio.salvar(diretorio)
+                print(f"INFO: Relatório de execução salvo em '{caminho}' ({relatorio.duracao_s}s).")
+            except OSError as e:
+                print(f"AVISO: Não foi possível salvar o relatório de execução: {e}")
+
+
+@contextmanager
+def span(nome: str, **atributos):
+    """Mede a duração de um trecho. O dicionário devolvido aceita atributos extras durante o trecho."""
+    relatorio = _relatorio_atual.get()
+    registro: Dict[str, Any] = {
+        "id": uuid.uuid4().hex[:8],
+        "nome": nome,
+        "pai": _span_atual.get(),
+        "atributos": dict(atributos),
+    }
+    token = _span_atual.set(registro["id"])
+    otel_span = None
+    otel_cm = None
+    if _tracer is not None:
+        otel_cm = _tracer.start_as_current_span(nome)
+        otel_span = otel_cm.__enter__()
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        yield registro["atributos"]
+    except BaseException as e:
+        erro = e
+        registro["erro"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        registro["duracao_s"] = round(time.perf_counter() - inicio, 4)
+        registro["memoria_rss_mb"] = memoria_atual_mb()
+        _span_atual.reset(token)
+        if relatorio is not None:
+            relatorio.spans.append(registro)
+        if otel_cm is not None:
+            for chave, valor in registro["atributos"].items():
+                if isinstance(valor, (str, bool, int, float)):
+                    otel_span.set_attribute(chave, valor)
+            if erro is not None:
+                otel_span.record_exception(erro)
+            otel_cm.__exit__(type(erro) if erro else None, erro, erro.__traceback__ if erro else None)
+
+
+def contar(nome: str, valor: float = 1):
+    """Soma `valor` ao contador `nome` do relatório atual (e ao contador OpenTelemetry correspondente)."""
+    relatorio = _relatorio_atual.get()
+    if relatorio is not None:
+        relatorio.contadores[nome] += valor
+    if _meter is not None:
+        contador = _contadores_otel.get(nome)
+        if contador is None:
+            contador = _contadores_otel[nome] = _meter.create_counter(f"editais.{nome}")
+        contador.add(valor)
+
+
+def instrumentar(nome: Optional[str] = None):
+    """Decorator que envolve a função (síncrona ou assíncrona) em um span."""
+    def decorator(func):
+        nome_span = nome or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper_async(*args, **kwargs):
+                with span(nome_span):
+                    return await func(*args, **kwargs)
+            return wrapper_async
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(nome_span):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_otel_configurado = False
+
+def configurar_opentelemetry(nome_servico: str = "editais"):
+    """
+    Configura o SDK do OpenTelemetry para exportar os spans (TracerProvider) e os contadores (MeterProvider
+    com leitura periódica a cada OTEL_METRIC_EXPORT_INTERVAL ms, padrão 60000).
+    Usa os exportadores OTLP se OTEL_EXPORTER_OTLP_ENDPOINT estiver definido (e o pacote do exportador instalado)
+    ou os de console se OTEL_CONSOLE=1. Sem nenhum dos dois, não faz nada.
+    """
+    global _otel_configurado
+    if _otel_configurado or trace is None:
+        return
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    console = os.getenv("OTEL_CONSOLE", "0") == "1"
+    if not endpoint and not console:
+        return
+    try:
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        print("AVISO: opentelemetry-sdk não instalado; spans e contadores não serão exportados.")
+        return
+
+    exportador = None
+    exportador_metricas = None
+    if endpoint:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            exportador = OTLPSpanExporter()
+            exportador_metricas = OTLPMetricExporter()
+        except ImportError:
+            print("AVISO: Exportador OTLP (opentelemetry-exporter-otlp-proto-http) não instalado.")
+    if exportador is None and console:
+        exportador = ConsoleSpanExporter()
+        exportador_metricas = ConsoleMetricExporter()
+    if exportador is None:
+        return
+
+    recurso = Resource.create({"service.name": nome_servico})
+    provider = TracerProvider(resource=recurso)
+    provider.add_span_processor(BatchSpanProcessor(exportador))
+    trace.set_tracer_provider(provider)
+    # O _meter do módulo é um proxy: os contadores já criados passam a usar este provider
+    intervalo_ms = int(os.getenv("OTEL_METRIC_EXPORT_INTERVAL", "60000"))
+    leitor = PeriodicExportingMetricReader(exportador_metricas, export_interval_millis=intervalo_ms)
+    metrics.set_meter_provider(MeterProvider(resource=recurso, metric_readers=[leitor]))
+    _otel_configurado = True
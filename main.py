@@ -9,6 +9,7 @@ from typing import List, Dict, Any # Importar tipos para o histórico de chat
 from browser_agent import run_fomento_search_agent
 from indexador_pdf import process_pdfs_into_documents # Usando o nome que você forneceu
 from rag import HuggingFaceEmbedding, perguntar_openai, retrieve_documents # Usando o nome que você forneceu
+from qa_pipeline import responder_pergunta_async, formatar_tempos
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
@@ -137,4 +138,27 @@ print("✅ Sistema de RAG e Vector Store carregados globalmente!")
 #             print("Opção inválida. Por favor, digite 1, 2 ou 0.")
 
 # if __name__ == "__main__":
-#     asyncio.run(main_orchestrator())
\ No newline at end of file
+#     asyncio.run(main_orchestrator())
+
+# --- Sessão de Perguntas e Respostas no terminal (pipeline assíncrono) ---
+async def sessao_perguntas_cli():
+    print("\n--- Inciando sessão de Perguntas e Respostas. Digite 'sair' para encerrar. ---")
+    chat_history: List[Dict[str, str]] = []
+
+    while True:
+        user_question = (await asyncio.to_thread(input, "\nSua pergunta (ou 'sair'): ")).strip()
+        if user_question.lower() == 'sair':
+            print("Saindo do programa. Adeus!")
+            break
+        if not user_question:
+            continue
+
+        resultado = await responder_pergunta_async(user_question, vectorstore, chat_history=chat_history)
+        print("\n📌 Resposta do modelo:\n", resultado["resposta"])
+        print(f"Tempos por etapa ({resultado['origem']}): {formatar_tempos(resultado['tempos'])}")
+
+        chat_history.append({"role": "user", "content": user_question})
+        chat_history.append({"role": "assistant", "content": resultado["resposta"]})
+
+if __name__ == "__main__":
+    asyncio.run(sessao_perguntas_cli())
@@ -0,0 +1,113 @@
+# ocr_paginas.py
+# Fila de OCR para páginas escaneadas (só imagem). As páginas são renderizadas com o pdfplumber
+# e reconhecidas com o tesseract local em um pool limitado de threads, para que o restante da
+# indexação continue enquanto o OCR roda. O texto reconhecido fica em cache por hash da página.
+import contextvars
+import io
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import pdfplumber
+
+from cache_extracao import CacheExtracao
+from instrumentacao import span, contar
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_IDIOMA = os.getenv("OCR_IDIOMA", "por")
+OCR_RESOLUCAO = int(os.getenv("OCR_RESOLUCAO", "300"))
+# Máximo de páginas enfileiradas ou em OCR ao mesmo tempo (padrão: 2x o número de workers)
+OCR_EM_VOO = int(os.getenv("OCR_EM_VOO", "0"))
+
+_aviso_lock = threading.Lock()
+_aviso_emitido = False
+
+def ocr_disponivel() -> bool:
+    """True se o pytesseract está instalado e o binário do tesseract responde."""
+    global _aviso_emitido
+    if os.getenv("OCR_DESATIVADO") == "1":
+        return False
+    motivo = None
+    if pytesseract is None:
+        motivo = "pytesseract não está instalado"
+    else:
+        try:
+            pytesseract.get_tesseract_version()
+        except Exception as e:
+            motivo = f"tesseract indisponível ({e})"
+    if motivo:
+        with _aviso_lock:
+            if not _aviso_emitido:
+                print(f"AVISO: OCR desativado: {motivo}. Páginas escaneadas não serão indexadas.")
+                _aviso_emitido = True
+        return False
+    return True
+
+
+class FilaOCR:
+    """
+    Pool limitado de workers de OCR. `enviar` devolve um Future com o texto da página ("" em caso de falha)
+    e só bloqueia quando já há `max_em_voo` páginas pendentes (backpressure: um PDF escaneado grande não
+    enfileira todas as páginas de uma vez). Use como context manager para garantir o encerramento do pool.
+    """
+    def __init__(self, cache: Optional[CacheExtracao] = None, max_workers: int = OCR_WORKERS, idioma: str = OCR_IDIOMA,
+                 max_em_voo: int = OCR_EM_VOO):
+        self.cache = cache
+        self.idioma = idioma
+        self.versao = f"tesseract-{idioma}-{OCR_RESOLUCAO}dpi"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr")
+        self._em_voo = threading.BoundedSemaphore(max_em_voo or 2 * max_workers)
+
+    def enviar(self, conteudo_pdf: bytes, indice_pagina: int, hash_pagina: str) -> Future:
+        self._em_voo.acquire()
+        contar("paginas_ocr_enfileiradas")
+        try:
+            # copy_context: spans e contadores do OCR entram no relatório da execução atual
+            future = self._executor.submit(
+                contextvars.copy_context().run, self._executar, conteudo_pdf, indice_pagina, hash_pagina
+            )
+        except BaseException:
+            self._em_voo.release()
+            raise
+        future.add_done_callback(lambda _: self._em_voo.release())
+        return future
+
+    def _executar(self, conteudo_pdf: bytes, indice_pagina: int, hash_pagina: str) -> str:
+        if self.cache is not None:
+            texto = self.cache.carregar_ocr(hash_pagina, self.versao)
+            if texto is not None:
+                contar("paginas_ocr_cache")
+                return texto
+        try:
+            with span("indexacao.ocr", pagina=indice_pagina + 1):
+                with pdfplumber.open(io.BytesIO(conteudo_pdf)) as pdf:
+                    imagem = pdf.pages[indice_pagina].to_image(resolution=OCR_RESOLUCAO).original
+                texto = pytesseract.image_to_string(imagem, lang=self.idioma)
+        except Exception as e:
+            print(f"ERRO: OCR da página {indice_pagina + 1} falhou: {e}")
+            return ""
+        contar("paginas_ocr")
+        if self.cache is not None:
+            self.cache.salvar_ocr(hash_pagina, self.versao, texto)
+        return texto
+
+    def encerrar(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.encerrar()
+        return False
+
+
+def criar_fila_ocr(cache: Optional[CacheExtracao] = None) -> Optional[FilaOCR]:
+    """Cria a fila de OCR, ou devolve None se o OCR não estiver disponível neste ambiente."""
+    return FilaOCR(cache) if ocr_disponivel() else None
@@ -0,0 +1,225 @@
+# qa_pipeline.py
+import asyncio
+import re
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from edital_manager import load_cached_grants
+from instrumentacao import span, relatorio_execucao
+from rag import (
+    perguntar_openai,
+    mesclar_documentos,
+    K_SIMILARES,
+    K_CRONOGRAMA,
+    PREFIXO_CRONOGRAMA,
+    FILTRO_CRONOGRAMA,
+)
+
+MENSAGEM_SEM_DOCUMENTOS = "Desculpe, não encontrei informações relevantes para sua pergunta nos editais indexados. Por favor, tente indexar mais dados."
+
+# Função que recebe uma lista de textos e devolve seus embeddings (uma única passada no modelo).
+EmbedQueriesFunc = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def responde_por_metadados(pergunta: str) -> str | None:
+    grants = load_cached_grants()
+    # Exemplo: deadline até dezembro de 2025
+    deadline_match = re.search(r'(até|antes de|no máximo)\s*(dezembro|12)[/\- ]?2025', pergunta, re.IGNORECASE)
+    if deadline_match:
+        # Extrai todos os editais com deadline até 31/12/2025
+        def parse_deadline(deadline):
+            # Extrai datas do campo deadline (pode ter múltiplas datas)
+            datas = re.findall(r'(\d{2}/\d{2}/\d{4})', deadline)
+            return [datetime.strptime(d, '%d/%m/%Y') for d in datas]
+        limite = datetime(2025, 12, 31)
+        resultados = []
+        for edital in grants:
+            datas = parse_deadline(edital.get('deadline',''))
+            if datas and any(data <= limite for data in datas):
+                resultados.append(edital)
+        if resultados:
+            resposta = 'Editais com deadline até dezembro de 2025:\n'
+            for e in resultados:
+                resposta += f"- {e.get('title','')} (Agência: {e.get('agency','')}, Deadline: {e.get('deadline','')}, URL: {e.get('url','')})\n"
+            return resposta
+        else:
+            return 'Nenhum edital com deadline até dezembro de 2025 encontrado.'
+    # Outros filtros podem ser implementados aqui (ex: agência, título, etc)
+    return None
+
+
+def priorizar_documentos(pergunta: str, docs: List[Document]) -> List[Document]:
+    """
+    Reordena os documentos recuperados, colocando primeiro os que citam o número
+    do edital ou a URL mencionados na pergunta.
+    """
+    # --- Filtro por número de edital na pergunta ---
+    edital_num_match = re.search(r'(\d{1,3}/\d{4})', pergunta)
+    edital_num = edital_num_match.group(1) if edital_num_match else None
+    if edital_num:
+        docs_prioritarios = [d for d in docs if edital_num in d.page_content or edital_num in d.metadata.get('title','')]
+        docs = docs_prioritarios + [d for d in docs if edital_num not in d.page_content and edital_num not in d.metadata.get('title','')]
+        print(f"Chunks priorizados para edital {edital_num}: {len(docs_prioritarios)}")
+
+    # Filtro por URL fornecida na pergunta (mantido)
+    url_match = re.search(r'https?://\S+', pergunta)
+    url_prioritaria = url_match.group(0) if url_match else None
+    if url_prioritaria:
+        docs_prioritarios = [d for d in docs if d.metadata.get('url','') == url_prioritaria]
+        docs = docs_prioritarios + [d for d in docs if d.metadata.get('url','') != url_prioritaria]
+        print(f"Chunks priorizados para URL {url_prioritaria}: {len(docs_prioritarios)}")
+    return docs
+
+
+def montar_contexto(docs: List[Document]) -> str:
+    """Monta o texto de contexto enviado ao LLM a partir dos documentos priorizados."""
+    contexto = ""
+    for doc in docs:
+        meta = doc.metadata
+        link = meta.get('url', '')
+        deadline = meta.get('deadline', '')
+        score = getattr(doc, 'score', None) or getattr(doc, 'similarity_score', None)
+        contexto += doc.page_content + "\n"
+        if score is not None:
+            contexto += f"[Similaridade com a pergunta: {score:.2%}]\n"
+        if link:
+            contexto += f"Link do edital: {link}\n"
+        if deadline:
+            contexto += f"Prazo (deadline): {deadline}\n"
+        contexto += "\n"
+    return contexto
+
+
+async def _cronometrar(tempos: Dict[str, float], etapa: str, awaitable: Awaitable[Any]) -> Any:
+    inicio = time.perf_counter()
+    try:
+        with span(f"qa.{etapa}"):
+            return await awaitable
+    finally:
+        tempos[etapa] = time.perf_counter() - inicio
+
+
+async def buscar_documentos_async(
+    pergunta: str,
+    vectorstore_instance: Chroma,
+    embed_queries: Optional[EmbedQueriesFunc] = None,
+    tempos: Optional[Dict[str, float]] = None,
+) -> List[Document]:
+    """
+    Versão assíncrona de `rag.retrieve_documents`.
+    Gera os embeddings da pergunta e da consulta de cronograma numa única chamada
+    e executa as duas buscas no Chroma ao mesmo tempo.
+    """
+    if tempos is None:
+        tempos = {}
+    if embed_queries is None:
+        def embed_queries(textos: List[str]) -> Awaitable[List[List[float]]]:
+            return asyncio.to_thread(vectorstore_instance.embeddings.embed_documents, textos)
+
+    vetor_pergunta, vetor_cronograma = await _cronometrar(
+        tempos, "embedding", embed_queries([pergunta, PREFIXO_CRONOGRAMA + pergunta])
+    )
+
+    docs_cronograma_principal, docs_similar = await asyncio.gather(
+        _cronometrar(tempos, "busca_cronograma", asyncio.to_thread(
+            vectorstore_instance.similarity_search_by_vector,
+            vetor_cronograma,
+            k=K_CRONOGRAMA,
+            filter=FILTRO_CRONOGRAMA,
+        )),
+        _cronometrar(tempos, "busca_geral", asyncio.to_thread(
+            vectorstore_instance.similarity_search_by_vector,
+            vetor_pergunta,
+            k=K_SIMILARES,
+        )),
+    )
+    return mesclar_documentos(docs_cronograma_principal, docs_similar)
+
+
+async def responder_pergunta_async(
+    pergunta: str,
+    vectorstore_instance: Chroma,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+    embed_queries: Optional[EmbedQueriesFunc] = None,
+) -> Dict[str, Any]:
+    """
+    Pipeline assíncrono de perguntas e respostas.
+
+    A consulta por metadados e a recuperação (embedding + busca de cronograma + busca geral)
+    rodam ao mesmo tempo; a chamada ao LLM começa assim que o contexto fica pronto.
+
+    Retorna um dicionário com 'resposta', 'origem' ('metadados', 'rag' ou 'sem_documentos'),
+    'documentos' e 'tempos' (segundos por etapa). Cada pergunta gera um relatório JSON em RELATORIOS_DIR.
+    """
+    with relatorio_execucao("pergunta", pergunta=pergunta[:200]) as relatorio:
+        resultado = await _responder_pergunta(pergunta, vectorstore_instance, chat_history, embed_queries)
+        relatorio.atributos.update(origem=resultado["origem"], documentos=len(resultado["documentos"]), tempos=resultado["tempos"])
+    return resultado
+
+
+async def _responder_pergunta(
+    pergunta: str,
+    vectorstore_instance: Chroma,
+    chat_history: Optional[List[Dict[str, str]]],
+    embed_queries: Optional[EmbedQueriesFunc],
+) -> Dict[str, Any]:
+    tempos: Dict[str, float] = {}
+    inicio_total = time.perf_counter()
+
+    tarefa_metadados = asyncio.create_task(
+        _cronometrar(tempos, "metadados", asyncio.to_thread(responde_por_metadados, pergunta))
+    )
+    tarefa_busca = asyncio.create_task(
+        _cronometrar(tempos, "recuperacao", buscar_documentos_async(pergunta, vectorstore_instance, embed_queries, tempos))
+    )
+
+    try:
+        resposta_meta = await tarefa_metadados
+    except Exception as e:
+        print(f"AVISO: Falha na consulta por metadados: {e}")
+        resposta_meta = None
+
+    if resposta_meta:
+        tarefa_busca.cancel()
+        tempos["total"] = time.perf_counter() - inicio_total
+        return {"resposta": resposta_meta, "origem": "metadados", "documentos": [], "tempos": tempos}
+
+    docs = await tarefa_busca
+    print(f"Docs retornados: {len(docs)}")
+
+    inicio_contexto = time.perf_counter()
+    docs = priorizar_documentos(pergunta, docs)
+    if not docs:
+        tempos["contexto"] = time.perf_counter() - inicio_contexto
+        tempos["total"] = time.perf_counter() - inicio_total
+        return {"resposta": MENSAGEM_SEM_DOCUMENTOS, "origem": "sem_documentos", "documentos": [], "tempos": tempos}
+    contexto = montar_contexto(docs)
+    tempos["contexto"] = time.perf_counter() - inicio_contexto
+
+    try:
+        # Passa o histórico de chat para a função perguntar_openai
+        resposta = await _cronometrar(
+            tempos, "llm", asyncio.to_thread(perguntar_openai, pergunta, contexto, chat_history=chat_history)
+        )
+    except Exception as e:
+        resposta = f"Ocorreu um erro ao gerar a resposta: {e}. Por favor, verifique sua chave da API ou o status do serviço do LLM."
+
+    tempos["total"] = time.perf_counter() - inicio_total
+    return {"resposta": resposta, "origem": "rag", "documentos": docs, "tempos": tempos}
+
+
+def responder_pergunta(
+    pergunta: str,
+    vectorstore_instance: Chroma,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+) -> Dict[str, Any]:
+    """Atalho síncrono (Streamlit, scripts) para `responder_pergunta_async`."""
+    return asyncio.run(responder_pergunta_async(pergunta, vectorstore_instance, chat_history=chat_history))
+
+
+def formatar_tempos(tempos: Dict[str, float]) -> str:
+    return ", ".join(f"{etapa}={segundos:.2f}s" for etapa, segundos in tempos.items())
@@ -20,10 +20,12 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 # --- Sua Classe HuggingFaceEmbedding (MANTIDA NO embedding.py) ---
 # Certifique-se de que 'embedding.py' existe e contém a classe HuggingFaceEmbedding
 from embedding import HuggingFaceEmbedding 
+from instrumentacao import instrumentar, contar
 
 # --- Configuração do Cliente OpenAI e Modelo para RAG ---
 from typing import Optional
 
+@instrumentar("llm.resposta")
 def perguntar_openai(pergunta: str, contexto: str, chat_history: Optional[List[Dict[str, str]]] = None) -> str: # Adicionado chat_history
     """
     Envia a pergunta e o contexto para o modelo OpenRouter e retorna a resposta.
@@ -77,25 +79,22 @@ def perguntar_openai(pergunta: str, contexto: str, chat_history: Optional[List[D
         messages=messages_for_llm, # Passa as mensagens construídas
         extra_headers=extra_headers_config,
     )
+    if response.usage:
+        contar("tokens_prompt", response.usage.prompt_tokens)
+        contar("tokens_resposta", response.usage.completion_tokens)
     return response.choices[0].message.content.strip() if response.choices[0].message.content else ""
 
 
 # --- Lógica de Recuperação Híbrida (MANTIDA COMO ESTÁ, apenas para referência) ---
-def retrieve_documents(pergunta: str, vectorstore_instance: Chroma) -> list[Document]:
+K_SIMILARES = 100
+K_CRONOGRAMA = 20
+PREFIXO_CRONOGRAMA = "CRONOGRAMA DE EVENTOS E DATAS IMPORTANTES: "
+FILTRO_CRONOGRAMA = {"type": "cronograma_principal"}
+
+def mesclar_documentos(docs_cronograma_principal: list[Document], docs_similar: list[Document]) -> list[Document]:
     """
-    Recupera documentos da vector store usando estratégia híbrida.
-    Recebe a instância da vectorstore como argumento.
+    Junta os resultados das duas buscas (cronograma primeiro), removendo conteúdos repetidos.
     """
-    # Aumentar k para recuperar mais documentos (ex: de 15 para 30 ou 50)
-    docs_similar = vectorstore_instance.similarity_search(pergunta, k=100) 
-
-    # Manter k para cronograma, mas também pode aumentar se necessário
-    docs_cronograma_principal = vectorstore_instance.similarity_search(
-        "CRONOGRAMA DE EVENTOS E DATAS IMPORTANTES: " + pergunta,
-        k=20, # Aumentado para 10
-        filter={"type": "cronograma_principal"}
-    )
-
     all_docs = []
     seen_content = set()
 
@@ -109,4 +108,22 @@ def retrieve_documents(pergunta: str, vectorstore_instance: Chroma) -> list[Docu
             all_docs.append(doc)
             seen_content.add(doc.page_content)
 
-    return all_docs
\ No newline at end of file
+    return all_docs
+
+@instrumentar("recuperacao.hibrida")
+def retrieve_documents(pergunta: str, vectorstore_instance: Chroma) -> list[Document]:
+    """
+    Recupera documentos da vector store usando estratégia híbrida.
+    Recebe a instância da vectorstore como argumento.
+    """
+    # Aumentar k para recuperar mais documentos (ex: de 15 para 30 ou 50)
+    docs_similar = vectorstore_instance.similarity_search(pergunta, k=K_SIMILARES)
+
+    # Manter k para cronograma, mas também pode aumentar se necessário
+    docs_cronograma_principal = vectorstore_instance.similarity_search(
+        PREFIXO_CRONOGRAMA + pergunta,
+        k=K_CRONOGRAMA, # Aumentado para 10
+        filter=FILTRO_CRONOGRAMA
+    )
+
+    return mesclar_documentos(docs_cronograma_principal, docs_similar)
\ No newline at end of file
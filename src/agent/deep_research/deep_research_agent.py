@@ -1,13 +1,16 @@
 import asyncio
+import contextlib
+import hashlib
 import json
 import logging
 import os
+import re
 import threading
+import time
 import uuid
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypedDict
 
-from browser_use.browser.browser import BrowserConfig
 from browser_use.browser.context import BrowserContextWindowSize
 from langchain_community.tools.file_management import (
     ListDirectoryTool,
@@ -31,8 +34,23 @@ from langgraph.graph import StateGraph
 from pydantic import BaseModel, Field
 
 from src.agent.browser_use.browser_use_agent import BrowserUseAgent
+from src.agent.deep_research.research_store import CURRENT_PLAN_STEP, ResearchStore
+from src.agent.deep_research.usage_tracker import (
+    USAGE_SCOPE,
+    UsageCallbackHandler,
+    UsageTracker,
+)
+from src.browser.browser_pool import (
+    BrowserPool,
+    build_browser_config,
+    close_browser_pool,
+    get_browser_pool,
+)
 from src.browser.custom_browser import CustomBrowser
-from src.browser.custom_context import CustomBrowserContextConfig
+from src.browser.custom_context import (
+    CustomBrowserContextConfig,
+    default_blocked_resource_types,
+)
 from src.controller.custom_controller import CustomController
 from src.utils.mcp_client import setup_mcp_client_and_tools
 
@@ -42,9 +60,32 @@ logger = logging.getLogger(__name__)
 REPORT_FILENAME = "report.md"
 PLAN_FILENAME = "research_plan.md"
 SEARCH_INFO_FILENAME = "search_info.json"
+# Per-query budgets for the browser search tool (overridable via browser_config)
+DEFAULT_QUERY_TIMEOUT_S = 300
+DEFAULT_MAX_STEPS_PER_QUERY = 25
+# Hierarchical synthesis: findings larger than this are summarized per plan step before the final report
+STEP_SUMMARIES_FILENAME = "step_summaries.json"
+SYNTHESIS_MAP_REDUCE_THRESHOLD_CHARS = 40000
+SYNTHESIS_MAP_CHUNK_CHARS = 20000
+SYNTHESIS_MAX_CONCURRENCY = 4
+# Extra reduce levels applied while the joined step summaries still exceed the threshold
+SYNTHESIS_MAX_REDUCE_LEVELS = 3
+# Dependency marker the planner appends to a step, e.g. "4. Compare A and B (depends on: 2, 3)"
+DEPENDENCY_PATTERN = re.compile(r"\s*\(\s*depends on:?\s*([^)]*)\)\s*\.?\s*$", re.IGNORECASE)
+# Cap on the findings of prerequisite steps passed to a dependent step in "dag" execution mode
+DEPENDENCY_CONTEXT_MAX_CHARS = 20000
+STEP_EXECUTION_SYSTEM_PROMPT = (
+    "You are a research assistant executing one step of a research plan. Use the available tools, "
+    "especially the 'parallel_browser_search' tool, to gather information needed for the current task. "
+    "Be precise with your search queries if using the browser tool."
+)
 
 _AGENT_STOP_FLAGS = {}
 _BROWSER_AGENT_INSTANCES = {}
+# Global concurrency budgets of a research task: {"browser": Semaphore, "llm": Semaphore}, keyed by task_id
+_TASK_CONCURRENCY_BUDGETS: Dict[str, Dict[str, asyncio.Semaphore]] = {}
+# Token / latency / wall time accounting of a research task, keyed by task_id
+_TASK_USAGE_TRACKERS: Dict[str, UsageTracker] = {}
 
 
 async def run_single_browser_task(
@@ -54,10 +95,13 @@ async def run_single_browser_task(
     browser_config: Dict[str, Any],
     stop_event: threading.Event,
     use_vision: bool = False,
+    browser_pool: Optional[BrowserPool] = None,
+    max_steps: int = DEFAULT_MAX_STEPS_PER_QUERY,
 ) -> Dict[str, Any]:
     """
-    Runs a single BrowserUseAgent task.
-    Manages browser creation and closing for this specific task.
+    Runs a single BrowserUseAgent task, limited to `max_steps` agent steps.
+    With a `browser_pool`, borrows a warm browser and only creates a fresh context for this task;
+    otherwise launches and closes a dedicated browser.
     """
     if not BrowserUseAgent:
         return {
@@ -67,52 +111,38 @@ async def run_single_browser_task(
 
     # --- Browser Setup ---
     # These should ideally come from the main agent's config
-    headless = browser_config.get("headless", False)
     window_w = browser_config.get("window_width", 1280)
     window_h = browser_config.get("window_height", 1100)
-    browser_user_data_dir = browser_config.get("user_data_dir", None)
-    use_own_browser = browser_config.get("use_own_browser", False)
-    browser_binary_path = browser_config.get("browser_binary_path", None)
-    wss_url = browser_config.get("wss_url", None)
-    cdp_url = browser_config.get("cdp_url", None)
-    disable_security = browser_config.get("disable_security", False)
 
     bu_browser = None
     bu_browser_context = None
+    pooled_browser = None
+    task_key = f"{task_id}_{uuid.uuid4()}"
+    # LLM calls of this sub-agent are tallied under its own scope
+    usage_scope = f"browser: {task_query}"
+    scope_token = USAGE_SCOPE.set(usage_scope)
+    started = time.perf_counter()
+    browser_steps = 0
+    status = "cancelled"
     try:
         logger.info(f"Starting browser task for query: {task_query}")
-        extra_args = [f"--window-size={window_w},{window_h}"]
-        if browser_user_data_dir:
-            extra_args.append(f"--user-data-dir={browser_user_data_dir}")
-        if use_own_browser:
-            browser_binary_path = os.getenv("CHROME_PATH", None) or browser_binary_path
-            if browser_binary_path == "":
-                browser_binary_path = None
-            chrome_user_data = os.getenv("CHROME_USER_DATA", None)
-            if chrome_user_data:
-                extra_args += [f"--user-data-dir={chrome_user_data}"]
-        else:
-            browser_binary_path = None
-
-        bu_browser = CustomBrowser(
-            config=BrowserConfig(
-                headless=headless,
-                disable_security=disable_security,
-                browser_binary_path=browser_binary_path,
-                extra_browser_args=extra_args,
-                wss_url=wss_url,
-                cdp_url=cdp_url,
-            )
-        )
-
         context_config = CustomBrowserContextConfig(
             save_downloads_path="./tmp/downloads",
             browser_window_size=BrowserContextWindowSize(
                 width=window_w, height=window_h
             ),
             force_new_context=True,
+            block_resources=browser_config.get("block_resources", False),
+            blocked_resource_types=default_blocked_resource_types(use_vision),
         )
-        bu_browser_context = await bu_browser.new_context(config=context_config)
+        if browser_pool:
+            # Warm browser from the pool: only the (isolated) context is created per task
+            pooled_browser = await browser_pool.acquire()
+            bu_browser = pooled_browser.browser
+            bu_browser_context = await pooled_browser.new_context(context_config)
+        else:
+            bu_browser = CustomBrowser(config=build_browser_config(browser_config))
+            bu_browser_context = await bu_browser.new_context(config=context_config)
 
         # Simple controller example, replace with your actual implementation if needed
         bu_controller = CustomController()
@@ -141,7 +171,6 @@ async def run_single_browser_task(
         )
 
         # Store instance for potential stop() call
-        task_key = f"{task_id}_{uuid.uuid4()}"
         _BROWSER_AGENT_INSTANCES[task_key] = bu_agent_instance
 
         # --- Run with Stop Check ---
@@ -152,28 +181,40 @@ async def run_single_browser_task(
             logger.info(f"Browser task for '{task_query}' cancelled before start.")
             return {"query": task_query, "result": None, "status": "cancelled"}
 
-        # The run needs to be awaitable and ideally accept a stop signal or have a .stop() method
-        # result = await bu_agent_instance.run(max_steps=max_steps) # Add max_steps if applicable
-        # Let's assume a simplified run for now
-        logger.info(f"Running BrowserUseAgent for: {task_query}")
-        result = await bu_agent_instance.run()  # Assuming run is the main method
+        logger.info(f"Running BrowserUseAgent for: {task_query} (max {max_steps} steps)")
+        result = await bu_agent_instance.run(max_steps=max_steps)
         logger.info(f"BrowserUseAgent finished for: {task_query}")
+        browser_steps = result.number_of_steps()
 
         final_data = result.final_result()
 
         if stop_event.is_set():
             logger.info(f"Browser task for '{task_query}' stopped during execution.")
+            status = "stopped"
             return {"query": task_query, "result": final_data, "status": "stopped"}
         else:
             logger.info(f"Browser result for '{task_query}': {final_data}")
+            status = "completed"
             return {"query": task_query, "result": final_data, "status": "completed"}
 
+    except asyncio.CancelledError:
+        # Cancelled by the per-query wait_for timeout, unless the user asked the research to stop
+        status = "cancelled" if stop_event.is_set() else "timeout"
+        raise
     except Exception as e:
         logger.error(
             f"Error during browser task for query '{task_query}': {e}", exc_info=True
         )
+        status = "failed"
         return {"query": task_query, "error": str(e), "status": "failed"}
     finally:
+        USAGE_SCOPE.reset(scope_token)
+        tracker = _TASK_USAGE_TRACKERS.get(task_id)
+        if tracker:
+            tracker.record_sub_agent(
+                usage_scope, browser_steps, time.perf_counter() - started, status
+            )
+            tracker.save()
         if bu_browser_context:
             try:
                 await bu_browser_context.close()
@@ -181,7 +222,10 @@ async def run_single_browser_task(
                 logger.info("Closed browser context.")
             except Exception as e:
                 logger.error(f"Error closing browser context: {e}")
-        if bu_browser:
+        if pooled_browser:
+            # Back to the pool (or recycled if it crashed / reached its use limit)
+            await browser_pool.release(pooled_browser)
+        elif bu_browser:
             try:
                 await bu_browser.close()
                 bu_browser = None
@@ -206,62 +250,119 @@ async def _run_browser_search_tool(
     browser_config: Dict[str, Any],
     stop_event: threading.Event,
     max_parallel_browsers: int = 1,
+    on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    result_store: Optional[ResearchStore] = None,
 ) -> List[Dict[str, Any]]:
     """
-    Internal function to execute parallel browser searches based on LLM-provided queries.
-    Handles concurrency and stop signals.
+    Internal function to execute browser searches based on LLM-provided queries.
+    Every query is queued and run by at most `max_parallel_browsers` workers; each query is bounded
+    by a time budget (`query_timeout_s`) and a step budget (`max_steps_per_query`) from browser_config.
+    With a `result_store`, queries equivalent to an already answered one reuse the stored result
+    (marked `"reused": True`) and new results are persisted as soon as they finish.
+    `on_result` is called with each new result as soon as its query finishes.
+    Results are returned in the order of `queries`.
     """
+    # Drop blank and repeated queries, keeping the LLM's order
+    queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+    if not queries:
+        return []
+    results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+    pending: asyncio.Queue = asyncio.Queue()
+    for index, query in enumerate(queries):
+        stored = result_store.lookup(query) if result_store else None
+        if stored:
+            logger.info(f"[Browser Tool {task_id}] Reusing stored result for query: {query}")
+            results[index] = {**stored, "query": query, "reused": True}
+        else:
+            pending.put_nowait((index, query))
+    if pending.empty():
+        return results
 
-    # Limit queries just in case LLM ignores the description
-    queries = queries[:max_parallel_browsers]
+    num_workers = max(1, min(max_parallel_browsers, pending.qsize()))
+    query_timeout = browser_config.get("query_timeout_s", DEFAULT_QUERY_TIMEOUT_S)
+    max_steps = browser_config.get("max_steps_per_query", DEFAULT_MAX_STEPS_PER_QUERY)
     logger.info(
-        f"[Browser Tool {task_id}] Running search for {len(queries)} queries: {queries}"
+        f"[Browser Tool {task_id}] Running search for {pending.qsize()} queries with {num_workers} worker(s): {queries}"
     )
 
-    results = []
-    semaphore = asyncio.Semaphore(max_parallel_browsers)
+    # Shared by every search of this research task; closed when the run ends
+    browser_pool = get_browser_pool(task_id, browser_config, size=max_parallel_browsers)
+    finished = 0
+    to_run = pending.qsize()
 
-    async def task_wrapper(query):
-        async with semaphore:
-            if stop_event.is_set():
-                logger.info(
-                    f"[Browser Tool {task_id}] Skipping task due to stop signal: {query}"
-                )
-                return {"query": query, "result": None, "status": "cancelled"}
-            # Pass necessary injected configs and the stop event
-            return await run_single_browser_task(
-                query,
-                task_id,
-                llm,  # Pass the main LLM (or a dedicated one if needed)
-                browser_config,
-                stop_event,
-                # use_vision could be added here if needed
+    async def run_query(query: str) -> Dict[str, Any]:
+        if stop_event.is_set():
+            logger.info(
+                f"[Browser Tool {task_id}] Skipping task due to stop signal: {query}"
             )
-
-    tasks = [task_wrapper(query) for query in queries]
-    search_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-    processed_results = []
-    for i, res in enumerate(search_results):
-        query = queries[i]  # Get corresponding query
-        if isinstance(res, Exception):
-            logger.error(
-                f"[Browser Tool {task_id}] Gather caught exception for query '{query}': {res}",
-                exc_info=True,
+            return {"query": query, "result": None, "status": "cancelled"}
+        try:
+            result = await asyncio.wait_for(
+                run_single_browser_task(
+                    query,
+                    task_id,
+                    llm,  # Pass the main LLM (or a dedicated one if needed)
+                    browser_config,
+                    stop_event,
+                    # use_vision could be added here if needed
+                    browser_pool=browser_pool,
+                    max_steps=max_steps,
+                ),
+                timeout=query_timeout,
             )
-            processed_results.append(
-                {"query": query, "error": str(res), "status": "failed"}
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"[Browser Tool {task_id}] Query timed out after {query_timeout}s: {query}"
             )
-        elif isinstance(res, dict):
-            processed_results.append(res)
-        else:
+            return {
+                "query": query,
+                "error": f"Timed out after {query_timeout}s",
+                "status": "timeout",
+            }
+        except Exception as e:
             logger.error(
-                f"[Browser Tool {task_id}] Unexpected result type for query '{query}': {type(res)}"
+                f"[Browser Tool {task_id}] Exception for query '{query}': {e}",
+                exc_info=True,
             )
-            processed_results.append(
-                {"query": query, "error": "Unexpected result type", "status": "failed"}
+            return {"query": query, "error": str(e), "status": "failed"}
+        if not isinstance(result, dict):
+            logger.error(
+                f"[Browser Tool {task_id}] Unexpected result type for query '{query}': {type(result)}"
             )
+            return {"query": query, "error": "Unexpected result type", "status": "failed"}
+        return result
 
+    async def worker():
+        nonlocal finished
+        while True:
+            try:
+                index, query = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # Shared with the browser searches of other plan steps running at the same time
+            async with _concurrency_budget(task_id, "browser"):
+                result = await run_query(query)
+            # Cancelled queries are not persisted so that a resumed run executes them
+            if result_store and result.get("status") != "cancelled":
+                result = result_store.append(result)
+            results[index] = result
+            finished += 1
+            logger.info(
+                f"[Browser Tool {task_id}] {finished}/{to_run} queries done "
+                f"('{query}': {result.get('status')})."
+            )
+            if on_result:
+                try:
+                    on_result(result)
+                except Exception as e:
+                    logger.error(f"[Browser Tool {task_id}] on_result callback failed: {e}")
+
+    await asyncio.gather(*(worker() for _ in range(num_workers)))
+
+    processed_results = [
+        res if res is not None else {"query": query, "result": None, "status": "cancelled"}
+        for query, res in zip(queries, results)
+    ]
     logger.info(
         f"[Browser Tool {task_id}] Finished search. Results count: {len(processed_results)}"
     )
@@ -274,6 +375,8 @@ def create_browser_search_tool(
     task_id: str,
     stop_event: threading.Event,
     max_parallel_browsers: int = 1,
+    on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    result_store: Optional[ResearchStore] = None,
 ) -> StructuredTool:
     """Factory function to create the browser search tool with necessary dependencies."""
     # Use partial to bind the dependencies that aren't part of the LLM call arguments
@@ -286,14 +389,16 @@ def create_browser_search_tool(
         browser_config=browser_config,
         stop_event=stop_event,
         max_parallel_browsers=max_parallel_browsers,
+        on_result=on_result,
+        result_store=result_store,
     )
 
     return StructuredTool.from_function(
         coroutine=bound_tool_func,
         name="parallel_browser_search",
         description=f"""Use this tool to actively search the web for information related to a specific research task or question.
-It runs up to {max_parallel_browsers} searches in parallel using a browser agent for better results than simple scraping.
-Provide a list of distinct search queries(up to {max_parallel_browsers}) that are likely to yield relevant information.""",
+It runs every query you provide using a browser agent for better results than simple scraping, {max_parallel_browsers} at a time.
+Provide in a single call all the distinct search queries that are likely to yield relevant information for the current task.""",
         args_schema=BrowserSearchInput,
     )
 
@@ -307,13 +412,17 @@ class ResearchPlanItem(TypedDict):
     status: str  # "pending", "completed", "failed"
     queries: Optional[List[str]]  # Queries generated for this task
     result_summary: Optional[str]  # Optional brief summary after execution
+    depends_on: Optional[List[int]]  # Steps that must finish first (used by the "dag" execution mode)
 
 
 class DeepResearchState(TypedDict):
     task_id: str
     topic: str
     research_plan: List[ResearchPlanItem]
-    search_results: List[Dict[str, Any]]  # Stores results from browser_search_tool_func
+    search_results: List[Dict[str, Any]]  # Browser results; only used when there is no result_store
+    result_store: Optional[ResearchStore]  # Append-only store backing search_results
+    synthesis_mode: str  # "auto", "single" or "map_reduce"
+    execution_mode: str  # "sequential" or "dag"
     # messages: Sequence[BaseMessage] # History for ReAct-like steps within nodes
     llm: Any  # The LLM instance
     tools: List[Tool]
@@ -331,8 +440,21 @@ class DeepResearchState(TypedDict):
 # --- Langgraph Nodes ---
 
 
-def _load_previous_state(task_id: str, output_dir: str) -> Dict[str, Any]:
-    """Loads state from files if they exist."""
+def _split_dependencies(task_text: str) -> Tuple[str, List[int]]:
+    """Separates a trailing "(depends on: N, M)" marker from a plan step's text."""
+    match = DEPENDENCY_PATTERN.search(task_text)
+    if not match:
+        return task_text, []
+    return task_text[: match.start()].rstrip(), [int(n) for n in re.findall(r"\d+", match.group(1))]
+
+
+def _load_previous_state(
+    task_id: str, output_dir: str, result_store: Optional[ResearchStore] = None
+) -> Dict[str, Any]:
+    """
+    Loads state from files if they exist.
+    Search results stay in `result_store` (a legacy search_info.json is imported into it once).
+    """
     state_updates = {}
     plan_file = os.path.join(output_dir, PLAN_FILENAME)
     search_file = os.path.join(output_dir, SEARCH_INFO_FILENAME)
@@ -346,7 +468,7 @@ def _load_previous_state(task_id: str, output_dir: str) -> Dict[str, Any]:
                     line = line.strip()
                     if line.startswith(("- [x]", "- [ ]")):
                         status = "completed" if line.startswith("- [x]") else "pending"
-                        task = line[5:].strip()
+                        task, depends_on = _split_dependencies(line[5:].strip())
                         plan.append(
                             ResearchPlanItem(
                                 step=step,
@@ -354,6 +476,7 @@ def _load_previous_state(task_id: str, output_dir: str) -> Dict[str, Any]:
                                 status=status,
                                 queries=None,
                                 result_summary=None,
+                                depends_on=depends_on,
                             )
                         )
                         step += 1
@@ -370,7 +493,15 @@ def _load_previous_state(task_id: str, output_dir: str) -> Dict[str, Any]:
         except Exception as e:
             logger.error(f"Failed to load or parse research plan {plan_file}: {e}")
             state_updates["error_message"] = f"Failed to load research plan: {e}"
-    if os.path.exists(search_file):
+    if result_store is not None:
+        if not len(result_store) and os.path.exists(search_file):
+            try:
+                imported = result_store.import_json(search_file)
+                logger.info(f"Imported {imported} search results from {search_file}")
+            except Exception as e:
+                logger.error(f"Failed to import search results {search_file}: {e}")
+        logger.info(f"Resuming with {len(result_store)} stored search results from {result_store.path}")
+    elif os.path.exists(search_file):
         try:
             with open(search_file, "r", encoding="utf-8") as f:
                 state_updates["search_results"] = json.load(f)
@@ -391,22 +522,22 @@ def _save_plan_to_md(plan: List[ResearchPlanItem], output_dir: str):
             f.write("# Research Plan\n\n")
             for item in plan:
                 marker = "- [x]" if item["status"] == "completed" else "- [ ]"
-                f.write(f"{marker} {item['task']}\n")
+                depends_on = item.get("depends_on")
+                suffix = f" (depends on: {', '.join(map(str, depends_on))})" if depends_on else ""
+                f.write(f"{marker} {item['task']}{suffix}\n")
         logger.info(f"Research plan saved to {plan_file}")
     except Exception as e:
         logger.error(f"Failed to save research plan to {plan_file}: {e}")
 
 
-def _save_search_results_to_json(results: List[Dict[str, Any]], output_dir: str):
-    """Appends or overwrites search results to a JSON file."""
+def _export_search_results_to_json(result_store: ResearchStore, output_dir: str):
+    """Exports the stored search results to search_info.json (a snapshot; the store is the source of truth)."""
     search_file = os.path.join(output_dir, SEARCH_INFO_FILENAME)
     try:
-        # Simple overwrite for now, could be append
-        with open(search_file, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
-        logger.info(f"Search results saved to {search_file}")
+        result_store.export_json(search_file)
+        logger.info(f"Search results exported to {search_file}")
     except Exception as e:
-        logger.error(f"Failed to save search results to {search_file}: {e}")
+        logger.error(f"Failed to export search results to {search_file}: {e}")
 
 
 def _save_report_to_md(report: str, output_dir: Path):
@@ -455,8 +586,11 @@ async def planning_node(state: DeepResearchState) -> Dict[str, Any]:
         3. Analyze the current state-of-the-art and recent advancements in [Topic].
         4. Investigate the major challenges and limitations associated with [Topic].
         5. Explore the future trends and potential applications of [Topic].
-        6. Summarize the findings and draw conclusions.
+        6. Compare the historical developments with the current state of [Topic]. (depends on: 2, 3)
+        7. Summarize the findings and draw conclusions. (depends on: 1, 2, 3, 4, 5, 6)
 
+        When a step needs the results of earlier steps, end it with "(depends on: N, M)" listing those step numbers.
+        Steps without this marker must be answerable on their own; they may be researched at the same time.
         Keep the plan focused and manageable. Aim for 5-10 detailed steps.
         """,
             ),
@@ -470,7 +604,8 @@ async def planning_node(state: DeepResearchState) -> Dict[str, Any]:
 
         # Parse the numbered list into the plan structure
         new_plan: List[ResearchPlanItem] = []
-        for i, line in enumerate(plan_text.strip().split("\n")):
+        step_by_number: Dict[int, int] = {}  # Number used by the LLM -> our step number
+        for line in plan_text.strip().split("\n"):
             line = line.strip()
             if line and (line[0].isdigit() or line.startswith(("*", "-"))):
                 # Simple parsing: remove number/bullet and space
@@ -479,16 +614,24 @@ async def planning_node(state: DeepResearchState) -> Dict[str, Any]:
                     if line[0].isdigit()
                     else line[1:].strip()
                 )
+                task_text, dependencies = _split_dependencies(task_text)
                 if task_text:
+                    step = len(new_plan) + 1
                     new_plan.append(
                         ResearchPlanItem(
-                            step=i + 1,
+                            step=step,
                             task=task_text,
                             status="pending",
                             queries=None,
                             result_summary=None,
+                            # Only earlier steps count, so the plan is always acyclic
+                            depends_on=[
+                                step_by_number[d] for d in dependencies if d in step_by_number
+                            ],
                         )
                     )
+                    number = re.match(r"\d+", line)
+                    step_by_number[int(number.group()) if number else step] = step
 
         if not new_plan:
             logger.error("LLM failed to generate a valid plan structure.")
@@ -508,36 +651,28 @@ async def planning_node(state: DeepResearchState) -> Dict[str, Any]:
         return {"error_message": f"LLM Error during planning: {e}"}
 
 
-async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
+def _concurrency_budget(task_id: str, kind: str):
+    """Global per-task semaphore ("browser" or "llm"); a no-op context when the task has no budget."""
+    semaphore = _TASK_CONCURRENCY_BUDGETS.get(task_id, {}).get(kind)
+    return semaphore if semaphore is not None else contextlib.nullcontext()
+
+
+async def _execute_plan_step(
+    state: DeepResearchState, current_step: ResearchPlanItem, history: List[BaseMessage]
+) -> Dict[str, Any]:
     """
-    Executes the next step in the research plan by invoking the LLM with tools.
-    The LLM decides which tool (e.g., browser search) to use and provides arguments.
+    Executes one plan step by invoking the LLM with tools; the LLM decides which tool
+    (e.g., browser search) to use and provides arguments. Updates `current_step`'s status and
+    returns {"messages": [...]} with the messages of this step, plus "error_message" or
+    "stop_requested" when applicable.
     """
-    logger.info("--- Entering Research Execution Node ---")
-    if state.get("stop_requested"):
-        logger.info("Stop requested, skipping research execution.")
-        return {
-            "stop_requested": True,
-            "current_step_index": state["current_step_index"],
-        }  # Keep index same
-
-    plan = state["research_plan"]
-    current_index = state["current_step_index"]
     llm = state["llm"]
     tools = state["tools"]  # Tools are now passed in state
-    output_dir = str(state["output_dir"])
     task_id = state["task_id"]
-    # Stop event is bound inside the tool function, no need to pass directly here
-
-    if not plan or current_index >= len(plan):
-        logger.info("Research plan complete or empty.")
-        # This condition should ideally be caught by `should_continue` before reaching here
-        return {}
-
-    current_step = plan[current_index]
-    if current_step["status"] == "completed":
-        logger.info(f"Step {current_step['step']} already completed, skipping.")
-        return {"current_step_index": current_index + 1}  # Move to next step
+    result_store: Optional[ResearchStore] = state.get("result_store")
+    current_search_results = state.get("search_results", [])
+    # Results persisted by the browser tool from this asyncio task belong to this step
+    CURRENT_PLAN_STEP.set(current_step["step"])
 
     logger.info(
         f"Executing research step {current_step['step']}: {current_step['task']}"
@@ -545,18 +680,16 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
 
     # Bind tools to the LLM for this call
     llm_with_tools = llm.bind_tools(tools)
-    if state["messages"]:
+    if history:
         current_task_message = [
             HumanMessage(
                 content=f"Research Task (Step {current_step['step']}): {current_step['task']}"
             )
         ]
-        invocation_messages = state["messages"] + current_task_message
+        invocation_messages = history + current_task_message
     else:
         current_task_message = [
-            SystemMessage(
-                content="You are a research assistant executing one step of a research plan. Use the available tools, especially the 'parallel_browser_search' tool, to gather information needed for the current task. Be precise with your search queries if using the browser tool."
-            ),
+            SystemMessage(content=STEP_EXECUTION_SYSTEM_PROMPT),
             HumanMessage(
                 content=f"Research Task (Step {current_step['step']}): {current_step['task']}"
             ),
@@ -566,7 +699,8 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
     try:
         # Invoke the LLM, expecting it to make a tool call
         logger.info(f"Invoking LLM with tools for task: {current_step['task']}")
-        ai_response: BaseMessage = await llm_with_tools.ainvoke(invocation_messages)
+        async with _concurrency_budget(task_id, "llm"):
+            ai_response: BaseMessage = await llm_with_tools.ainvoke(invocation_messages)
         logger.info("LLM invocation complete.")
 
         tool_results = []
@@ -581,10 +715,8 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
             # Let's mark as failed for now, assuming a tool was expected.
             current_step["status"] = "failed"
             current_step["result_summary"] = "LLM did not use a tool as expected."
-            _save_plan_to_md(plan, output_dir)
             return {
-                "research_plan": plan,
-                "current_step_index": current_index + 1,
+                "messages": [],
                 "error_message": f"LLM failed to call a tool for step {current_step['step']}.",
             }
 
@@ -618,18 +750,19 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
                 if stop_event and stop_event.is_set():
                     logger.info(f"Stop requested before executing tool: {tool_name}")
                     current_step["status"] = "pending"  # Not completed due to stop
-                    _save_plan_to_md(plan, output_dir)
-                    return {"stop_requested": True, "research_plan": plan}
+                    return {"messages": [], "stop_requested": True}
 
                 logger.info(f"Executing tool: {tool_name}")
                 # Assuming tool functions handle async correctly
                 tool_output = await selected_tool.ainvoke(tool_args)
                 logger.info(f"Tool '{tool_name}' executed successfully.")
                 browser_tool_called = "parallel_browser_search" in executed_tool_names
-                # Append result to overall search results
-                current_search_results = state.get("search_results", [])
                 if browser_tool_called:  # Specific handling for browser tool output
-                    current_search_results.extend(tool_output)
+                    # With a result store the tool has already persisted its results
+                    if result_store is None:
+                        current_search_results.extend(
+                            {**result, "step": current_step["step"]} for result in tool_output
+                        )
                 else:  # Handle other tool outputs (e.g., file tools return strings)
                     # Store it associated with the step? Or a generic log?
                     # Let's just log it for now. Need better handling for diverse tool outputs.
@@ -652,16 +785,16 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
                         tool_call_id=tool_call_id,
                     )
                 )
-                # Also update overall state search_results with error?
-                current_search_results = state.get("search_results", [])
-                current_search_results.append(
-                    {
-                        "tool_name": tool_name,
-                        "args": tool_args,
-                        "status": "failed",
-                        "error": str(e),
-                    }
-                )
+                failure = {
+                    "tool_name": tool_name,
+                    "args": tool_args,
+                    "status": "failed",
+                    "error": str(e),
+                }
+                if result_store is not None:
+                    result_store.append(failure, step=current_step["step"])
+                else:
+                    current_search_results.append(failure)
 
         # Basic check: Did the browser tool run at all? (More specific checks needed)
         browser_tool_called = "parallel_browser_search" in executed_tool_names
@@ -689,32 +822,310 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
                 f"Executed tool(s): {', '.join(executed_tool_names)}."
             )
 
-        _save_plan_to_md(plan, output_dir)
-        _save_search_results_to_json(current_search_results, output_dir)
-
-        return {
-            "research_plan": plan,
-            "search_results": current_search_results,  # Update with new results
-            "current_step_index": current_index + 1,
-            "messages": state["messages"]
-            + current_task_message
-            + [ai_response]
-            + tool_results,
-            # Optionally return the tool_results messages if needed by downstream nodes
-        }
+        return {"messages": current_task_message + [ai_response] + tool_results}
 
     except Exception as e:
         logger.error(
-            f"Unhandled error during research execution node for step {current_step['step']}: {e}",
+            f"Unhandled error during research execution for step {current_step['step']}: {e}",
             exc_info=True,
         )
         current_step["status"] = "failed"
-        _save_plan_to_md(plan, output_dir)
+        return {
+            "messages": [],
+            "error_message": f"Core Execution Error on step {current_step['step']}: {e}",
+        }
+
+
+def _ready_plan_steps(plan: List[ResearchPlanItem]) -> List[ResearchPlanItem]:
+    """Pending steps whose dependencies have all finished (completed or failed), in plan order."""
+    finished = {item["step"] for item in plan if item["status"] in ("completed", "failed")}
+    known = {item["step"] for item in plan}
+    pending = [item for item in plan if item["status"] not in ("completed", "failed")]
+    ready = [
+        item
+        for item in pending
+        if all(dep in finished or dep not in known for dep in item.get("depends_on") or [])
+    ]
+    # Guarantees progress even if a resumed plan has inconsistent dependencies
+    return ready or pending[:1]
+
+
+def _dependency_history(state: DeepResearchState, step: ResearchPlanItem) -> List[BaseMessage]:
+    """
+    Messages giving a "dag" step the outcome of the steps it depends on (status, summary and
+    findings), so a dependency shapes the step's input and not only its start time.
+    """
+    depends_on = step.get("depends_on") or []
+    if not depends_on:
+        return []
+    result_store: Optional[ResearchStore] = state.get("result_store")
+    results = (
+        result_store.iter_results()
+        if result_store is not None
+        else state.get("search_results", [])
+    )
+    findings = _format_findings([r for r in results if r.get("step") in depends_on])
+    if len(findings) > DEPENDENCY_CONTEXT_MAX_CHARS:
+        findings = findings[:DEPENDENCY_CONTEXT_MAX_CHARS] + "\n[... findings truncated ...]\n"
+
+    prerequisites = []
+    for item in state["research_plan"]:
+        if item["step"] in depends_on:
+            summary = f" {item['result_summary']}" if item.get("result_summary") else ""
+            prerequisites.append(f"- Step {item['step']} ({item['status']}): {item['task']}.{summary}")
+    context = (
+        "This task builds on earlier steps of the plan:\n"
+        + "\n".join(prerequisites)
+        + "\n\nTheir findings:\n"
+        + (findings or "No findings were recorded for these steps.\n")
+    )
+    return [
+        SystemMessage(content=STEP_EXECUTION_SYSTEM_PROMPT),
+        HumanMessage(content=context),
+    ]
+
+
+async def _execute_research_wave(state: DeepResearchState) -> Dict[str, Any]:
+    """
+    DAG execution: runs every pending step whose dependencies are finished at the same time,
+    each one seeing the findings of the steps it depends on.
+    Concurrency is bounded by the task's global browser and LLM budgets, not by the wave size.
+    The plan file and messages are still written in plan order.
+    """
+    plan = state["research_plan"]
+    output_dir = str(state["output_dir"])
+    wave = _ready_plan_steps(plan)
+    if not wave:
+        return {"current_step_index": len(plan)}
+
+    logger.info(f"Executing {len(wave)} independent step(s): {[item['step'] for item in wave]}")
+    outcomes = await asyncio.gather(
+        *(_execute_plan_step(state, item, _dependency_history(state, item)) for item in wave)
+    )
+    _save_plan_to_md(plan, output_dir)
+
+    messages = list(state["messages"])
+    for outcome in outcomes:
+        messages += outcome["messages"]
+    next_index = next(
+        (i for i, item in enumerate(plan) if item["status"] not in ("completed", "failed")),
+        len(plan),
+    )
+    update: Dict[str, Any] = {
+        "research_plan": plan,
+        "search_results": state.get("search_results", []),
+        "current_step_index": next_index,
+        "messages": messages,
+    }
+    if any(outcome.get("stop_requested") for outcome in outcomes):
+        update["stop_requested"] = True
+    errors = [outcome["error_message"] for outcome in outcomes if outcome.get("error_message")]
+    if errors:
+        update["error_message"] = "; ".join(errors)
+    return update
+
+
+async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
+    """
+    Executes the next step in the research plan (or, in "dag" execution mode, the next wave of
+    independent steps) by invoking the LLM with tools.
+    """
+    logger.info("--- Entering Research Execution Node ---")
+    if state.get("stop_requested"):
+        logger.info("Stop requested, skipping research execution.")
+        return {
+            "stop_requested": True,
+            "current_step_index": state["current_step_index"],
+        }  # Keep index same
+
+    if state.get("execution_mode") == "dag":
+        return await _execute_research_wave(state)
+
+    plan = state["research_plan"]
+    current_index = state["current_step_index"]
+    output_dir = str(state["output_dir"])
+
+    if not plan or current_index >= len(plan):
+        logger.info("Research plan complete or empty.")
+        # This condition should ideally be caught by `should_continue` before reaching here
+        return {}
+
+    current_step = plan[current_index]
+    if current_step["status"] == "completed":
+        logger.info(f"Step {current_step['step']} already completed, skipping.")
+        return {"current_step_index": current_index + 1}  # Move to next step
+
+    outcome = await _execute_plan_step(state, current_step, state["messages"])
+    _save_plan_to_md(plan, output_dir)
+
+    if outcome.get("stop_requested"):
+        return {"stop_requested": True, "research_plan": plan}
+    if outcome.get("error_message"):
         return {
             "research_plan": plan,
             "current_step_index": current_index + 1,  # Move on even if error?
-            "error_message": f"Core Execution Error on step {current_step['step']}: {e}",
+            "error_message": outcome["error_message"],
         }
+    return {
+        "research_plan": plan,
+        "search_results": state.get("search_results", []),
+        "current_step_index": current_index + 1,
+        "messages": state["messages"] + outcome["messages"],
+    }
+
+
+def _format_findings(results: List[Dict[str, Any]]) -> str:
+    """Formats search results as markdown findings (cancelled/other statuses are left out)."""
+    formatted_results = ""
+    for result_entry in results:
+        query = result_entry.get("query", "Unknown Query")
+        status = result_entry.get("status", "unknown")
+        result_data = result_entry.get("result")
+        error = result_entry.get("error")
+
+        if status == "completed" and result_data:
+            formatted_results += f'### Finding from Query: "{query}"\n'
+            formatted_results += f"- **Summary:**\n{result_data}\n"
+            formatted_results += "---\n"
+        elif status == "failed":
+            formatted_results += f'### Failed Query: "{query}"\n'
+            formatted_results += f"- **Error:** {error}\n"
+            formatted_results += "---\n"
+    return formatted_results
+
+
+def _split_findings(findings: str, max_chars: int) -> List[str]:
+    """
+    Splits formatted findings into chunks of at most ~max_chars, on finding boundaries.
+    A single finding longer than max_chars is cut into max_chars pieces on its own.
+    """
+    chunks, current = [], ""
+    for finding in findings.split("---\n"):
+        if not finding.strip():
+            continue
+        finding += "---\n"
+        if current and len(current) + len(finding) > max_chars:
+            chunks.append(current)
+            current = ""
+        if len(finding) > max_chars:
+            chunks.extend(finding[i : i + max_chars] for i in range(0, len(finding), max_chars))
+            continue
+        current += finding
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _load_step_summaries(output_dir: str) -> Dict[str, str]:
+    summaries_file = os.path.join(output_dir, STEP_SUMMARIES_FILENAME)
+    if not os.path.exists(summaries_file):
+        return {}
+    try:
+        with open(summaries_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load step summaries {summaries_file}: {e}")
+        return {}
+
+
+def _save_step_summaries(summaries: Dict[str, str], output_dir: str):
+    summaries_file = os.path.join(output_dir, STEP_SUMMARIES_FILENAME)
+    try:
+        with open(summaries_file, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Failed to save step summaries to {summaries_file}: {e}")
+
+
+async def _summarize_findings_by_step(
+    llm: Any,
+    topic: str,
+    plan: List[ResearchPlanItem],
+    search_results: List[Dict[str, Any]],
+    output_dir: str,
+) -> str:
+    """
+    Map phase of the hierarchical synthesis: the findings of each plan step (split into chunks if
+    needed) are summarized in parallel, at most SYNTHESIS_MAX_CONCURRENCY LLM calls at a time.
+    Summaries are cached in step_summaries.json by a hash of their input, so a resumed run only
+    summarizes what changed. While the joined step summaries are still longer than
+    SYNTHESIS_MAP_REDUCE_THRESHOLD_CHARS they are grouped and summarized again (up to
+    SYNTHESIS_MAX_REDUCE_LEVELS times). Returns the summaries formatted as findings for the final report.
+    """
+    tasks_by_step = {item["step"]: item["task"] for item in plan}
+    results_by_step: Dict[Any, List[Dict[str, Any]]] = {}
+    for result in search_results:
+        # Failed queries carry no findings worth an LLM call
+        if result.get("status") == "completed" and result.get("result"):
+            results_by_step.setdefault(result.get("step"), []).append(result)
+
+    cache = _load_step_summaries(output_dir)
+    semaphore = asyncio.Semaphore(SYNTHESIS_MAX_CONCURRENCY)
+
+    async def summarize_chunk(step_task: str, chunk: str) -> str:
+        key = hashlib.sha256(f"{topic}\n{step_task}\n{chunk}".encode("utf-8")).hexdigest()
+        if key in cache:
+            return cache[key]
+        messages = [
+            SystemMessage(
+                content="You condense research findings for one step of a research plan. Keep every fact, figure, date and "
+                "source (title and URL) that is relevant to the step; drop repetition and irrelevant details. "
+                "Do not add information that is not in the findings. Answer in Markdown bullet points."
+            ),
+            HumanMessage(
+                content=f"Research topic: {topic}\nPlan step: {step_task}\n\nFindings:\n{chunk}"
+            ),
+        ]
+        async with semaphore:
+            try:
+                response = await llm.ainvoke(messages)
+            except Exception as e:
+                logger.error(f"Failed to summarize findings for step '{step_task}': {e}")
+                # Fall back to the raw findings for this chunk; not cached so a later run retries
+                return chunk
+        cache[key] = response.content
+        return response.content
+
+    step_keys = sorted(results_by_step, key=lambda k: (k is None, k or 0))
+    step_jobs = []
+    for step in step_keys:
+        step_task = tasks_by_step.get(step, "Additional findings")
+        chunks = _split_findings(_format_findings(results_by_step[step]), SYNTHESIS_MAP_CHUNK_CHARS)
+        if chunks:
+            step_jobs.append(
+                (step, step_task, asyncio.gather(*(summarize_chunk(step_task, c) for c in chunks)))
+            )
+
+    summaries = await asyncio.gather(*(job for _, _, job in step_jobs))
+
+    formatted = ""
+    for (step, step_task, _), chunk_summaries in zip(step_jobs, summaries):
+        title = f"Step {step}: {step_task}" if step is not None else step_task
+        formatted += f"### {title}\n" + "\n".join(chunk_summaries) + "\n---\n"
+    logger.info(
+        f"Summarized findings of {len(step_jobs)} plan step(s) into {len(formatted)} chars."
+    )
+
+    # Further reduce levels so that long plans still fit the final synthesis prompt
+    for level in range(1, SYNTHESIS_MAX_REDUCE_LEVELS + 1):
+        if len(formatted) <= SYNTHESIS_MAP_REDUCE_THRESHOLD_CHARS:
+            break
+        groups = _split_findings(formatted, SYNTHESIS_MAP_CHUNK_CHARS)
+        group_task = f"Combined findings of several plan steps (reduce level {level})"
+        group_summaries = await asyncio.gather(*(summarize_chunk(group_task, g) for g in groups))
+        reduced = "".join(
+            f"### Combined findings {i}\n{summary}\n---\n"
+            for i, summary in enumerate(group_summaries, 1)
+        )
+        logger.info(
+            f"Reduce level {level}: {len(groups)} group(s), {len(formatted)} -> {len(reduced)} chars."
+        )
+        if len(reduced) >= len(formatted):
+            break  # Summaries are not getting shorter (e.g. LLM errors); keep the previous level
+        formatted = reduced
+
+    _save_step_summaries(cache, output_dir)
+    return formatted
 
 
 async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
@@ -726,7 +1137,12 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
 
     llm = state["llm"]
     topic = state["topic"]
-    search_results = state.get("search_results", [])
+    result_store: Optional[ResearchStore] = state.get("result_store")
+    search_results = (
+        list(result_store.iter_results())
+        if result_store is not None
+        else state.get("search_results", [])
+    )
     output_dir = state["output_dir"]
     plan = state["research_plan"]  # Include plan for context
 
@@ -741,29 +1157,19 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
     )
 
     # Prepare context for the LLM
-    # Format search results nicely, maybe group by query or original plan step
-    formatted_results = ""
+    formatted_results = _format_findings(search_results)
     references = {}
-    ref_count = 1
-    for i, result_entry in enumerate(search_results):
-        query = result_entry.get("query", "Unknown Query")
-        status = result_entry.get("status", "unknown")
-        result_data = result_entry.get(
-            "result"
-        )  # This should be the dict with summary, title, url
-        error = result_entry.get("error")
-
-        if status == "completed" and result_data:
-            summary = result_data
-            formatted_results += f'### Finding from Query: "{query}"\n'
-            formatted_results += f"- **Summary:**\n{summary}\n"
-            formatted_results += "---\n"
-
-        elif status == "failed":
-            formatted_results += f'### Failed Query: "{query}"\n'
-            formatted_results += f"- **Error:** {error}\n"
-            formatted_results += "---\n"
-        # Ignore cancelled/other statuses for the report content
+    synthesis_mode = state.get("synthesis_mode") or "auto"
+    if synthesis_mode == "map_reduce" or (
+        synthesis_mode == "auto"
+        and len(formatted_results) > SYNTHESIS_MAP_REDUCE_THRESHOLD_CHARS
+    ):
+        logger.info(
+            f"Findings are {len(formatted_results)} chars; summarizing per plan step before the final report."
+        )
+        formatted_results = await _summarize_findings_by_step(
+            llm, topic, plan, search_results, str(output_dir)
+        )
 
     # Prepare the research plan context
     plan_summary = "\nResearch Plan Followed:\n"
@@ -876,6 +1282,37 @@ def should_continue(state: DeepResearchState) -> str:
         return "synthesize_report"
 
 
+def _tracked_node(scope: str, node):
+    """Wraps a graph node so its LLM calls and wall time are tallied under `scope`."""
+
+    async def wrapper(state: DeepResearchState) -> Dict[str, Any]:
+        token = USAGE_SCOPE.set(scope)
+        started = time.perf_counter()
+        try:
+            return await node(state)
+        finally:
+            USAGE_SCOPE.reset(token)
+            tracker = _TASK_USAGE_TRACKERS.get(state["task_id"])
+            if tracker:
+                tracker.record_wall_time(scope, time.perf_counter() - started)
+                tracker.save()
+
+    return wrapper
+
+
+def _llm_with_usage_callback(llm: Any, handler: UsageCallbackHandler) -> Any:
+    """Copy of `llm` that reports every call (including those of browser sub-agents) to `handler`."""
+    callbacks = getattr(llm, "callbacks", None)
+    if callbacks is not None and not isinstance(callbacks, list):
+        logger.warning("LLM has a callback manager attached; usage accounting disabled for it.")
+        return llm
+    try:
+        return llm.model_copy(update={"callbacks": list(callbacks or []) + [handler]})
+    except Exception as e:
+        logger.warning(f"Could not attach usage accounting to the LLM: {e}")
+        return llm
+
+
 # --- DeepSearchAgent Class ---
 
 
@@ -904,9 +1341,16 @@ class DeepResearchAgent:
         self.current_task_id: Optional[str] = None
         self.stop_event: Optional[threading.Event] = None
         self.runner: Optional[asyncio.Task] = None  # To hold the asyncio task for run
+        # Browser search results of the current run, appended as each query finishes
+        self.live_search_results: List[Dict[str, Any]] = []
 
     async def _setup_tools(
-        self, task_id: str, stop_event: threading.Event, max_parallel_browsers: int = 1
+        self,
+        task_id: str,
+        stop_event: threading.Event,
+        max_parallel_browsers: int = 1,
+        result_store: Optional[ResearchStore] = None,
+        llm: Any = None,
     ) -> List[Tool]:
         """Sets up the basic tools (File I/O) and optional MCP tools."""
         tools = [
@@ -915,11 +1359,13 @@ class DeepResearchAgent:
             ListDirectoryTool(),
         ]  # Basic file operations
         browser_use_tool = create_browser_search_tool(
-            llm=self.llm,
+            llm=llm or self.llm,
             browser_config=self.browser_config,
             task_id=task_id,
             stop_event=stop_event,
             max_parallel_browsers=max_parallel_browsers,
+            on_result=self.live_search_results.append,
+            result_store=result_store,
         )
         tools += [browser_use_tool]
         # Add MCP tools if config is provided
@@ -952,9 +1398,11 @@ class DeepResearchAgent:
         workflow = StateGraph(DeepResearchState)
 
         # Add nodes
-        workflow.add_node("plan_research", planning_node)
-        workflow.add_node("execute_research", research_execution_node)
-        workflow.add_node("synthesize_report", synthesis_node)
+        workflow.add_node("plan_research", _tracked_node("planning", planning_node))
+        workflow.add_node(
+            "execute_research", _tracked_node("execution", research_execution_node)
+        )
+        workflow.add_node("synthesize_report", _tracked_node("synthesis", synthesis_node))
         workflow.add_node(
             "end_run", lambda state: logger.info("--- Reached End Run Node ---") or {}
         )  # Simple end node
@@ -988,6 +1436,9 @@ class DeepResearchAgent:
         task_id: Optional[str] = None,
         save_dir: str = "./tmp/deep_research",
         max_parallel_browsers: int = 1,
+        synthesis_mode: str = "auto",
+        execution_mode: str = "sequential",
+        max_parallel_llm_calls: int = 2,
     ) -> Dict[str, Any]:
         """
         Starts the deep research process (Async Generator Version).
@@ -995,6 +1446,11 @@ class DeepResearchAgent:
         Args:
             topic: The research topic.
             task_id: Optional existing task ID to resume. If None, a new ID is generated.
+            synthesis_mode: "single" sends all findings in one prompt, "map_reduce" summarizes each plan
+                step first, "auto" switches to map_reduce when the findings are too large.
+            execution_mode: "sequential" runs plan steps one at a time; "dag" runs steps whose
+                dependencies are done at the same time, sharing `max_parallel_browsers` browsers and
+                `max_parallel_llm_calls` concurrent step LLM calls across the whole task.
 
         Yields:
              Intermediate state updates or messages during execution.
@@ -1021,16 +1477,32 @@ class DeepResearchAgent:
 
         self.stop_event = threading.Event()
         _AGENT_STOP_FLAGS[self.current_task_id] = self.stop_event
+        _TASK_CONCURRENCY_BUDGETS[self.current_task_id] = {
+            "browser": asyncio.Semaphore(max(1, max_parallel_browsers)),
+            "llm": asyncio.Semaphore(max(1, max_parallel_llm_calls)),
+        }
+        self.live_search_results = []
+        result_store = ResearchStore(output_dir)
+        usage_tracker = UsageTracker(self.current_task_id, output_dir)
+        _TASK_USAGE_TRACKERS[self.current_task_id] = usage_tracker
+        llm = _llm_with_usage_callback(self.llm, UsageCallbackHandler(usage_tracker))
         agent_tools = await self._setup_tools(
-            self.current_task_id, self.stop_event, max_parallel_browsers
+            self.current_task_id,
+            self.stop_event,
+            max_parallel_browsers,
+            result_store,
+            llm=llm,
         )
         initial_state: DeepResearchState = {
             "task_id": self.current_task_id,
             "topic": topic,
             "research_plan": [],
             "search_results": [],
+            "result_store": result_store,
+            "synthesis_mode": synthesis_mode,
+            "execution_mode": execution_mode,
             "messages": [],
-            "llm": self.llm,
+            "llm": llm,
             "tools": agent_tools,
             "output_dir": output_dir,
             "browser_config": self.browser_config,
@@ -1043,11 +1515,11 @@ class DeepResearchAgent:
         loaded_state = {}
         if task_id:
             logger.info(f"Attempting to resume task {task_id}...")
-            loaded_state = _load_previous_state(task_id, output_dir)
+            loaded_state = _load_previous_state(task_id, output_dir, result_store)
             initial_state.update(loaded_state)
             if loaded_state.get("research_plan"):
                 logger.info(
-                    f"Resuming with {len(loaded_state['research_plan'])} plan steps and {len(loaded_state.get('search_results', []))} existing results."
+                    f"Resuming with {len(loaded_state['research_plan'])} plan steps and {len(result_store)} stored results."
                 )
                 initial_state["topic"] = (
                     topic  # Allow overriding topic even when resuming? Or use stored topic? Let's use new one.
@@ -1104,8 +1576,13 @@ class DeepResearchAgent:
             self.stop_event = None
             self.current_task_id = None
             self.runner = None  # Mark runner as finished
+            _export_search_results_to_json(result_store, output_dir)
             if self.mcp_client:
                 await self.mcp_client.__aexit__(None, None, None)
+            await close_browser_pool(task_id_to_clean)
+            _TASK_CONCURRENCY_BUDGETS.pop(task_id_to_clean, None)
+            usage_tracker.save()
+            _TASK_USAGE_TRACKERS.pop(task_id_to_clean, None)
 
             # Return a result dictionary including the status and the final state if available
             return {
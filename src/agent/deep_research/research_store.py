@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FILENAME = "search_results.jsonl"
+
+# Plan step that results appended from the current asyncio task belong to (set by the execution node).
+# A ContextVar so that plan steps executed concurrently never tag each other's results.
+CURRENT_PLAN_STEP: ContextVar[Optional[int]] = ContextVar("current_plan_step", default=None)
+
+# Words that do not change what a search query is about (English and Portuguese)
+_QUERY_STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "in", "on", "to", "with", "about", "what", "is", "are", "how",
+    "o", "os", "as", "e", "de", "do", "da", "dos", "das", "em", "no", "na", "nos", "nas", "para", "por",
+    "com", "sobre", "um", "uma", "que", "qual", "quais",
+}
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a search query used as the store index key: accents, case, punctuation,
+    stopwords and word order are ignored, so "Editais abertos CNPq 2025" and
+    "cnpq 2025: editais abertos" map to the same key.
+    """
+    text = unicodedata.normalize("NFKD", query).encode("ascii", "ignore").decode("ascii").lower()
+    words = re.sub(r"[^a-z0-9]+", " ", text).split()
+    meaningful = [w for w in words if w not in _QUERY_STOPWORDS] or words
+    return " ".join(sorted(set(meaningful)))
+
+
+class ResearchStore:
+    """
+    Append-only JSONL store of browser search results for one research task.
+    Every result is written as soon as it is produced; an in-memory index from normalized query to
+    the latest completed result lets repeated queries reuse earlier work, also across resumes.
+    """
+
+    def __init__(self, output_dir: str, filename: str = RESULTS_FILENAME):
+        os.makedirs(output_dir, exist_ok=True)
+        self.path = os.path.join(output_dir, filename)
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        for record in self.iter_records():
+            self._index_record(record)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _index_record(self, record: Dict[str, Any]):
+        self._count += 1
+        if record.get("status") == "completed" and record.get("result"):
+            self._index[record.get("normalized_query") or normalize_query(record.get("query", ""))] = record
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Streams every stored record in write order, skipping a truncated last line."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable line {line_number} of {self.path}")
+
+    def iter_results(self) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the latest record of each distinct (normalized) query, in plan order
+        (by step, then first-seen order; results without a step come last).
+        """
+        latest: Dict[str, Dict[str, Any]] = {}
+        for record in self.iter_records():
+            key = record.get("normalized_query") or normalize_query(record.get("query", ""))
+            previous = latest.get(key)
+            # A failed retry never hides an earlier completed result
+            if previous is None or record.get("status") == "completed" or previous.get("status") != "completed":
+                latest[key] = record
+        yield from sorted(latest.values(), key=lambda r: (r.get("step") is None, r.get("step") or 0))
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Latest completed result for a query equivalent to `query`, if any."""
+        with self._lock:
+            return self._index.get(normalize_query(query))
+
+    def append(self, result: Dict[str, Any], step: Optional[int] = None) -> Dict[str, Any]:
+        record = dict(result)
+        record.setdefault("normalized_query", normalize_query(record.get("query", "")))
+        step = step if step is not None else CURRENT_PLAN_STEP.get()
+        if step is not None:
+            record.setdefault("step", step)
+        record.setdefault("timestamp", time.time())
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._index_record(record)
+        return record
+
+    def import_json(self, json_file: str) -> int:
+        """One-off migration of a legacy search_info.json list into the store."""
+        with open(json_file, "r", encoding="utf-8") as f:
+            results: List[Dict[str, Any]] = json.load(f)
+        for result in results:
+            self.append(result)
+        return len(results)
+
+    def export_json(self, json_file: str):
+        """Writes the deduplicated results as a JSON list (the search_info.json export)."""
+        with open(json_file, "w", encoding="utf-8") as f:
+            json.dump(list(self.iter_results()), f, indent=2, ensure_ascii=False, default=str)
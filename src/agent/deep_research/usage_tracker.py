@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+logger = logging.getLogger(__name__)
+
+USAGE_FILENAME = "usage.json"
+
+# What the LLM calls of the current asyncio task are attributed to: a graph node ("planning",
+# "execution", "synthesis") or a browser sub-agent ("browser: <query>")
+USAGE_SCOPE: ContextVar[str] = ContextVar("usage_scope", default="other")
+
+# Optional USD prices per million tokens, e.g. {"gpt-4o": [2.5, 10]} (input, output)
+try:
+    MODEL_PRICES_PER_MTOK: Dict[str, List[float]] = json.loads(os.getenv("DEEP_RESEARCH_MODEL_PRICES", "{}"))
+except json.JSONDecodeError:
+    logger.warning("Ignoring invalid DEEP_RESEARCH_MODEL_PRICES (expected a JSON object).")
+    MODEL_PRICES_PER_MTOK = {}
+
+
+def _empty_bucket() -> Dict[str, Any]:
+    return {
+        "llm_calls": 0,
+        "llm_errors": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "llm_seconds": 0.0,
+        "wall_seconds": 0.0,
+    }
+
+
+class UsageTracker:
+    """
+    Per-task tally of LLM usage (calls, prompt/completion tokens, latency) and wall time, broken
+    down by graph node, by browser sub-agent and by model. Saved as usage.json next to report.md.
+    """
+
+    def __init__(self, task_id: str, output_dir: str):
+        self.task_id = task_id
+        self.path = os.path.join(output_dir, USAGE_FILENAME)
+        self.started_at = time.time()
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.sub_agents: Dict[str, Dict[str, Any]] = {}
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _scope_bucket(self, scope: str) -> Dict[str, Any]:
+        if scope.startswith("browser: "):
+            bucket = self.sub_agents.get(scope)
+            if bucket is None:
+                bucket = self.sub_agents[scope] = {**_empty_bucket(), "browser_steps": 0, "status": "running"}
+            return bucket
+        return self.nodes.setdefault(scope, _empty_bucket())
+
+    def record_llm_call(
+        self,
+        scope: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        seconds: float,
+        error: bool = False,
+    ):
+        with self._lock:
+            for bucket in (self._scope_bucket(scope), self.models.setdefault(model, _empty_bucket())):
+                bucket["llm_calls"] += 1
+                bucket["llm_errors"] += int(error)
+                bucket["prompt_tokens"] += prompt_tokens
+                bucket["completion_tokens"] += completion_tokens
+                bucket["llm_seconds"] += seconds
+
+    def record_wall_time(self, scope: str, seconds: float):
+        with self._lock:
+            self._scope_bucket(scope)["wall_seconds"] += seconds
+
+    def record_sub_agent(self, scope: str, browser_steps: int, seconds: float, status: str):
+        with self._lock:
+            bucket = self._scope_bucket(scope)
+            bucket["browser_steps"] += browser_steps
+            bucket["wall_seconds"] += seconds
+            bucket["status"] = status
+
+    @staticmethod
+    def _cost(model: str, bucket: Dict[str, Any]) -> Optional[float]:
+        prices = MODEL_PRICES_PER_MTOK.get(model)
+        if not prices:
+            return None
+        return (bucket["prompt_tokens"] * prices[0] + bucket["completion_tokens"] * prices[1]) / 1_000_000
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {model: dict(bucket) for model, bucket in self.models.items()}
+            nodes = {name: dict(bucket) for name, bucket in self.nodes.items()}
+            sub_agents = {name: dict(bucket) for name, bucket in self.sub_agents.items()}
+        costs = [self._cost(model, bucket) for model, bucket in models.items()]
+        for (model, bucket), cost in zip(models.items(), costs):
+            bucket["cost_usd"] = cost
+        totals = _empty_bucket()
+        for bucket in models.values():
+            for key in ("llm_calls", "llm_errors", "prompt_tokens", "completion_tokens", "llm_seconds"):
+                totals[key] += bucket[key]
+        totals["wall_seconds"] = time.time() - self.started_at
+        totals["browser_steps"] = sum(bucket["browser_steps"] for bucket in sub_agents.values())
+        totals["cost_usd"] = sum(c for c in costs if c is not None) if any(c is not None for c in costs) else None
+        return {
+            "task_id": self.task_id,
+            "totals": totals,
+            "nodes": nodes,
+            "sub_agents": sub_agents,
+            "models": models,
+        }
+
+    def save(self):
+        try:
+            data = self.to_dict()
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save usage to {self.path}: {e}")
+
+
+def usage_to_markdown(usage: Dict[str, Any]) -> str:
+    """Renders a usage.json dict as Markdown tables (used by the WebUI)."""
+
+    def row(name: str, bucket: Dict[str, Any]) -> str:
+        return (
+            f"| {name} | {bucket.get('llm_calls', 0)} | {bucket.get('prompt_tokens', 0):,} | "
+            f"{bucket.get('completion_tokens', 0):,} | {bucket.get('llm_seconds', 0.0):.1f} | "
+            f"{bucket.get('wall_seconds', 0.0):.1f} | {bucket.get('browser_steps', '')} |"
+        )
+
+    header = (
+        "| Scope | LLM calls | Prompt tokens | Completion tokens | LLM s | Wall s | Browser steps |\n"
+        "|---|---|---|---|---|---|---|"
+    )
+    totals = usage.get("totals", {})
+    lines = ["### Usage", header, row("**Total**", totals)]
+    lines += [row(name, bucket) for name, bucket in usage.get("nodes", {}).items()]
+    lines += [row(name, bucket) for name, bucket in usage.get("sub_agents", {}).items()]
+    if totals.get("cost_usd") is not None:
+        lines.append(f"\nEstimated cost: ${totals['cost_usd']:.4f}")
+    return "\n".join(lines)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that reports every LLM call's tokens and latency to a UsageTracker."""
+
+    # Run in the caller's context so USAGE_SCOPE is the one of the calling node / sub-agent
+    run_inline = True
+
+    def __init__(self, tracker: UsageTracker):
+        self.tracker = tracker
+        self._calls: Dict[UUID, Dict[str, Any]] = {}
+
+    def _start(self, run_id: UUID, serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]):
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            params.get("model_name")
+            or params.get("model")
+            or ((serialized or {}).get("kwargs") or {}).get("model_name")
+            or "unknown"
+        )
+        self._calls[run_id] = {"start": time.perf_counter(), "scope": USAGE_SCOPE.get(), "model": model}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._start(run_id, serialized, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._start(run_id, serialized, kwargs)
+
+    @staticmethod
+    def _token_usage(response: LLMResult):
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt_tokens += usage.get("input_tokens", 0)
+                    completion_tokens += usage.get("output_tokens", 0)
+        if not (prompt_tokens or completion_tokens):
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = token_usage.get("prompt_tokens", 0)
+            completion_tokens = token_usage.get("completion_tokens", 0)
+        return prompt_tokens, completion_tokens
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        prompt_tokens, completion_tokens = self._token_usage(response)
+        self.tracker.record_llm_call(
+            call["scope"], call["model"], prompt_tokens, completion_tokens, time.perf_counter() - call["start"]
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        self.tracker.record_llm_call(
+            call["scope"], call["model"], 0, 0, time.perf_counter() - call["start"], error=True
+        )
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from browser_use.browser.browser import BrowserConfig
+
+from .custom_browser import CustomBrowser
+from .custom_context import CustomBrowserContext, CustomBrowserContextConfig
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 1
+# Recycle a Chromium process after this many tasks to keep memory growth and leaked state bounded
+DEFAULT_MAX_USES = 20
+
+
+def build_browser_config(browser_config: Dict[str, Any]) -> BrowserConfig:
+    """Translates the webui/deep research browser settings dict into a browser_use BrowserConfig."""
+    window_w = browser_config.get("window_width", 1280)
+    window_h = browser_config.get("window_height", 1100)
+    browser_user_data_dir = browser_config.get("user_data_dir", None)
+    use_own_browser = browser_config.get("use_own_browser", False)
+    browser_binary_path = browser_config.get("browser_binary_path", None)
+
+    extra_args = [f"--window-size={window_w},{window_h}"]
+    if browser_user_data_dir:
+        extra_args.append(f"--user-data-dir={browser_user_data_dir}")
+    if use_own_browser:
+        browser_binary_path = os.getenv("CHROME_PATH", None) or browser_binary_path
+        if browser_binary_path == "":
+            browser_binary_path = None
+        chrome_user_data = os.getenv("CHROME_USER_DATA", None)
+        if chrome_user_data:
+            extra_args += [f"--user-data-dir={chrome_user_data}"]
+    else:
+        browser_binary_path = None
+
+    return BrowserConfig(
+        headless=browser_config.get("headless", False),
+        disable_security=browser_config.get("disable_security", False),
+        browser_binary_path=browser_binary_path,
+        extra_browser_args=extra_args,
+        wss_url=browser_config.get("wss_url", None),
+        cdp_url=browser_config.get("cdp_url", None),
+    )
+
+
+class PooledBrowser:
+    """A warm CustomBrowser owned by a BrowserPool, plus how many tasks it has served."""
+
+    def __init__(self, browser: CustomBrowser):
+        self.browser = browser
+        self.uses = 0
+
+    async def new_context(self, config: CustomBrowserContextConfig) -> CustomBrowserContext:
+        # Each task gets its own isolated context; cookies/storage never leak between tasks
+        config.force_new_context = True
+        return await self.browser.new_context(config=config)
+
+
+class BrowserPool:
+    """
+    Keeps up to `size` Chromium instances running and hands them out to browser tasks.
+    A browser is closed and replaced after `max_uses` tasks or as soon as it is found disconnected.
+    """
+
+    def __init__(
+        self,
+        browser_config: Dict[str, Any],
+        size: int = DEFAULT_POOL_SIZE,
+        max_uses: int = DEFAULT_MAX_USES,
+    ):
+        self.browser_config = browser_config
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self._idle: asyncio.Queue[PooledBrowser] = asyncio.Queue()
+        self._created = 0
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+    async def _launch(self) -> PooledBrowser:
+        browser = CustomBrowser(config=build_browser_config(self.browser_config))
+        # Start Chromium now so the task that gets this browser only pays for context creation
+        await browser.get_playwright_browser()
+        logger.info("Browser pool: launched a new browser.")
+        return PooledBrowser(browser)
+
+    async def _discard(self, pooled: PooledBrowser):
+        async with self._lock:
+            self._created -= 1
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"Browser pool: error closing browser: {e}")
+
+    @staticmethod
+    def _is_healthy(pooled: PooledBrowser) -> bool:
+        playwright_browser = getattr(pooled.browser, "playwright_browser", None)
+        return playwright_browser is None or playwright_browser.is_connected()
+
+    async def warm_up(self, count: Optional[int] = None):
+        """Launches browsers in parallel until `count` (default: pool size) exist."""
+        async with self._lock:
+            to_launch = max(0, min(count or self.size, self.size) - self._created)
+            self._created += to_launch
+        if not to_launch:
+            return
+        results = await asyncio.gather(*(self._launch() for _ in range(to_launch)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, PooledBrowser):
+                self._idle.put_nowait(result)
+            else:
+                logger.error(f"Browser pool: failed to launch browser during warm up: {result}")
+                async with self._lock:
+                    self._created -= 1
+
+    async def acquire(self) -> PooledBrowser:
+        if self._closed:
+            raise RuntimeError("Browser pool is closed.")
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                async with self._lock:
+                    can_launch = self._created < self.size
+                    if can_launch:
+                        self._created += 1
+                if can_launch:
+                    try:
+                        pooled = await self._launch()
+                    except Exception:
+                        async with self._lock:
+                            self._created -= 1
+                        raise
+                else:
+                    pooled = await self._idle.get()
+
+            if self._is_healthy(pooled):
+                pooled.uses += 1
+                return pooled
+            logger.warning("Browser pool: discarding disconnected browser.")
+            await self._discard(pooled)
+
+    async def release(self, pooled: PooledBrowser, healthy: bool = True):
+        if self._closed or not healthy or not self._is_healthy(pooled) or pooled.uses >= self.max_uses:
+            logger.info(f"Browser pool: recycling browser after {pooled.uses} use(s).")
+            await self._discard(pooled)
+        else:
+            self._idle.put_nowait(pooled)
+
+    @asynccontextmanager
+    async def browser(self) -> AsyncIterator[PooledBrowser]:
+        pooled = await self.acquire()
+        healthy = True
+        try:
+            yield pooled
+        except BaseException:
+            healthy = self._is_healthy(pooled)
+            raise
+        finally:
+            await self.release(pooled, healthy=healthy)
+
+    async def close(self):
+        self._closed = True
+        idle: List[PooledBrowser] = []
+        while not self._idle.empty():
+            idle.append(self._idle.get_nowait())
+        await asyncio.gather(*(self._discard(p) for p in idle), return_exceptions=True)
+
+
+# Pools are shared by every browser search of the same research task (keyed by task_id)
+_BROWSER_POOLS: Dict[str, BrowserPool] = {}
+
+
+def get_browser_pool(
+    task_id: str,
+    browser_config: Dict[str, Any],
+    size: int = DEFAULT_POOL_SIZE,
+    max_uses: Optional[int] = None,
+) -> BrowserPool:
+    pool = _BROWSER_POOLS.get(task_id)
+    if pool is None:
+        pool = BrowserPool(
+            browser_config,
+            size=size,
+            max_uses=max_uses or browser_config.get("pool_max_uses", DEFAULT_MAX_USES),
+        )
+        _BROWSER_POOLS[task_id] = pool
+    return pool
+
+
+async def close_browser_pool(task_id: str):
+    pool = _BROWSER_POOLS.pop(task_id, None)
+    if pool:
+        await pool.close()
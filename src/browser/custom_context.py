@@ -6,14 +6,55 @@ from browser_use.browser.browser import Browser, IN_DOCKER
 from browser_use.browser.context import BrowserContext, BrowserContextConfig
 from patchright.async_api import Browser as PlaywrightBrowser
 from patchright.async_api import BrowserContext as PlaywrightBrowserContext
-from typing import Optional
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
 from browser_use.browser.context import BrowserContextState
+from pydantic import Field
+
+from .http_cache import get_http_cache
 
 logger = logging.getLogger(__name__)
 
+# Resource types the agent does not need to read text and links (see Playwright's request.resource_type)
+DEFAULT_BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+# Analytics / ad hosts; subdomains are matched too
+DEFAULT_BLOCKED_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "scorecardresearch.com",
+    "vlibras.gov.br",
+    "barra.sistema.gov.br",
+]
+
+
+def default_blocked_resource_types(use_vision: bool = False) -> List[str]:
+    """Blocked resource types for an agent; vision mode keeps images so screenshots stay meaningful."""
+    return [t for t in DEFAULT_BLOCKED_RESOURCE_TYPES if not (use_vision and t == "image")]
+
+
+def _host_matches(host: str, domains) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
 
 class CustomBrowserContextConfig(BrowserContextConfig):
     force_new_context: bool = False  # force to create new context
+    # Resource blocking via request interception (only applied to contexts created here)
+    block_resources: bool = False
+    blocked_resource_types: List[str] = Field(default_factory=lambda: list(DEFAULT_BLOCKED_RESOURCE_TYPES))
+    blocked_domains: List[str] = Field(default_factory=lambda: list(DEFAULT_BLOCKED_DOMAINS))
+    # Per-site allow-list: host (or parent domain) of the page or of the request -> resource types to keep,
+    # e.g. {"google.com": ["image"]} keeps reCAPTCHA images. "*" keeps everything for that site.
+    resource_allow_list: Dict[str, List[str]] = Field(default_factory=dict)
+    # Disk-backed HTTP cache shared by every context pointing at the same directory (see http_cache.py)
+    http_cache_dir: Optional[str] = Field(default_factory=lambda: os.getenv("BROWSER_HTTP_CACHE_DIR") or None)
+    http_cache_offline: bool = Field(default_factory=lambda: os.getenv("BROWSER_HTTP_CACHE_OFFLINE") == "1")
 
 
 class CustomBrowserContext(BrowserContext):
@@ -24,9 +65,43 @@ class CustomBrowserContext(BrowserContext):
             state: Optional[BrowserContextState] = None,
     ):
         super(CustomBrowserContext, self).__init__(browser=browser, config=config, state=state)
+        self.blocked_requests = 0
+
+    def _allowed_types_for(self, *hosts: str) -> set:
+        allowed = set()
+        for site, types in self.config.resource_allow_list.items():
+            if any(host and _host_matches(host, [site]) for host in hosts):
+                allowed.update(types)
+        return allowed
+
+    def _should_block(self, request) -> bool:
+        request_host = (urlparse(request.url).hostname or "").lower()
+        if not request_host:
+            return False  # data:, blob: and similar URLs never hit the network
+        try:
+            page_host = (urlparse(request.frame.page.url).hostname or "").lower()
+        except Exception:
+            page_host = ""
+        allowed = self._allowed_types_for(request_host, page_host)
+        if "*" in allowed:
+            return False
+        resource_type = request.resource_type
+        if resource_type in allowed:
+            return False
+        if _host_matches(request_host, self.config.blocked_domains):
+            return True
+        return resource_type in self.config.blocked_resource_types
+
+    async def _route_request(self, route):
+        if self._should_block(route.request):
+            self.blocked_requests += 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
 
     async def _create_context(self, browser: PlaywrightBrowser):
         """Creates a new browser context with anti-detection measures and loads cookies if available."""
+        created = False
         if not self.config.force_new_context and self.browser.config.cdp_url and len(browser.contexts) > 0:
             context = browser.contexts[0]
         elif not self.config.force_new_context and self.browser.config.browser_binary_path and len(
@@ -34,6 +109,7 @@ class CustomBrowserContext(BrowserContext):
             # Connect to existing Chrome instance instead of creating new one
             context = browser.contexts[0]
         else:
+            created = True
             # Original code for creating new context
             context = await browser.new_context(
                 no_viewport=True,
@@ -53,6 +129,22 @@ class CustomBrowserContext(BrowserContext):
                 timezone_id=self.config.timezone_id,
             )
 
+        # Never intercept requests of a context we did not create (e.g. the user's own browser).
+        # The last registered route runs first: blocked requests are aborted before reaching the cache.
+        if self.config.http_cache_dir and created:
+            http_cache = get_http_cache(self.config.http_cache_dir, offline=self.config.http_cache_offline)
+            await context.route("**/*", http_cache.handle_route)
+            logger.info(
+                f"HTTP cache enabled at {self.config.http_cache_dir}"
+                f"{' (offline)' if self.config.http_cache_offline else ''}."
+            )
+        if self.config.block_resources and created:
+            await context.route("**/*", self._route_request)
+            logger.info(
+                f"Blocking resource types {self.config.blocked_resource_types} "
+                f"and {len(self.config.blocked_domains)} tracker domains in this context."
+            )
+
         if self.config.trace_path:
             await context.tracing.start(screenshots=True, snapshots=True, sources=True)
 
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from hashlib import sha256
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.getenv("BROWSER_HTTP_CACHE_MAX_MB", "500")) * 1024 * 1024
+# Bodies larger than this (e.g. PDFs) are passed through without being stored
+DEFAULT_MAX_ENTRY_BYTES = 5 * 1024 * 1024
+# Agency listing pages rarely send usable cache headers; they are cached for this long regardless
+DEFAULT_LISTING_TTL_S = int(os.getenv("BROWSER_HTTP_CACHE_LISTING_TTL_S", str(6 * 3600)))
+DEFAULT_LISTING_PATTERNS = [
+    r"chamadas?[-_]?publicas",
+    r"/chamadas/?$",
+    r"/editais",
+    r"editais-e-resultados",
+]
+# Freshness for static assets that come without cache headers
+DEFAULT_STATIC_TTL_S = 24 * 3600
+STATIC_RESOURCE_TYPES = {"script", "stylesheet", "image", "font"}
+# Only these go through the cache; anything else (media streams, websockets, beacons...) is left to
+# the network directly instead of being buffered in memory by route.fetch()
+CACHEABLE_RESOURCE_TYPES = STATIC_RESOURCE_TYPES | {"document", "xhr", "fetch"}
+CACHEABLE_STATUSES = {200, 203}
+# Headers that describe the wire encoding, not the (already decoded) body we store
+_HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+# Never replayed from cache: a cached response must not set another session's cookies
+_UNSTORED_HEADERS = _HOP_HEADERS | {"set-cookie"}
+
+
+def _parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+def ttl_from_headers(headers: Dict[str, str], now: Optional[float] = None) -> Optional[int]:
+    """
+    Freshness lifetime in seconds from Cache-Control / Expires (RFC 9111, private cache).
+    0 means "must not be served from cache"; None means the headers say nothing.
+    """
+    cache_control = _parse_cache_control(headers.get("cache-control", ""))
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    if cache_control.get("max-age") is not None:
+        try:
+            max_age = int(cache_control["max-age"])
+        except ValueError:
+            return 0
+        try:
+            age = int(headers.get("age", "0"))
+        except ValueError:
+            age = 0
+        return max(0, max_age - age)
+    if "expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["expires"]).timestamp()
+        except (TypeError, ValueError):
+            return 0  # Invalid Expires means "already expired"
+        return max(0, int(expires - (now or time.time())))
+    return None
+
+
+class HttpCache:
+    """
+    Disk-backed (SQLite) HTTP response cache shared by browser contexts through route interception.
+
+    - GET responses are stored when their headers allow it; listing pages matching `listing_patterns`
+      get `listing_ttl_s`, static assets without headers get `static_ttl_s`.
+    - Only CACHEABLE_RESOURCE_TYPES are intercepted; redirects are passed through, never cached.
+    - Total body size is bounded by `max_bytes`, evicting least recently used entries.
+    - With `offline=True` the network is never used: any stored entry (fresh or not) is served and
+      everything else is aborted, so recorded fixtures can be replayed in tests.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entry_bytes: int = DEFAULT_MAX_ENTRY_BYTES,
+        listing_ttl_s: int = DEFAULT_LISTING_TTL_S,
+        listing_patterns: Optional[List[str]] = None,
+        static_ttl_s: int = DEFAULT_STATIC_TTL_S,
+        offline: bool = False,
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.listing_ttl_s = listing_ttl_s
+        self.listing_patterns = [
+            re.compile(p, re.IGNORECASE) for p in (listing_patterns or DEFAULT_LISTING_PATTERNS)
+        ]
+        self.static_ttl_s = static_ttl_s
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "http_cache.sqlite3"), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, url TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL,"
+                " body BLOB NOT NULL, size INTEGER NOT NULL, stored_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    @staticmethod
+    def _key(url: str) -> str:
+        # The fragment never reaches the server
+        return sha256(url.split("#", 1)[0].encode("utf-8")).hexdigest()
+
+    def is_listing_page(self, url: str) -> bool:
+        return any(p.search(url) for p in self.listing_patterns)
+
+    def ttl_for(self, url: str, resource_type: str, status: int, headers: Dict[str, str]) -> int:
+        """Seconds this response may be served from cache (0 = do not store)."""
+        if status not in CACHEABLE_STATUSES:
+            return 0
+        if "no-store" in _parse_cache_control(headers.get("cache-control", "")):
+            return 0
+        if resource_type in ("document", "xhr", "fetch") and self.is_listing_page(url):
+            return self.listing_ttl_s
+        ttl = ttl_from_headers(headers)
+        if ttl is not None:
+            return ttl
+        return self.static_ttl_s if resource_type in STATIC_RESOURCE_TYPES else 0
+
+    def get(self, url: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        key = self._key(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[3] <= now and not allow_stale):
+                return None
+            if not self.offline:
+                with self._conn:
+                    self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        status, headers, body, _ = row
+        return {"status": status, "headers": json.loads(headers), "body": body}
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes, ttl: int):
+        if self.offline or ttl <= 0 or len(body) > self.max_entry_bytes:
+            return
+        now = time.time()
+        stored_headers = {k: v for k, v in headers.items() if k.lower() not in _UNSTORED_HEADERS}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (key, url, status, headers, body, size, stored_at, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(url), url, status, json.dumps(stored_headers), body, len(body), now, now + ttl, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        """Drops least recently used entries until the cache is back under 90% of `max_bytes`."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"HTTP cache: evicted {evicted} least recently used entries.")
+
+    async def handle_route(self, route):
+        """
+        Playwright route handler: serve from cache, otherwise fetch, store and fulfill.
+        Redirects are not followed here: the 3xx is passed to the browser, which then requests (and
+        caches) the target under its own URL, so relative links keep resolving against the right base.
+        SQLite access runs in a worker thread to keep the event loop free.
+        """
+        request = route.request
+        if request.method != "GET" or not request.url.startswith(("http://", "https://")):
+            await route.fallback()
+            return
+        if request.resource_type not in CACHEABLE_RESOURCE_TYPES:
+            if self.offline:
+                await route.abort("internetdisconnected")
+            else:
+                await route.fallback()
+            return
+
+        entry = await asyncio.to_thread(self.get, request.url, allow_stale=self.offline)
+        if entry is not None:
+            self.hits += 1
+            await route.fulfill(status=entry["status"], headers=entry["headers"], body=entry["body"])
+            return
+        self.misses += 1
+        if self.offline:
+            logger.debug(f"HTTP cache (offline): no recorded response for {request.url}")
+            await route.abort("internetdisconnected")
+            return
+
+        try:
+            response = await route.fetch(max_redirects=0)
+            body = await response.body()
+        except Exception as e:
+            logger.debug(f"HTTP cache: fetch failed for {request.url}: {e}")
+            await route.abort("failed")
+            return
+        headers = {k.lower(): v for k, v in response.headers.items()}
+        ttl = self.ttl_for(request.url, request.resource_type, response.status, headers)
+        try:
+            await asyncio.to_thread(self.put, request.url, response.status, headers, body, ttl)
+        except sqlite3.Error as e:
+            logger.warning(f"HTTP cache: could not store {request.url}: {e}")
+        await route.fulfill(
+            status=response.status,
+            headers={k: v for k, v in headers.items() if k not in _HOP_HEADERS},
+            body=body,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# One cache per directory, shared by every context of the process (keyed by cache_dir)
+_HTTP_CACHES: Dict[str, HttpCache] = {}
+
+
+def get_http_cache(cache_dir: str, offline: bool = False) -> HttpCache:
+    key = os.path.abspath(cache_dir)
+    cache = _HTTP_CACHES.get(key)
+    if cache is None or cache.offline != offline:
+        if cache is not None:
+            cache.close()
+        cache = HttpCache(cache_dir, offline=offline)
+        _HTTP_CACHES[key] = cache
+    return cache
@@ -72,6 +72,12 @@ def create_browser_settings_tab(webui_manager: WebuiManager):
                 info="Disable browser security",
                 interactive=True
             )
+            block_resources = gr.Checkbox(
+                label="Block Heavy Resources",
+                value=True,
+                info="Skip images (unless vision is on), media, fonts and trackers",
+                interactive=True
+            )
 
     with gr.Group():
         with gr.Row():
@@ -136,6 +142,7 @@ def create_browser_settings_tab(webui_manager: WebuiManager):
             keep_browser_open=keep_browser_open,
             headless=headless,
             disable_security=disable_security,
+            block_resources=block_resources,
             save_recording_path=save_recording_path,
             save_trace_path=save_trace_path,
             save_agent_history_path=save_agent_history_path,
@@ -155,4 +162,5 @@ def create_browser_settings_tab(webui_manager: WebuiManager):
     headless.change(close_wrapper)
     keep_browser_open.change(close_wrapper)
     disable_security.change(close_wrapper)
+    block_resources.change(close_wrapper)
     use_own_browser.change(close_wrapper)
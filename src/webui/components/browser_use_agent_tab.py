@@ -1,9 +1,11 @@
 import asyncio
+import base64
+import io
 import json
 import logging
 import os
 import uuid
-from typing import Any, AsyncGenerator, Dict, Optional
+from typing import Any, AsyncGenerator, Dict, Optional, Tuple
 
 import gradio as gr
 
@@ -17,16 +19,27 @@ from browser_use.browser.context import BrowserContext, BrowserContextWindowSize
 from browser_use.browser.views import BrowserState
 from gradio.components import Component
 from langchain_core.language_models.chat_models import BaseChatModel
+from PIL import Image
 
 from src.agent.browser_use.browser_use_agent import BrowserUseAgent
 from src.browser.custom_browser import CustomBrowser
-from src.browser.custom_context import CustomBrowserContextConfig
+from src.browser.custom_context import (
+    CustomBrowserContextConfig,
+    default_blocked_resource_types,
+)
 from src.controller.custom_controller import CustomController
 from src.utils import llm_provider
 from src.webui.webui_manager import WebuiManager
 
 logger = logging.getLogger(__name__)
 
+# Step screenshots are shown in the chat as thumbnails of this size, linking to the full image
+SCREENSHOT_THUMBNAIL_SIZE = (480, 360)
+# Bursts of callback notifications arriving within this window are sent to the UI as one update
+UI_UPDATE_COALESCE_S = 0.05
+# Refresh interval of the headless live browser view (the only periodic work while the agent is idle)
+BROWSER_VIEW_REFRESH_S = 0.5
+
 
 # --- Helper Functions --- (Defined at module level)
 
@@ -129,6 +142,52 @@ def _format_agent_output(model_output: AgentOutput) -> str:
     return content.strip()
 
 
+def _save_step_screenshot(
+    screenshot_dir: str, screenshot_b64: str, step_num: int
+) -> Tuple[str, str]:
+    """Writes a step screenshot and a downscaled JPEG thumbnail, returning (full_path, thumb_path)."""
+    os.makedirs(screenshot_dir, exist_ok=True)
+    image_bytes = base64.b64decode(screenshot_b64)
+    extension = "png" if image_bytes.startswith(b"\x89PNG") else "jpg"
+    full_path = os.path.join(screenshot_dir, f"step_{step_num}.{extension}")
+    thumb_path = os.path.join(screenshot_dir, f"step_{step_num}_thumb.jpg")
+    with open(full_path, "wb") as f:
+        f.write(image_bytes)
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        thumbnail = image.convert("RGB")
+        thumbnail.thumbnail(SCREENSHOT_THUMBNAIL_SIZE)
+        thumbnail.save(thumb_path, "JPEG", quality=70)
+    return full_path, thumb_path
+
+
+def _file_url(path: str) -> str:
+    """URL under which Gradio serves a file from a registered static path."""
+    return f"/gradio_api/file={os.path.abspath(path)}"
+
+
+async def _wait_for_update(
+    webui_manager: WebuiManager,
+    agent_task: asyncio.Task,
+    timeout: Optional[float] = None,
+) -> None:
+    """
+    Sleeps until a callback or button handler calls notify_bu_update(), the agent task ends or
+    `timeout` elapses, then lets a short burst of further notifications coalesce into one update.
+    """
+    event = webui_manager.bu_update_event
+    waiter = asyncio.ensure_future(event.wait())
+    try:
+        await asyncio.wait(
+            {agent_task, waiter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        waiter.cancel()
+    if event.is_set() and not agent_task.done():
+        await asyncio.sleep(UI_UPDATE_COALESCE_S)
+    # Cleared before the caller reads the state, so later notifications trigger the next wake up
+    event.clear()
+
+
 # --- Updated Callback Implementation ---
 
 
@@ -159,8 +218,19 @@ async def _handle_new_step(
             if (
                 isinstance(screenshot_data, str) and len(screenshot_data) > 100
             ):  # Arbitrary length check
-                # *** UPDATED STYLE: Removed centering, adjusted width ***
-                img_tag = f'<img src="data:image/jpeg;base64,{screenshot_data}" alt="Step {step_num} Screenshot" style="max-width: 800px; max-height: 600px; object-fit:contain;" />'
+                # Written to disk and referenced by URL: the chat history only carries a small
+                # link per step instead of megabytes of base64 re-sent on every UI update
+                screenshot_dir = webui_manager.bu_screenshot_dir or os.path.join(
+                    "./tmp/agent_history", webui_manager.bu_agent_task_id or "unknown", "screenshots"
+                )
+                full_path, thumb_path = await asyncio.to_thread(
+                    _save_step_screenshot, screenshot_dir, screenshot_data, step_num
+                )
+                img_tag = (
+                    f'<a href="{_file_url(full_path)}" target="_blank">'
+                    f'<img src="{_file_url(thumb_path)}" alt="Step {step_num} Screenshot" style="max-width: 480px; max-height: 360px; object-fit:contain;" />'
+                    "</a>"
+                )
                 screenshot_html = (
                     img_tag + "<br/>"
                 )  # Use <br/> for line break after inline-block image
@@ -194,8 +264,7 @@ async def _handle_new_step(
 
     # Append to the correct chat history list
     webui_manager.bu_chat_history.append(chat_message)
-
-    await asyncio.sleep(0.05)
+    webui_manager.notify_bu_update()
 
 
 def _handle_done(webui_manager: WebuiManager, history: AgentHistoryList):
@@ -220,6 +289,7 @@ def _handle_done(webui_manager: WebuiManager, history: AgentHistoryList):
     webui_manager.bu_chat_history.append(
         {"role": "assistant", "content": final_summary}
     )
+    webui_manager.notify_bu_update()
 
 
 async def _ask_assistant_callback(
@@ -242,6 +312,7 @@ async def _ask_assistant_callback(
     # Use state stored in webui_manager
     webui_manager.bu_response_event = asyncio.Event()
     webui_manager.bu_user_help_response = None  # Reset previous response
+    webui_manager.notify_bu_update()
 
     try:
         logger.info("Waiting for user response event...")
@@ -258,6 +329,7 @@ async def _ask_assistant_callback(
             }
         )
         webui_manager.bu_response_event = None  # Clear the event
+        webui_manager.notify_bu_update()
         return {"response": "Timeout: User did not respond."}  # Inform the agent
 
     response = webui_manager.bu_user_help_response
@@ -267,6 +339,7 @@ async def _ask_assistant_callback(
     webui_manager.bu_response_event = (
         None  # Clear the event for the next potential request
     )
+    webui_manager.notify_bu_update()
     return {"response": response}
 
 
@@ -388,6 +461,7 @@ async def run_agent_task(
     keep_browser_open = get_browser_setting("keep_browser_open", False)
     headless = get_browser_setting("headless", False)
     disable_security = get_browser_setting("disable_security", True)
+    block_resources = get_browser_setting("block_resources", False)
     window_w = int(get_browser_setting("window_w", 1280))
     window_h = int(get_browser_setting("window_h", 1100))
     cdp_url = get_browser_setting("cdp_url") or None
@@ -488,6 +562,8 @@ async def run_agent_task(
                 browser_window_size=BrowserContextWindowSize(
                     width=window_w, height=window_h
                 ),
+                block_resources=block_resources,
+                blocked_resource_types=default_blocked_resource_types(use_vision),
             )
             if not webui_manager.bu_browser:
                 raise ValueError("Browser not initialized, cannot create context.")
@@ -511,6 +587,12 @@ async def run_agent_task(
             webui_manager.bu_agent_task_id,
             f"{webui_manager.bu_agent_task_id}.gif",
         )
+        webui_manager.bu_screenshot_dir = os.path.join(
+            save_agent_history_path, webui_manager.bu_agent_task_id, "screenshots"
+        )
+        os.makedirs(webui_manager.bu_screenshot_dir, exist_ok=True)
+        # Lets the chat reference step screenshots as /gradio_api/file=... URLs
+        gr.set_static_paths(paths=[os.path.abspath(webui_manager.bu_screenshot_dir)])
 
         # Pass the webui_manager to callbacks when wrapping them
         async def step_callback_wrapper(
@@ -559,6 +641,7 @@ async def run_agent_task(
         agent_run_coro = webui_manager.bu_agent.run(max_steps=max_steps)
         agent_task = asyncio.create_task(agent_run_coro)
         webui_manager.bu_current_task = agent_task  # Store the task
+        webui_manager.bu_update_event.clear()
 
         last_chat_len = len(webui_manager.bu_chat_history)
         while not agent_task.done():
@@ -580,7 +663,8 @@ async def run_agent_task(
                     is_stopped = webui_manager.bu_agent.state.stopped
                     if is_stopped:  # Stop signal received while paused
                         break
-                    await asyncio.sleep(0.2)
+                    # Woken up by the pause/resume or stop button handlers
+                    await _wait_for_update(webui_manager, agent_task)
 
                 if (
                     agent_task.done() or is_stopped
@@ -637,7 +721,7 @@ async def run_agent_task(
                     webui_manager.bu_response_event is not None
                     and not agent_task.done()
                 ):
-                    await asyncio.sleep(0.2)
+                    await _wait_for_update(webui_manager, agent_task)
                 # Restore UI after response submitted or if task ended unexpectedly
                 if not agent_task.done():
                     yield {
@@ -689,7 +773,12 @@ async def run_agent_task(
             if update_dict:
                 yield update_dict
 
-            await asyncio.sleep(0.1)  # Polling interval
+            # Sleep until a callback reports progress (or the live view is due for a refresh)
+            await _wait_for_update(
+                webui_manager,
+                agent_task,
+                timeout=BROWSER_VIEW_REFRESH_S if headless else None,
+            )
 
         # --- 7. Task Finalization ---
         webui_manager.bu_agent.state.paused = False
@@ -847,6 +936,7 @@ async def handle_stop(webui_manager: WebuiManager):
         # Signal the agent to stop by setting its internal flag
         agent.state.stopped = True
         agent.state.paused = False  # Ensure not paused if stopped
+        webui_manager.notify_bu_update()
         return {
             webui_manager.get_component_by_id(
                 "browser_use_agent.stop_button"
@@ -886,6 +976,7 @@ async def handle_pause_resume(webui_manager: WebuiManager):
         if agent.state.paused:
             logger.info("Resume button clicked.")
             agent.resume()
+            webui_manager.notify_bu_update()
             # UI update happens in main loop
             return {
                 webui_manager.get_component_by_id(
@@ -895,6 +986,7 @@ async def handle_pause_resume(webui_manager: WebuiManager):
         else:
             logger.info("Pause button clicked.")
             agent.pause()
+            webui_manager.notify_bu_update()
             return {
                 webui_manager.get_component_by_id(
                     "browser_use_agent.pause_resume_button"
@@ -935,6 +1027,7 @@ async def handle_clear(webui_manager: WebuiManager):
     webui_manager.bu_response_event = None
     webui_manager.bu_user_help_response = None
     webui_manager.bu_agent_task_id = None
+    webui_manager.bu_screenshot_dir = None
 
     logger.info("Agent state and browser resources cleared.")
 
@@ -6,10 +6,11 @@ from src.webui.webui_manager import WebuiManager
 from src.utils import config
 import logging
 import os
-from typing import Any, Dict, AsyncGenerator, Optional, Tuple, Union
+from typing import Any, Dict, AsyncGenerator, List, Optional, Tuple, Union
 import asyncio
 import json
 from src.agent.deep_research.deep_research_agent import DeepResearchAgent
+from src.agent.deep_research.usage_tracker import USAGE_FILENAME, usage_to_markdown
 from src.utils import llm_provider
 
 logger = logging.getLogger(__name__)
@@ -52,6 +53,33 @@ def _read_file_safe(file_path: str) -> Optional[str]:
         return None
 
 
+def _read_usage_markdown(usage_file_path: str) -> Optional[str]:
+    """Renders the task's usage.json as Markdown, or None if it is missing/unreadable."""
+    content = _read_file_safe(usage_file_path)
+    if not content:
+        return None
+    try:
+        return usage_to_markdown(json.loads(content))
+    except json.JSONDecodeError as e:
+        logger.warning(f"Could not parse usage file {usage_file_path}: {e}")
+        return None
+
+
+def _format_live_results(results: List[Dict[str, Any]], limit: int = 20) -> str:
+    """Renders the browser search results streamed by the agent so far (latest `limit` first)."""
+    status_icons = {"completed": "✅", "failed": "❌", "timeout": "⏱️", "cancelled": "⏹️"}
+    lines = [f"### Search Results ({len(results)} finished)"]
+    for result in reversed(results[-limit:]):
+        icon = status_icons.get(result.get("status"), "•")
+        detail = result.get("result") or result.get("error") or ""
+        detail = str(detail).replace("\n", " ")
+        if len(detail) > 300:
+            detail = detail[:300] + "..."
+        reused = " *(reused)*" if result.get("reused") else ""
+        lines.append(f"- {icon} **{result.get('query', 'Unknown Query')}**{reused}: {detail}")
+    return "\n".join(lines)
+
+
 # --- Deep Research Agent Specific Logic ---
 
 async def run_deep_research(webui_manager: WebuiManager, components: Dict[Component, Any]) -> AsyncGenerator[
@@ -62,18 +90,22 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
     research_task_comp = webui_manager.get_component_by_id("deep_research_agent.research_task")
     resume_task_id_comp = webui_manager.get_component_by_id("deep_research_agent.resume_task_id")
     parallel_num_comp = webui_manager.get_component_by_id("deep_research_agent.parallel_num")
+    parallel_steps_comp = webui_manager.get_component_by_id("deep_research_agent.parallel_steps")
     save_dir_comp = webui_manager.get_component_by_id(
         "deep_research_agent.max_query")  # Note: component ID seems misnamed in original code
     start_button_comp = webui_manager.get_component_by_id("deep_research_agent.start_button")
     stop_button_comp = webui_manager.get_component_by_id("deep_research_agent.stop_button")
     markdown_display_comp = webui_manager.get_component_by_id("deep_research_agent.markdown_display")
     markdown_download_comp = webui_manager.get_component_by_id("deep_research_agent.markdown_download")
+    usage_display_comp = webui_manager.get_component_by_id("deep_research_agent.usage_display")
+    search_results_display_comp = webui_manager.get_component_by_id("deep_research_agent.search_results_display")
     mcp_server_config_comp = webui_manager.get_component_by_id("deep_research_agent.mcp_server_config")
 
     # --- 1. Get Task and Settings ---
     task_topic = components.get(research_task_comp, "").strip()
     task_id_to_resume = components.get(resume_task_id_comp, "").strip() or None
     max_parallel_agents = int(components.get(parallel_num_comp, 1))
+    run_steps_in_parallel = bool(components.get(parallel_steps_comp, False))
     base_save_dir = components.get(save_dir_comp, "./tmp/deep_research")
     mcp_server_config_str = components.get(mcp_server_config_comp)
     mcp_config = json.loads(mcp_server_config_str) if mcp_server_config_str else None
@@ -94,9 +126,12 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
         research_task_comp: gr.update(interactive=False),
         resume_task_id_comp: gr.update(interactive=False),
         parallel_num_comp: gr.update(interactive=False),
+        parallel_steps_comp: gr.update(interactive=False),
         save_dir_comp: gr.update(interactive=False),
         markdown_display_comp: gr.update(value="Starting research..."),
-        markdown_download_comp: gr.update(value=None, interactive=False)
+        markdown_download_comp: gr.update(value=None, interactive=False),
+        usage_display_comp: gr.update(value=""),
+        search_results_display_comp: gr.update(value=""),
     }
 
     agent_task = None
@@ -105,6 +140,8 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
     report_file_path = None
     last_plan_content = None
     last_plan_mtime = 0
+    usage_file_path = None
+    last_usage_mtime = 0
 
     try:
         # --- 3. Get LLM and Browser Config from other tabs ---
@@ -137,6 +174,7 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
             "user_data_dir": get_setting("browser_settings", "browser_user_data_dir"),
             "window_width": int(get_setting("browser_settings", "window_w", 1280)),
             "window_height": int(get_setting("browser_settings", "window_h", 1100)),
+            "block_resources": get_setting("browser_settings", "block_resources", False),
             # Add other relevant fields if DeepResearchAgent accepts them
         }
 
@@ -154,7 +192,8 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
             topic=task_topic,
             task_id=task_id_to_resume,
             save_dir=base_save_dir,
-            max_parallel_browsers=max_parallel_agents
+            max_parallel_browsers=max_parallel_agents,
+            execution_mode="dag" if run_steps_in_parallel else "sequential",
         )
         agent_task = asyncio.create_task(agent_run_coro)
         webui_manager.dr_current_task = agent_task
@@ -183,11 +222,13 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
             task_specific_dir = os.path.join(base_save_dir, str(running_task_id))
             plan_file_path = os.path.join(task_specific_dir, "research_plan.md")
             report_file_path = os.path.join(task_specific_dir, "report.md")
+            usage_file_path = os.path.join(task_specific_dir, USAGE_FILENAME)
             logger.info(f"Monitoring plan file: {plan_file_path}")
         else:
             logger.warning("Cannot monitor plan file: Task ID unknown.")
             plan_file_path = None
         last_plan_content = None
+        last_live_results_count = 0
         while not agent_task.done():
             update_dict = {}
             update_dict[resume_task_id_comp] = gr.update(value=running_task_id)
@@ -216,6 +257,21 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
                     # Avoid continuous logging for the same error
                     await asyncio.sleep(2.0)
 
+            # Browser search results streamed by the agent as each query finishes
+            live_results = list(webui_manager.dr_agent.live_search_results)
+            if len(live_results) != last_live_results_count:
+                update_dict[search_results_display_comp] = gr.update(value=_format_live_results(live_results))
+                last_live_results_count = len(live_results)
+
+            # Live token / time accounting
+            if usage_file_path and os.path.exists(usage_file_path):
+                usage_mtime = os.path.getmtime(usage_file_path)
+                if usage_mtime > last_usage_mtime:
+                    usage_markdown = _read_usage_markdown(usage_file_path)
+                    if usage_markdown:
+                        update_dict[usage_display_comp] = gr.update(value=usage_markdown)
+                        last_usage_mtime = usage_mtime
+
             # Yield updates if any
             if update_dict:
                 yield update_dict
@@ -233,9 +289,13 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
             webui_manager.dr_task_id = running_task_id
             task_specific_dir = os.path.join(base_save_dir, str(running_task_id))
             report_file_path = os.path.join(task_specific_dir, "report.md")
+            usage_file_path = os.path.join(task_specific_dir, USAGE_FILENAME)
             logger.info(f"Task ID confirmed from result: {running_task_id}")
 
         final_ui_update = {}
+        final_usage_markdown = _read_usage_markdown(usage_file_path) if usage_file_path else None
+        if final_usage_markdown:
+            final_ui_update[usage_display_comp] = gr.update(value=final_usage_markdown)
         if report_file_path and os.path.exists(report_file_path):
             logger.info(f"Loading final report from: {report_file_path}")
             report_content = _read_file_safe(report_file_path)
@@ -277,6 +337,7 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
             research_task_comp: gr.update(interactive=True),
             resume_task_id_comp: gr.update(value="", interactive=True),
             parallel_num_comp: gr.update(interactive=True),
+            parallel_steps_comp: gr.update(interactive=True),
             save_dir_comp: gr.update(interactive=True),
             # Keep download button enabled if file exists
             markdown_download_comp: gr.update() if report_file_path and os.path.exists(report_file_path) else gr.update(
@@ -389,6 +450,9 @@ def create_deep_research_agent_tab(webui_manager: WebuiManager):
             parallel_num = gr.Number(label="Parallel Agent Num", value=1,
                                      precision=0,
                                      interactive=True)
+            parallel_steps = gr.Checkbox(label="Parallel Plan Steps", value=False,
+                                         info="Research independent plan steps at the same time",
+                                         interactive=True)
             max_query = gr.Textbox(label="Research Save Dir", value="./tmp/deep_research",
                                    interactive=True)
     with gr.Row():
@@ -397,15 +461,20 @@ def create_deep_research_agent_tab(webui_manager: WebuiManager):
     with gr.Group():
         markdown_display = gr.Markdown(label="Research Report")
         markdown_download = gr.File(label="Download Research Report", interactive=False)
+        search_results_display = gr.Markdown(label="Search Results")
+        usage_display = gr.Markdown(label="Usage")
     tab_components.update(
         dict(
             research_task=research_task,
             parallel_num=parallel_num,
+            parallel_steps=parallel_steps,
             max_query=max_query,
             start_button=start_button,
             stop_button=stop_button,
             markdown_display=markdown_display,
             markdown_download=markdown_download,
+            search_results_display=search_results_display,
+            usage_display=usage_display,
             resume_task_id=resume_task_id,
             mcp_json_file=mcp_json_file,
             mcp_server_config=mcp_server_config,
@@ -39,6 +39,15 @@ class WebuiManager:
         self.bu_user_help_response: Optional[str] = None
         self.bu_current_task: Optional[asyncio.Task] = None
         self.bu_agent_task_id: Optional[str] = None
+        self.bu_screenshot_dir: Optional[str] = None
+        # Set by the agent callbacks and button handlers whenever the run tab has something to show
+        self.bu_update_event: asyncio.Event = asyncio.Event()
+
+    def notify_bu_update(self) -> None:
+        """
+        Wake up the browser use agent UI loop
+        """
+        self.bu_update_event.set()
 
     def init_deep_research_agent(self) -> None:
         """
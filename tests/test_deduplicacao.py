@@ -0,0 +1,38 @@
+import sys
+
+sys.path.append(".")
+
+from langchain_core.documents import Document
+
+from deduplicacao import suprimir_quase_duplicados
+from indexador_pdf import _texto_cronograma
+
+TABELA_CRONOGRAMA = [
+    ["ETAPAS", "DATAS"],
+    ["Inscrições", "01/03/2025 a 15/03/2025"],
+    ["Resultado preliminar", "30/03/2025"],
+    ["Resultado final", "10/04/2025"],
+]
+
+
+def test_cronograma_sobrevive_a_chunk_quase_igual():
+    cronograma = _texto_cronograma([TABELA_CRONOGRAMA])
+    assert cronograma.startswith("CRONOGRAMA DE EVENTOS E DATAS IMPORTANTES:")
+
+    meta = {"source": "edital.pdf", "page": 3}
+    chunks = [
+        # Texto da página contém o cronograma inteiro: sem a exceção, o cronograma seria descartado por estar contido nele
+        Document(page_content=cronograma + "\nDemais disposições do edital.", metadata={**meta, "type": "page_relevante"}),
+        Document(page_content=cronograma, metadata={**meta, "type": "cronograma_principal"}),
+        Document(page_content=cronograma + "\nDemais disposições do edital", metadata={**meta, "type": "page_text"}),
+    ]
+    mantidos = suprimir_quase_duplicados(chunks)
+    tipos = [c.metadata["type"] for c in mantidos]
+
+    assert "cronograma_principal" in tipos
+    # O cronograma não serve de referência, mas o page_text quase igual ao page_relevante continua sendo descartado
+    assert tipos == ["page_relevante", "cronograma_principal"]
+
+
+if __name__ == '__main__':
+    test_cronograma_sobrevive_a_chunk_quase_igual()
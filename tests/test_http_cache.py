@@ -0,0 +1,106 @@
+import asyncio
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.append(".")
+
+from src.browser.http_cache import HttpCache, get_http_cache, ttl_from_headers
+
+
+class FakeRoute:
+    """Stands in for a Playwright route; records how the cache answered the request."""
+
+    def __init__(self, url: str, resource_type: str = "document", method: str = "GET"):
+        self.request = SimpleNamespace(url=url, resource_type=resource_type, method=method)
+        self.outcome = None
+
+    async def fulfill(self, status, headers, body):
+        self.outcome = ("fulfill", status, body)
+
+    async def abort(self, error_code=None):
+        self.outcome = ("abort", error_code)
+
+    async def fallback(self):
+        self.outcome = ("fallback",)
+
+    async def fetch(self, **kwargs):
+        raise AssertionError("offline cache must not touch the network")
+
+
+def test_ttl_rules():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = HttpCache(cache_dir)
+        assert ttl_from_headers({"cache-control": "no-store"}) == 0
+        assert ttl_from_headers({"cache-control": "max-age=600", "age": "100"}) == 500
+        assert ttl_from_headers({}) is None
+        # Listing pages get the listing TTL even without headers; documents without headers are not stored
+        assert cache.ttl_for("https://www.gov.br/cnpq/chamadas-publicas", "document", 200, {}) == cache.listing_ttl_s
+        assert cache.ttl_for("https://example.org/about", "document", 200, {}) == 0
+        assert cache.ttl_for("https://example.org/app.js", "script", 200, {}) == cache.static_ttl_s
+        assert cache.ttl_for("https://example.org/app.js", "script", 404, {}) == 0
+        cache.close()
+
+
+def test_offline_replay():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        online = HttpCache(cache_dir)
+        online.put("https://example.org/editais", 200, {"content-type": "text/html", "set-cookie": "s=1"}, b"<html>editais</html>", ttl=1)
+        online.put("https://example.org/fresh", 200, {"content-type": "text/html"}, b"fresh", ttl=3600)
+        online.close()
+        time.sleep(1.1)
+
+        offline = get_http_cache(cache_dir, offline=True)
+        # Stale entries are still replayed offline, and cookies were never stored
+        entry = offline.get("https://example.org/editais#topo", allow_stale=True)
+        assert entry["body"] == b"<html>editais</html>"
+        assert "set-cookie" not in entry["headers"]
+
+        hit = FakeRoute("https://example.org/editais")
+        miss = FakeRoute("https://example.org/unknown")
+        media = FakeRoute("https://example.org/video.mp4", resource_type="media")
+        for route in (hit, miss, media):
+            asyncio.run(offline.handle_route(route))
+        assert hit.outcome == ("fulfill", 200, b"<html>editais</html>")
+        assert miss.outcome == ("abort", "internetdisconnected")
+        assert media.outcome == ("abort", "internetdisconnected")
+        assert (offline.hits, offline.misses) == (1, 1)
+
+        # Replaying never writes to the cache
+        offline.put("https://example.org/new", 200, {}, b"new", ttl=3600)
+        assert offline.stats()["entries"] == 2
+
+        # Switching back to online replaces (and closes) the offline instance
+        online_again = get_http_cache(cache_dir, offline=False)
+        assert online_again is not offline
+        assert online_again.get("https://example.org/fresh")["body"] == b"fresh"
+        online_again.close()
+
+
+def test_eviction_order():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = HttpCache(cache_dir, max_bytes=350)
+        for name in ("a", "b", "c"):
+            cache.put(f"https://example.org/{name}", 200, {}, b"x" * 100, ttl=3600)
+            time.sleep(0.01)
+        # Reading "a" makes "b" the least recently used entry
+        assert cache.get("https://example.org/a") is not None
+        time.sleep(0.01)
+
+        cache.put("https://example.org/d", 200, {}, b"x" * 100, ttl=3600)
+        assert cache.get("https://example.org/b") is None
+        assert all(cache.get(f"https://example.org/{name}") is not None for name in ("a", "c", "d"))
+        time.sleep(0.01)
+
+        # The reads above refreshed a, c and d in that order, so "a" goes next
+        cache.put("https://example.org/e", 200, {}, b"x" * 100, ttl=3600)
+        assert cache.get("https://example.org/a") is None
+        assert cache.stats()["entries"] == 3
+        cache.close()
+
+
+if __name__ == '__main__':
+    test_ttl_rules()
+    test_offline_replay()
+    test_eviction_order()